@@ -0,0 +1,89 @@
+"""Coalesce concurrent small ``/code`` requests into one batched parse."""
+from __future__ import annotations
+
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+import threading
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.items: List[Tuple[Sequence[str], Future]] = []
+        self.rows = 0
+        self.full = threading.Event()
+
+
+class Coalescer:
+    """Gather rows from concurrent callers sharing a key and code them together.
+
+    Callers sharing a key must also share the ``analyze_texts`` options. The
+    first caller for a key opens a batch and waits up to ``window_ms`` (or
+    until ``max_rows`` rows have joined), then runs one ``analyze_texts`` call
+    for everyone and hands each caller its own slice of the results. A caller
+    with no other request in flight does not wait, so uncontended traffic
+    pays no window. Requests with ``max_rows`` rows or more, or a window of 0,
+    bypass coalescing.
+    """
+
+    def __init__(self, window_ms: float, max_rows: int) -> None:
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._open: Dict[Hashable, _Batch] = {}
+        self._in_flight = 0
+
+    def run(
+        self,
+        key: Hashable,
+        engine: Any,
+        texts: Sequence[str],
+        **options: Any,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._in_flight += 1
+            alone = self._in_flight == 1
+        try:
+            if self.window <= 0 or len(texts) >= self.max_rows:
+                return engine.analyze_texts(texts, **options)
+            return self._join(key, engine, texts, alone, options)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _join(
+        self, key: Hashable, engine: Any, texts: Sequence[str], alone: bool, options: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        future: Future = Future()
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if batch is None:
+                batch = self._open[key] = _Batch()
+            batch.items.append((texts, future))
+            batch.rows += len(texts)
+            if batch.rows >= self.max_rows:
+                del self._open[key]
+                batch.full.set()
+
+        if leader:
+            if not alone:
+                batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._execute(engine, batch, options)
+        return future.result()
+
+    @staticmethod
+    def _execute(engine: Any, batch: _Batch, options: Dict[str, Any]) -> None:
+        texts = [text for item_texts, _ in batch.items for text in item_texts]
+        try:
+            results = engine.analyze_texts(texts, **options)
+        except BaseException as exc:
+            for _, future in batch.items:
+                future.set_exception(exc)
+            return
+        pos = 0
+        for item_texts, future in batch.items:
+            future.set_result(results[pos : pos + len(item_texts)])
+            pos += len(item_texts)
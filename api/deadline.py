@@ -0,0 +1,143 @@
+"""Latency budgets for ``/code``: code what fits, degrade or defer the rest.
+
+Rows are coded in slices. Before each slice the remaining budget is compared
+with an estimate from the backend's observed throughput; rows the requested
+engine cannot finish in time go to the fallback (fast) engine, and rows
+neither can finish are left pending. A single very long row is judged on
+its own, so it degrades without holding back the rows after it.
+
+Throughput is learned from ``ObservedEngine``, which times the engine call
+alone: time spent in the coalescing window or the scheduler queue says
+nothing about how fast a backend codes.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import base64
+import json
+import threading
+import time
+
+# Fixed per-row cost, in characters, on top of the text length.
+ROW_OVERHEAD_CHARS = 200
+SLICE_ROWS = 32
+
+
+class Throughput:
+    """Exponentially weighted chars/sec per backend, seeded with rough defaults."""
+
+    def __init__(self, seeds: Dict[str, float], weight: float = 0.2) -> None:
+        self.weight = weight
+        self._rates = dict(seeds)
+        self._lock = threading.Lock()
+
+    def seconds(self, backend: str, chars: int) -> float:
+        rate = self._rates.get(backend)
+        return chars / rate if rate else 0.0
+
+    def observe(self, backend: str, chars: int, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        rate = chars / seconds
+        with self._lock:
+            old = self._rates.get(backend)
+            self._rates[backend] = rate if old is None else old + self.weight * (rate - old)
+
+
+THROUGHPUT = Throughput({"spacy": 50_000.0, "simple": 500_000.0})
+
+
+def row_cost(text: str) -> int:
+    return len(text) + ROW_OVERHEAD_CHARS
+
+
+class ObservedEngine:
+    """An engine whose ``analyze_texts`` calls feed ``throughput`` with the time spent coding."""
+
+    def __init__(
+        self, engine: Any, throughput: Throughput = THROUGHPUT, clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        self.engine = engine
+        self.throughput = throughput
+        self.clock = clock
+
+    @property
+    def backend(self) -> str:
+        return self.engine.backend
+
+    def analyze_texts(self, texts: Sequence[str], **options: Any) -> List[Dict[str, Any]]:
+        started = self.clock()
+        out = self.engine.analyze_texts(texts, **options)
+        self.throughput.observe(self.backend, sum(row_cost(text) for text in texts), self.clock() - started)
+        return out
+
+
+def code_within(
+    deadline: float,
+    engine: Any,
+    fallback: Optional[Any],
+    texts: Sequence[str],
+    run: Callable[[Any, Sequence[str]], List[Dict[str, Any]]],
+    throughput: Throughput = THROUGHPUT,
+    clock: Callable[[], float] = time.monotonic,
+    slice_rows: int = SLICE_ROWS,
+) -> Tuple[List[Optional[Dict[str, Any]]], List[Optional[str]], List[int]]:
+    """Code ``texts`` with ``run(engine, slice)`` until ``deadline`` (a ``clock`` time).
+
+    Estimates come from ``throughput``; ``run`` should code through an
+    ``ObservedEngine`` to keep them current. Returns per-row results and
+    backends (``None`` for pending rows) and the indices of the pending rows.
+    """
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    backends: List[Optional[str]] = [None] * len(texts)
+    pending: List[int] = []
+    costs = [row_cost(text) for text in texts]
+
+    def fits(eng: Any, index: int, budget: float) -> bool:
+        return throughput.seconds(eng.backend, costs[index]) <= budget
+
+    i = 0
+    while i < len(texts):
+        remaining = deadline - clock()
+        use, end, spent = engine, i, 0.0
+        while end < len(texts) and end - i < slice_rows:
+            cost = throughput.seconds(engine.backend, costs[end])
+            if spent + cost > remaining:
+                break
+            spent += cost
+            end += 1
+        if end == i and fallback is not None:
+            # Degrade only the rows the requested engine cannot fit on their own.
+            use = fallback
+            while end < len(texts) and end - i < slice_rows and not fits(engine, end, remaining):
+                cost = throughput.seconds(fallback.backend, costs[end])
+                if spent + cost > remaining:
+                    break
+                spent += cost
+                end += 1
+        if end == i:
+            pending.append(i)
+            i += 1
+            continue
+        results[i:end] = run(use, texts[i:end])
+        backends[i:end] = [use.backend] * (end - i)
+        i = end
+    return results, backends, pending
+
+
+def encode_continuation(state: Dict[str, Any]) -> str:
+    """Opaque token carrying the resolved request options and the pending row numbers."""
+
+    raw = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_continuation(token: str) -> Dict[str, Any]:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed continuation token") from exc
+    if not isinstance(state, dict) or not isinstance(state.get("rows"), list):
+        raise ValueError("Malformed continuation token")
+    return state
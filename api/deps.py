@@ -1,23 +1,49 @@
 """Shared dependencies and configuration for the FastAPI service."""
 from __future__ import annotations
 
+from collections import Counter
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import csv
 import json
+import sys
 import threading
 
 import yaml
 from pydantic_settings import BaseSettings
 
+from .lexicon_extender import candidate_terms, count_terms, spelling_index, term_key
+from src.rules import ENGINE_VERSION
+from src.sinks import SQLiteSink
+
 
 class Settings(BaseSettings):
     """Runtime configuration for the API layer."""
 
     PRESET_DIR: str = "configs/presets"
     SCHEMA_PATH: str = "schema/ruleset.schema.json"
-    ENGINE_VERSION: str = "0.3.0"
+    ENGINE_VERSION: str = ENGINE_VERSION
     GITHUB_WEBHOOK_SECRET: str = "CHANGE_ME"
+    ADMIN_TOKEN: str = ""
     CORS_ALLOW_ORIGINS: str = "*"
+    GZIP_MIN_BYTES: int = 1024
+    DEFAULT_ENGINE: str = "auto"
+    NORMALIZE_SPELLING: bool = False
+    FUZZY_MAX_EDITS: int = 0
+    CHUNK_CHARS: int = 10_000
+    COALESCE_WINDOW_MS: float = 2.0
+    COALESCE_MAX_ROWS: int = 64
+    SCHEDULER_WORKERS: int = 1
+    SCHEDULER_SLICE_ROWS: int = 32
+    SCHEDULER_BULK_EVERY: int = 8
+    INTERACTIVE_MAX_ROWS: int = 64
+    DEADLINE_MS: float = 0
+    DEADLINE_FALLBACK: str = "fast"
+    NLP_PROCESSES: int = 0
+    VOCAB_RECYCLE_STRINGS: int = 1_000_000
+    CORPUS_DIR: str = "data/processed"
+    CORPUS_TEXT_COLS: str = "text,morning_recall_1"
+    RESULTS_DB: str = ""
 
     class Config:
         env_file = ".env"
@@ -74,3 +100,109 @@ def load_british_american_map(path: str = "configs/british_american.yml") -> Dic
         data = yaml.safe_load(fh) or {}
     # Ensure the mapping is string to string for downstream consumers.
     return {str(k): str(v) for k, v in data.items()}
+
+
+# Derived lexicon indexes, rebuilt only when their source files change.
+_INDEXES: Dict[str, Tuple[Any, Any]] = {}
+
+
+def file_signature(path: Path) -> Optional[Tuple[str, int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def get_spelling_index(
+    path: str = "configs/british_american.yml",
+) -> Dict[str, Tuple[str, ...]]:
+    """Return the bidirectional spelling index, reloading it when the map changes."""
+
+    key = f"spelling:{path}"
+    signature = file_signature(Path(path))
+    with _LOCK:
+        cached = _INDEXES.get(key)
+        if cached is None or cached[0] != signature:
+            cached = (signature, spelling_index(load_british_american_map(path)))
+            _INDEXES[key] = cached
+        return cached[1]
+
+
+def _iter_corpus_texts(files: Tuple[Path, ...], columns: Tuple[str, ...]):
+    csv.field_size_limit(sys.maxsize)
+    for csv_path in files:
+        with csv_path.open("r", encoding="utf-8", newline="") as fh:
+            reader = csv.DictReader(fh)
+            present = [col for col in columns if col in (reader.fieldnames or [])]
+            if not present:
+                continue
+            for row in reader:
+                for col in present:
+                    if row[col]:
+                        yield row[col]
+
+
+# Corpus counts of the terms asked for so far; a scan holds only this lock, never ``_LOCK``.
+_CORPUS: Dict[str, Any] = {"key": None, "counts": Counter(), "counted": frozenset()}
+_CORPUS_LOCK = threading.Lock()
+
+
+def get_corpus_frequencies(terms: Iterable[str]) -> Optional[Counter]:
+    """Return frequencies of ``terms`` over coded corpora in ``CORPUS_DIR``.
+
+    Only requested terms are counted. Terms not seen before cost one scan of
+    the corpus; the counts are reset when files in the directory are added,
+    removed or modified. ``None`` means no coded corpus is available.
+    """
+
+    base = Path(SETTINGS.CORPUS_DIR)
+    files = tuple(sorted(base.glob("*.csv"))) if base.exists() else ()
+    if not files:
+        return None
+    key = (tuple(file_signature(p) for p in files), SETTINGS.CORPUS_TEXT_COLS)
+    columns = tuple(c.strip() for c in SETTINGS.CORPUS_TEXT_COLS.split(",") if c.strip())
+    with _CORPUS_LOCK:
+        if _CORPUS["key"] != key:
+            _CORPUS.update(key=key, counts=Counter(), counted=frozenset())
+        missing = {term_key(t) for t in terms} - _CORPUS["counted"] - {""}
+        if missing:
+            # Copy on write: readers holding the previous counts are unaffected.
+            counts = Counter(_CORPUS["counts"])
+            counts.update(count_terms(_iter_corpus_texts(files, columns), missing))
+            _CORPUS.update(counts=counts, counted=_CORPUS["counted"] | missing)
+        return _CORPUS["counts"]
+
+
+def warm_corpus_frequencies() -> None:
+    """Count the proposal candidates of every cached preset's terms ahead of requests."""
+
+    terms = {
+        term
+        for preset in get_presets_cache().values()
+        for section in ("lexicons", "exceptions")
+        for values in (preset.get(section) or {}).values()
+        if isinstance(values, list)
+        for term in values
+    }
+    get_corpus_frequencies(candidate_terms(terms, {}, get_spelling_index(), SETTINGS.NORMALIZE_SPELLING))
+
+
+_SINK: Dict[str, SQLiteSink] = {}
+_SINK_LOCK = threading.Lock()
+
+
+def store_results(records, engine_version: str, preset_version: str, backend: str) -> bool:
+    """Upsert ``(new_id, row, coded)`` records into ``RESULTS_DB``; ``False`` when it is not configured."""
+
+    if not SETTINGS.RESULTS_DB:
+        return False
+    with _SINK_LOCK:
+        sink = _SINK.get(SETTINGS.RESULTS_DB)
+        if sink is None:
+            sink = SQLiteSink(SETTINGS.RESULTS_DB)
+            sink.create_indexes()
+            _SINK[SETTINGS.RESULTS_DB] = sink
+        sink.write(records, engine_version, preset_version, backend)
+        sink.flush()  # one transaction per request
+    return True
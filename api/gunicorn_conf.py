@@ -0,0 +1,35 @@
+"""Gunicorn configuration for prefork serving with copy-on-write engine sharing.
+
+    gunicorn -c api/gunicorn_conf.py api.main:app
+
+The app is imported once in the master (``preload_app``), which loads spaCy and
+the default engine; ``when_ready`` then builds every preset engine and the
+lexicon indexes before any worker is forked, so all workers share those pages.
+Check the sharing with ``python tools/check_sharing.py --pid <master pid>``.
+"""
+from __future__ import annotations
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+
+
+def when_ready(server) -> None:
+    from api.deps import get_spelling_index, warm_corpus_frequencies
+    from api.preset_validation import get_validator
+    from api.router_code import warm_engines
+
+    count = warm_engines()
+    get_spelling_index()
+    warm_corpus_frequencies()
+    get_validator()
+    # Park everything built so far in the permanent generation: collections in
+    # the workers then never write to these objects and un-share their pages.
+    gc.collect()
+    gc.freeze()
+    server.log.info("Warmed %d preset engines before forking", count)
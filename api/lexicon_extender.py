@@ -1,7 +1,11 @@
 """Deterministic utilities for expanding lexicon candidates."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Set, Tuple
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+import re
+
+_WORD = re.compile(r"[a-z0-9']+(?:-[a-z0-9']+)*")
 
 
 def inflections(term: str) -> List[str]:
@@ -31,46 +35,116 @@ def hyphen_space_variants(term: str) -> List[str]:
     return [t]
 
 
-def british_american(term: str, br_am: Dict[str, str]) -> List[str]:
+def spelling_index(br_am: Mapping[str, str]) -> Dict[str, Tuple[str, ...]]:
+    """Precompute a bidirectional lookup from a one-way spelling map."""
+
+    index: Dict[str, Set[str]] = {}
+    for key, value in br_am.items():
+        a, b = key.lower(), value.lower()
+        index.setdefault(a, set()).add(b)
+        index.setdefault(b, set()).add(a)
+    return {term: tuple(sorted(alts)) for term, alts in index.items()}
+
+
+def british_american(
+    term: str,
+    br_am: Mapping[str, str],
+    index: Optional[Mapping[str, Tuple[str, ...]]] = None,
+) -> List[str]:
     """Return British/American spelling alternatives when available."""
 
     t = term.lower()
-    out: Set[str] = {t}
-    if t in br_am:
-        out.add(br_am[t].lower())
-    reverse = {v.lower(): k.lower() for k, v in br_am.items()}
-    if t in reverse:
-        out.add(reverse[t])
-    return sorted(out)
+    if index is None:
+        index = spelling_index(br_am)
+    return sorted({t, *index.get(t, ())})
+
+
+def term_key(term: str) -> str:
+    """The lower-cased word sequence a term is counted under (hyphenated words stay whole)."""
+
+    return " ".join(_WORD.findall(term.lower()))
+
+
+def count_terms(texts: Iterable[str], terms: Iterable[str]) -> Counter:
+    """Count occurrences of ``terms`` in texts; memory is bounded by the terms, not the corpus."""
+
+    wanted = {key for key in map(term_key, terms) if key}
+    lengths = sorted({key.count(" ") + 1 for key in wanted})
+    counts: Counter = Counter()
+    for text in texts:
+        words = _WORD.findall(text.lower())
+        for n in lengths:
+            for i in range(len(words) - n + 1):
+                key = " ".join(words[i : i + n])
+                if key in wanted:
+                    counts[key] += 1
+    return counts
+
+
+def _candidates(
+    base: str, br_am: Mapping[str, str], index: Mapping[str, Tuple[str, ...]], normalized: bool
+) -> Set[Tuple[str, str]]:
+    candidates: Set[Tuple[str, str]] = set()
+    for variant in inflections(base):
+        candidates.add(("inflection", variant))
+    if not normalized:
+        for variant in hyphen_space_variants(base):
+            candidates.add(("hyphen", variant))
+        for variant in british_american(base, br_am, index):
+            candidates.add(("british_american", variant))
+    return candidates
+
+
+def candidate_terms(
+    terms: Iterable[str],
+    br_am: Mapping[str, str],
+    index: Optional[Mapping[str, Tuple[str, ...]]] = None,
+    normalized: bool = False,
+) -> Set[str]:
+    """Every term ``apply_extenders`` may propose for ``terms``; the corpus counts these."""
+
+    if index is None:
+        index = spelling_index(br_am)
+    return {value for base in terms for _, value in _candidates(base, br_am, index, normalized)}
 
 
 def apply_extenders(
-    terms: List[str], br_am: Dict[str, str]
+    terms: List[str],
+    br_am: Mapping[str, str],
+    frequencies: Optional[Mapping[str, int]] = None,
+    min_count: int = 0,
+    index: Optional[Mapping[str, Tuple[str, ...]]] = None,
+    normalized: bool = False,
 ) -> Dict[str, List[Dict[str, Any]]]:
     """Generate extension proposals for each input term.
 
+    With ``normalized`` the engine folds spellings and hyphens itself, so
+    only inflections are proposed.
+
     The extender keeps track of previously seen lower-cased forms to avoid
-    duplicate proposals across multiple heuristics.
+    duplicate proposals across multiple heuristics. When corpus
+    ``frequencies`` are given, each proposal carries its ``count``, proposals
+    below ``min_count`` are dropped and the rest are ranked most frequent first.
     """
 
+    if index is None:
+        index = spelling_index(br_am)
     proposals: Dict[str, List[Dict[str, Any]]] = {}
     seen: Set[str] = {term.lower() for term in terms}
 
     for base in terms:
-        candidates: Set[Tuple[str, str]] = set()
-        for variant in inflections(base):
-            candidates.add(("inflection", variant))
-        for variant in hyphen_space_variants(base):
-            candidates.add(("hyphen", variant))
-        for variant in british_american(base, br_am):
-            candidates.add(("british_american", variant))
-
-        for source, value in sorted(candidates):
+        for source, value in sorted(_candidates(base, br_am, index, normalized)):
             if value.lower() in seen:
                 continue
-            proposals.setdefault(base, []).append(
-                {"term": value, "source": source}
-            )
             seen.add(value.lower())
+            item: Dict[str, Any] = {"term": value, "source": source}
+            if frequencies is not None:
+                item["count"] = frequencies.get(term_key(value), 0)
+                if item["count"] < min_count:
+                    continue
+            proposals.setdefault(base, []).append(item)
+
+        if frequencies is not None and base in proposals:
+            proposals[base].sort(key=lambda item: -item["count"])
 
     return proposals
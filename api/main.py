@@ -3,9 +3,12 @@ from __future__ import annotations
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from .deps import SETTINGS, refresh_preset_cache
 from .router_code import router as code_router
+from .router_debug import router as debug_router
+from .router_metrics import router as metrics_router
 from .router_presets import router as presets_router
 from .router_webhook import router as webhook_router
 
@@ -22,10 +25,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=SETTINGS.GZIP_MIN_BYTES)
 
 app.include_router(code_router)
 app.include_router(presets_router)
 app.include_router(webhook_router)
+app.include_router(debug_router)
+app.include_router(metrics_router)
 
 
 @app.on_event("startup")
@@ -1,7 +1,7 @@
 """Pydantic models describing API inputs and outputs."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,11 +15,20 @@ class InRow(BaseModel):
 class CodePayload(BaseModel):
     rows: List[InRow]
     preset: Optional[str] = None
+    categories: Optional[List[str]] = None
+    codes_only: bool = False
+    engine: Optional[Literal["fast", "accurate"]] = None
+    store: bool = False
+    deadline_ms: Optional[float] = None
+    on_deadline: Optional[Literal["fast", "pending"]] = None
+    continuation: Optional[str] = None
+    priority: Optional[Literal["interactive", "bulk"]] = None
 
 
 class CodeResult(BaseModel):
     row: int
     code_version: str
+    backend: str
     preset_version: str
     coded: Dict[str, Any]
 
@@ -0,0 +1,150 @@
+"""Schema and semantic validation for ruleset presets.
+
+Run ``python -m api.preset_validation [DIR]`` to validate every preset in a
+directory (``PRESET_DIR`` by default) in parallel; the exit code is non-zero
+when any preset fails.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import sys
+
+import yaml
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from .deps import SETTINGS, file_signature
+from src.rules import CATEGORIES
+
+CATEGORIES_PATH = "config/categories.yml"
+EXCEPTIONS_PATH = "config/exceptions.yml"
+
+# Parsed inputs keyed by path, each stored with the file signature it was built from.
+_CACHE: Dict[str, Tuple[Any, Any]] = {}
+
+
+def _cached(path: Path, build: Any) -> Any:
+    signature = file_signature(path)
+    if signature is None:
+        raise FileNotFoundError(path)
+    cached = _CACHE.get(str(path))
+    if cached is None or cached[0] != signature:
+        cached = (signature, build(path))
+        _CACHE[str(path)] = cached
+    return cached[1]
+
+
+def _compile_schema(path: Path) -> Any:
+    schema = json.loads(path.read_text(encoding="utf-8"))
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def _load_yaml(path: Path) -> Dict[str, Any]:
+    with path.open("r", encoding="utf-8") as fh:
+        return yaml.safe_load(fh) or {}
+
+
+def get_validator() -> Any:
+    """Return the compiled validator for ``SCHEMA_PATH``, rebuilt when the file changes."""
+
+    return _cached(Path(SETTINGS.SCHEMA_PATH), _compile_schema)
+
+
+def _resolves(tree: Dict[str, Any], dotted_key: str) -> bool:
+    cursor: Any = tree
+    for part in dotted_key.split("."):
+        if not isinstance(cursor, dict) or part not in cursor:
+            return False
+        cursor = cursor[part]
+    return isinstance(cursor, list)
+
+
+def semantic_errors(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Report keys that would not merge onto an existing base lexicon list."""
+
+    errors: List[Dict[str, Any]] = []
+    bases = (
+        ("lexicons", Path(CATEGORIES_PATH)),
+        ("exceptions", Path(EXCEPTIONS_PATH)),
+    )
+    for section, base_path in bases:
+        keys = payload.get(section) or {}
+        if not keys:
+            continue
+        base = _cached(base_path, _load_yaml)
+        for key in keys:
+            if not _resolves(base, key):
+                errors.append(
+                    {
+                        "error": f"{key!r} does not resolve to a list in {base_path}",
+                        "path": [section, key],
+                    }
+                )
+    for i, category in enumerate((payload.get("meta") or {}).get("categories") or []):
+        if category not in CATEGORIES:
+            errors.append({"error": f"Unknown category {category!r}", "path": ["meta", "categories", i]})
+    return errors
+
+
+def validate_payload(payload: Any) -> Dict[str, Any]:
+    """Validate a preset against the schema, then against the base configs."""
+
+    validator = get_validator()
+    error = best_match(validator.iter_errors(payload))
+    if error is not None:
+        return {"ok": False, "error": str(error), "path": list(error.path)}
+    errors = semantic_errors(payload)
+    if errors:
+        return {"ok": False, "error": errors[0]["error"], "path": errors[0]["path"], "errors": errors}
+    return {"ok": True}
+
+
+def _validate_file(path: str) -> Dict[str, Any]:
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        return {"file": path, "ok": False, "error": f"Unreadable preset: {exc}", "path": []}
+    return {"file": path, **validate_payload(payload)}
+
+
+def validate_preset_dir(
+    directory: Optional[str] = None, workers: Optional[int] = 1
+) -> List[Dict[str, Any]]:
+    """Validate every ``*.json`` preset in ``directory``.
+
+    ``workers`` above 1 (or ``None``, one per CPU) spreads the files across
+    processes. That is for the CLI: a server worker must not fork on the
+    request path.
+    """
+
+    files = sorted(str(p) for p in Path(directory or SETTINGS.PRESET_DIR).glob("*.json"))
+    if workers == 1 or len(files) < 2:
+        return [_validate_file(path) for path in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_validate_file, files, chunksize=16))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate every preset in a directory.")
+    parser.add_argument("directory", nargs="?", default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Processes to use (default: one per CPU)")
+    args = parser.parse_args()
+
+    results = validate_preset_dir(args.directory, args.workers)
+    failed = [result for result in results if not result["ok"]]
+    for result in failed:
+        for error in result.get("errors") or [result]:
+            print(f"{result['file']}: {error['path']}: {error['error']}", file=sys.stderr)
+    print(f"{len(results) - len(failed)}/{len(results)} presets valid")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Response encoders for ``/code``: row JSON, columnar JSON, and msgpack."""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+import json
+
+from fastapi import Response
+
+from .models import InRow
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover - optional fast JSON encoder
+    orjson = None
+
+try:
+    import msgpack
+except ModuleNotFoundError:  # pragma: no cover - optional binary encoding
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.textcoder.columnar+json"
+MSGPACK = "application/x-msgpack"
+
+
+def negotiate(accept: str) -> str:
+    """Pick a media type from an ``Accept`` header, defaulting to row JSON.
+
+    msgpack is skipped when it is not installed; it is returned (and then
+    refused) only if the header offers nothing else.
+    """
+
+    wants_msgpack = False
+    for part in (accept or "").split(","):
+        media = part.split(";")[0].strip().lower()
+        if media == COLUMNAR_JSON:
+            return COLUMNAR_JSON
+        if media in (MSGPACK, "application/msgpack"):
+            if msgpack is not None:
+                return MSGPACK
+            wants_msgpack = True
+        if media in (JSON, "application/*", "*/*"):
+            return JSON
+    return MSGPACK if wants_msgpack else JSON
+
+
+def row_layout(
+    rows: Sequence[InRow],
+    analyses: List[Dict[str, Any]],
+    code_version: str,
+    preset_version: str,
+    backend: str,
+    backends: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """The original layout: one object per row with its versions and codes.
+
+    ``backends`` gives each row's backend when a deadline degraded some rows.
+    """
+
+    return {
+        "results": [
+            {
+                "row": row.row,
+                "code_version": code_version,
+                "backend": backends[i] if backends is not None else backend,
+                "preset_version": preset_version,
+                "coded": analysis,
+            }
+            for i, (row, analysis) in enumerate(zip(rows, analyses))
+        ]
+    }
+
+
+def columnar_layout(
+    rows: Sequence[InRow],
+    analyses: List[Dict[str, Any]],
+    columns: Sequence[str],
+    code_version: str,
+    preset_version: str,
+    backend: str,
+) -> Dict[str, Any]:
+    """One array per output column, aligned with the ``row``/``new_id`` arrays."""
+
+    return {
+        "code_version": code_version,
+        "backend": backend,
+        "preset_version": preset_version,
+        "row": [row.row for row in rows],
+        "new_id": [row.new_id for row in rows],
+        "columns": {col: [analysis.get(col) for analysis in analyses] for col in columns},
+    }
+
+
+def dumps_json(body: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def encode(body: Any, media_type: str) -> Response:
+    """Serialize ``body`` directly, bypassing response-model validation."""
+
+    if media_type == MSGPACK:
+        return Response(content=msgpack.packb(body, use_bin_type=True), media_type=MSGPACK)
+    return Response(content=dumps_json(body), media_type=media_type)
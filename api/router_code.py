@@ -1,16 +1,21 @@
 """Endpoints for running the rule engine against submitted rows."""
 from __future__ import annotations
 
-from copy import deepcopy
 from pathlib import Path
-from typing import Dict, Any
+import os
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import time
 
 import yaml
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
 
-from .deps import SETTINGS, get_presets_cache
+from .deps import SETTINGS, get_presets_cache, load_british_american_map, store_results
+from . import deadline, responses, scheduling
+from .batching import Coalescer
 from .models import CodePayload
-from src.rules import RuleEngine
+from src.rules import ENGINE_BACKENDS, RuleEngine, columns_for, load_nlp, preset_categories, resolve_categories
+from src.summary import CorpusSummary
 
 
 _BASE_CATEGORIES = {}
@@ -22,41 +27,180 @@ if Path("config/exceptions.yml").exists():
     with Path("config/exceptions.yml").open("r", encoding="utf-8") as fh:
         _BASE_EXCEPTIONS = yaml.safe_load(fh)
 
-_DEFAULT_ENGINE = RuleEngine(_BASE_CATEGORIES, _BASE_EXCEPTIONS)
-_PRESET_ENGINES: Dict[str, RuleEngine] = {}
+
+def nlp_processes() -> int:
+    """Chunk-parsing workers per engine: ``NLP_PROCESSES``, or one per CPU (up to 4) when it is 0."""
+
+    if SETTINGS.NLP_PROCESSES > 0:
+        return SETTINGS.NLP_PROCESSES
+    return min(os.cpu_count() or 1, 4)
+
+
+def _new_engine(cats: Dict[str, Any], excs: Dict[str, Any], choice: str) -> RuleEngine:
+    return RuleEngine(
+        cats,
+        excs,
+        chunk_chars=SETTINGS.CHUNK_CHARS,
+        n_process=nlp_processes(),
+        nlp=load_nlp(ENGINE_BACKENDS[choice]),
+        spelling=load_british_american_map() if SETTINGS.NORMALIZE_SPELLING else None,
+        fuzzy=SETTINGS.FUZZY_MAX_EDITS,
+    )
+
+
+def _load_base_engines() -> Dict[str, RuleEngine]:
+    engines = {}
+    for choice in ENGINE_BACKENDS:
+        try:
+            engines[choice] = _new_engine(_BASE_CATEGORIES, _BASE_EXCEPTIONS, choice)
+        except (ImportError, OSError):  # spaCy or its model is not installed
+            continue
+    return engines
+
+
+# One base engine per available choice ("fast", "accurate"), kept warm side by side.
+_BASE_ENGINES: Dict[str, RuleEngine] = _load_base_engines()
+# Preset overlays keyed by (preset name, engine choice).
+_PRESET_ENGINES: Dict[Tuple[str, str], RuleEngine] = {}
+# Serialises first-use builds so concurrent requests for a cold preset share one engine.
+_ENGINE_LOCK = threading.Lock()
+# Vocab size of each base engine when it was last built; see ``maybe_recycle_engines``.
+_VOCAB_BASELINES = {choice: engine.vocab_size() for choice, engine in _BASE_ENGINES.items()}
+_RECYCLE_STATE = {"running": False, "count": 0}
+_SUMMARY_BATCH_ROWS = 256
+_COALESCER = Coalescer(SETTINGS.COALESCE_WINDOW_MS, SETTINGS.COALESCE_MAX_ROWS)
+_SCHEDULER = scheduling.Scheduler(
+    SETTINGS.SCHEDULER_WORKERS, SETTINGS.SCHEDULER_SLICE_ROWS, SETTINGS.SCHEDULER_BULK_EVERY
+)
 
 router = APIRouter(prefix="", tags=["code"])
 
 
-def _merge_dotted(target: Dict[str, Any], dotted_key: str, values: Any) -> None:
-    parts = dotted_key.split(".")
-    cursor = target
-    for part in parts[:-1]:
-        cursor = cursor.setdefault(part, {})
-    leaf = parts[-1]
-    existing = cursor.get(leaf)
-    if isinstance(existing, list) and isinstance(values, list):
-        merged = list(dict.fromkeys(existing + values))
-        cursor[leaf] = merged
-    else:
-        cursor[leaf] = values
+def engine_choice(requested: Optional[str] = None) -> str:
+    """Resolve a requested engine (or ``DEFAULT_ENGINE``) to an available choice."""
+
+    choice = requested or SETTINGS.DEFAULT_ENGINE
+    if choice == "auto":
+        choice = "accurate" if "accurate" in _BASE_ENGINES else "fast"
+    if choice not in ENGINE_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown engine {choice}")
+    if choice not in _BASE_ENGINES:
+        raise HTTPException(status_code=503, detail=f"The {choice} engine is not available on this server")
+    return choice
+
+
+def _engine_for_ruleset(name: str, ruleset: Dict[str, Any], choice: str) -> RuleEngine:
+    engine = _PRESET_ENGINES.get((name, choice))
+    if engine is not None:
+        return engine
+    with _ENGINE_LOCK:
+        if (name, choice) not in _PRESET_ENGINES:
+            _PRESET_ENGINES[(name, choice)] = _build_engine(ruleset, choice)
+        return _PRESET_ENGINES[(name, choice)]
+
+
+def _build_engine(ruleset: Dict[str, Any], choice: str) -> RuleEngine:
+    # Presets only add terms, so layer them over the shared base engine
+    # instead of rebuilding the pipeline and every lexicon per preset.
+    base = _BASE_ENGINES[choice]
+    return base.overlay(ruleset.get("lexicons") or {}, ruleset.get("exceptions") or {})
+
+
+def maybe_recycle_engines() -> bool:
+    """Rebuild base engines in the background once their vocab has outgrown its budget.
+
+    spaCy interns every new token string in the shared vocab for the life of
+    the pipeline, so a long-running worker grows without bound. Past
+    ``VOCAB_RECYCLE_STRINGS`` new strings a fresh engine is built off the
+    request path and swapped in; requests already holding the old engine
+    finish on it, and it is freed once the last one returns.
+    """
+
+    limit = SETTINGS.VOCAB_RECYCLE_STRINGS
+    if not limit:
+        return False
+    grown = [
+        choice
+        for choice, engine in _BASE_ENGINES.items()
+        if engine.vocab_size() - _VOCAB_BASELINES[choice] >= limit
+    ]
+    if not grown:
+        return False
+    with _ENGINE_LOCK:
+        if _RECYCLE_STATE["running"]:
+            return False
+        _RECYCLE_STATE["running"] = True
+    threading.Thread(target=_recycle_engines, args=(grown,), name="engine-recycle", daemon=True).start()
+    return True
+
+
+def _recycle_engines(choices: List[str]) -> None:
+    try:
+        for choice in choices:
+            engine = _new_engine(_BASE_CATEGORIES, _BASE_EXCEPTIONS, choice)
+            with _ENGINE_LOCK:
+                _BASE_ENGINES[choice] = engine
+                _VOCAB_BASELINES[choice] = engine.vocab_size()
+                # Preset overlays are rebuilt on the new base when next used.
+                for key in [key for key in _PRESET_ENGINES if key[1] == choice]:
+                    del _PRESET_ENGINES[key]
+                _RECYCLE_STATE["count"] += 1
+    finally:
+        _RECYCLE_STATE["running"] = False
+
+
+def engine_stats() -> Dict[str, int]:
+    """Vocab and recycling figures for the metrics endpoint."""
+
+    return {
+        "vocab_strings": sum(engine.vocab_size() for engine in _BASE_ENGINES.values()),
+        "vocab_growth": max(
+            (engine.vocab_size() - _VOCAB_BASELINES[choice] for choice, engine in _BASE_ENGINES.items()),
+            default=0,
+        ),
+        "recycles": _RECYCLE_STATE["count"],
+        "preset_engines": len(_PRESET_ENGINES),
+    }
+
+
+def scheduler_stats() -> Dict[str, int]:
+    """Scheduler queue depths for the metrics endpoint."""
+
+    return _SCHEDULER.stats()
+
 
+def request_priority(payload: CodePayload) -> str:
+    """Small batches are interactive unless the caller marks them bulk; large ones are always bulk."""
 
-def _engine_for_ruleset(name: str, ruleset: Dict[str, Any]) -> RuleEngine:
-    if name in _PRESET_ENGINES:
-        return _PRESET_ENGINES[name]
+    if payload.priority == scheduling.BULK or len(payload.rows) > SETTINGS.INTERACTIVE_MAX_ROWS:
+        return scheduling.BULK
+    return scheduling.INTERACTIVE
 
-    cats = deepcopy(_BASE_CATEGORIES)
-    excs = deepcopy(_BASE_EXCEPTIONS)
 
-    for key, vals in (ruleset.get("lexicons") or {}).items():
-        _merge_dotted(cats, key, list(vals))
-    for key, vals in (ruleset.get("exceptions") or {}).items():
-        _merge_dotted(excs, key, list(vals))
+def request_tenant(api_key: Optional[str], preset: Optional[str]) -> Tuple[str, str]:
+    """Fair-sharing key: the caller's API key, else the preset."""
 
-    engine = RuleEngine(cats, excs)
-    _PRESET_ENGINES[name] = engine
-    return engine
+    return ("key", api_key) if api_key else ("preset", preset or "ad-hoc")
+
+
+def warm_engines() -> int:
+    """Build engines for every cached preset, e.g. in a prefork master before forking."""
+
+    presets = get_presets_cache()
+    for name, ruleset in presets.items():
+        for choice in _BASE_ENGINES:
+            _engine_for_ruleset(name, ruleset, choice)
+    return len(presets)
+
+
+def fallback_engine(preset: Optional[str], choice: str) -> Optional[RuleEngine]:
+    """The fast engine for ``preset`` that deadline-degraded rows use; ``None`` if ``choice`` is already fast."""
+
+    if choice == "fast" or "fast" not in _BASE_ENGINES:
+        return None
+    if preset is None:
+        return _BASE_ENGINES["fast"]
+    return _engine_for_ruleset(preset, get_presets_cache()[preset], "fast")
 
 
 def clear_preset_engines() -> None:
@@ -65,8 +209,10 @@ def clear_preset_engines() -> None:
     _PRESET_ENGINES.clear()
 
 
-@router.post("/code", response_model=Dict[str, Any])
-def code_rows(payload: CodePayload) -> Dict[str, Any]:
+def resolve_request(payload: CodePayload) -> Tuple[RuleEngine, Tuple[str, ...], str]:
+    """Return the engine, category selection, and preset version for a payload."""
+
+    choice = engine_choice(payload.engine)
     presets = get_presets_cache()
     ruleset = None
     preset_version = "ad-hoc"
@@ -78,21 +224,146 @@ def code_rows(payload: CodePayload) -> Dict[str, Any]:
         preset_version = payload.preset.split("@")[-1]
 
     if ruleset is None:
-        engine = _DEFAULT_ENGINE
+        engine = _BASE_ENGINES[choice]
     else:
         assert payload.preset is not None  # for type-checkers
-        engine = _engine_for_ruleset(payload.preset, ruleset)
+        engine = _engine_for_ruleset(payload.preset, ruleset, choice)
+
+    # Per-request selection wins over a preset that opts in to selecting its meta.categories.
+    categories = payload.categories
+    if categories is None:
+        categories = preset_categories(ruleset)
+    try:
+        selected = resolve_categories(categories)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return engine, selected, preset_version
+
+
+@router.post("/code", response_model=Dict[str, Any])
+def code_rows(
+    payload: CodePayload,
+    accept: str = Header(default=responses.JSON),
+    x_api_key: Optional[str] = Header(default=None),
+) -> Response:
+    media_type = responses.negotiate(accept)
+    if media_type == responses.MSGPACK and responses.msgpack is None:
+        raise HTTPException(status_code=406, detail="msgpack is not installed on this server")
+    if payload.store and not SETTINGS.RESULTS_DB:
+        raise HTTPException(status_code=400, detail="RESULTS_DB is not configured on this server")
+    started = time.monotonic()
 
-    results = []
-    for row in payload.rows:
-        analysis = engine.analyze_text(row.text)
-        results.append(
+    if payload.continuation:
+        try:
+            state = deadline.decode_continuation(payload.continuation)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        # A resumed batch is coded with the options it started with.
+        payload.preset = state.get("preset")
+        payload.engine = state.get("engine")
+        payload.categories = state.get("categories")
+        payload.codes_only = bool(state.get("codes_only"))
+        allowed = set(state["rows"])
+        unknown = [str(row.row) for row in payload.rows if row.row not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Rows not pending in this continuation: {', '.join(unknown)}")
+
+    engine, selected, preset_version = resolve_request(payload)
+    choice = engine_choice(payload.engine)
+    texts = [row.text for row in payload.rows]
+    priority = request_priority(payload)
+    tenant = request_tenant(x_api_key, payload.preset)
+
+    def run(eng: RuleEngine, batch: List[str]) -> List[Dict[str, Any]]:
+        # Only requests scheduled alike share a batch: the batch runs under one priority and tenant.
+        return _COALESCER.run(
+            (payload.preset, eng.backend, selected, payload.codes_only, priority, tenant),
+            _SCHEDULER.bind(deadline.ObservedEngine(eng), priority, tenant),
+            batch,
+            categories=selected,
+            codes_only=payload.codes_only,
+        )
+
+    budget_ms = payload.deadline_ms if payload.deadline_ms is not None else SETTINGS.DEADLINE_MS
+    rows = payload.rows
+    pending: List[int] = []
+    if budget_ms > 0:
+        mode = payload.on_deadline or SETTINGS.DEADLINE_FALLBACK
+        fallback = fallback_engine(payload.preset, choice) if mode == "fast" else None
+        coded, coded_backends, pending = deadline.code_within(
+            started + budget_ms / 1000, engine, fallback, texts, run
+        )
+        skip = set(pending)
+        rows = [row for i, row in enumerate(payload.rows) if i not in skip]
+        analyses = [result for result in coded if result is not None]
+        backends = [backend for backend in coded_backends if backend is not None]
+    else:
+        analyses = run(engine, texts)
+        backends = [engine.backend] * len(analyses)
+    maybe_recycle_engines()
+    if payload.store:
+        for backend in sorted(set(backends)):
+            store_results(
+                (
+                    (row.new_id, row.row, coded)
+                    for row, coded, row_backend in zip(rows, analyses, backends)
+                    if row_backend == backend
+                ),
+                SETTINGS.ENGINE_VERSION,
+                preset_version,
+                backend,
+            )
+
+    if media_type == responses.JSON:
+        body = responses.row_layout(
+            rows, analyses, SETTINGS.ENGINE_VERSION, preset_version, engine.backend, backends
+        )
+    else:
+        body = responses.columnar_layout(
+            rows,
+            analyses,
+            columns_for(selected, payload.codes_only),
+            SETTINGS.ENGINE_VERSION,
+            preset_version,
+            engine.backend,
+        )
+    degraded = [row.row for row, backend in zip(rows, backends) if backend != engine.backend]
+    if degraded:
+        body["degraded"] = degraded
+    if pending:
+        pending_rows = [payload.rows[i].row for i in pending]
+        body["pending"] = pending_rows
+        body["continuation"] = deadline.encode_continuation(
             {
-                "row": row.row,
-                "code_version": SETTINGS.ENGINE_VERSION,
-                "preset_version": preset_version,
-                "coded": analysis,
+                "preset": payload.preset,
+                "engine": choice,
+                "categories": list(selected),
+                "codes_only": payload.codes_only,
+                "rows": pending_rows,
             }
         )
+    return responses.encode(body, media_type)
 
-    return {"results": results}
+
+@router.post("/code/summary", response_model=Dict[str, Any])
+def code_summary(payload: CodePayload, x_api_key: Optional[str] = Header(default=None)) -> Response:
+    """Code rows in batches, returning only mergeable corpus-level aggregates."""
+
+    engine, selected, preset_version = resolve_request(payload)
+    scheduled = _SCHEDULER.bind(engine, scheduling.BULK, request_tenant(x_api_key, payload.preset))
+    summary = CorpusSummary()
+    for start in range(0, len(payload.rows), _SUMMARY_BATCH_ROWS):
+        batch = payload.rows[start : start + _SUMMARY_BATCH_ROWS]
+        summary.update(
+            scheduled.analyze_texts(
+                [row.text for row in batch], categories=selected, codes_only=payload.codes_only
+            )
+        )
+    maybe_recycle_engines()
+    body = {
+        "code_version": SETTINGS.ENGINE_VERSION,
+        "backend": engine.backend,
+        "preset_version": preset_version,
+        "summary": summary.to_dict(),
+    }
+    return responses.encode(body, responses.JSON)
@@ -0,0 +1,54 @@
+"""Admin-only profiling of the coding path."""
+from __future__ import annotations
+
+from typing import Any, Dict
+import hmac
+import threading
+
+from fastapi import APIRouter, Header, HTTPException
+
+from .deps import SETTINGS
+from .models import CodePayload
+from .router_code import resolve_request
+from src.profiling import StageProfiler, top_functions
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+# cProfile and tracemalloc are process-wide; profile one request at a time.
+_PROFILE_LOCK = threading.Lock()
+
+
+def _require_admin(token: str) -> None:
+    if not SETTINGS.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(token.encode(), SETTINGS.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/profile", response_model=Dict[str, Any])
+def profile_code(
+    payload: CodePayload,
+    limit: int = 30,
+    sort: str = "cumulative",
+    x_admin_token: str = Header(default=""),
+) -> Dict[str, Any]:
+    """Code ``payload`` like ``/code`` under cProfile and report the top functions."""
+
+    _require_admin(x_admin_token)
+    with _PROFILE_LOCK:
+        with StageProfiler() as profiler:
+            with profiler.stage("engine"):
+                engine, selected, preset_version = resolve_request(payload)
+            with profiler.stage("code"):
+                engine.analyze_texts(
+                    [row.text for row in payload.rows],
+                    categories=selected,
+                    codes_only=payload.codes_only,
+                )
+    return {
+        "rows": len(payload.rows),
+        "preset_version": preset_version,
+        "backend": engine.backend,
+        "stages": profiler.stages,
+        "top_functions": top_functions(profiler.profile, limit, sort),
+    }
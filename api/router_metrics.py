@@ -0,0 +1,98 @@
+"""Prometheus text-format gauges for worker memory and engine state."""
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from .router_code import engine_stats, scheduler_stats
+
+router = APIRouter(prefix="", tags=["metrics"])
+
+# name -> (help text, reader); readers return None when a value is unavailable.
+_GAUGES: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+
+
+def register_gauge(name: str, help_text: str, read: Callable[[], Optional[float]]) -> None:
+    _GAUGES[name] = (help_text, read)
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only)."""
+
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+register_gauge("textcoder_rss_bytes", "Resident set size of the worker process.", rss_bytes)
+register_gauge(
+    "textcoder_vocab_strings",
+    "Strings interned in the NLP vocabs, summed over the base engines.",
+    lambda: engine_stats()["vocab_strings"],
+)
+register_gauge(
+    "textcoder_vocab_growth_strings",
+    "Most strings any base engine has interned since it was last built.",
+    lambda: engine_stats()["vocab_growth"],
+)
+register_gauge(
+    "textcoder_engine_recycles",
+    "Times the engines were rebuilt to release vocab growth.",
+    lambda: engine_stats()["recycles"],
+)
+register_gauge(
+    "textcoder_preset_engines",
+    "Preset engines currently cached.",
+    lambda: engine_stats()["preset_engines"],
+)
+
+register_gauge(
+    "textcoder_interactive_requests",
+    "Interactive /code requests being coded.",
+    lambda: scheduler_stats()["interactive_requests"],
+)
+register_gauge(
+    "textcoder_queue_bulk_slices",
+    "Bulk slices waiting for a scheduler thread.",
+    lambda: scheduler_stats()["bulk_slices"],
+)
+register_gauge(
+    "textcoder_interactive_rows",
+    "Rows in interactive /code requests being coded.",
+    lambda: scheduler_stats()["interactive_rows"],
+)
+register_gauge(
+    "textcoder_queue_bulk_rows",
+    "Rows in waiting bulk slices.",
+    lambda: scheduler_stats()["bulk_rows"],
+)
+register_gauge(
+    "textcoder_queue_tenants",
+    "API keys or presets with bulk work waiting.",
+    lambda: scheduler_stats()["tenants"],
+)
+register_gauge(
+    "textcoder_scheduler_active_slices",
+    "Bulk slices being coded right now.",
+    lambda: scheduler_stats()["active"],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    """Current gauge values in the Prometheus text exposition format."""
+
+    lines = []
+    for name, (help_text, read) in _GAUGES.items():
+        value = read()
+        if value is None:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -1,16 +1,14 @@
 """Routers for preset discovery, validation, and lexicon extension."""
 from __future__ import annotations
 
-from pathlib import Path
 from typing import Any, Dict, List
-import json
 
 from fastapi import APIRouter, HTTPException
-from jsonschema import ValidationError, validate
 
-from .deps import SETTINGS, get_presets_cache, load_british_american_map
-from .lexicon_extender import apply_extenders
+from .deps import SETTINGS, get_corpus_frequencies, get_presets_cache, get_spelling_index
+from .lexicon_extender import apply_extenders, candidate_terms
 from .models import ExtendPayload, ExtendResult
+from .preset_validation import validate_payload, validate_preset_dir
 
 router = APIRouter(prefix="", tags=["presets"])
 
@@ -23,15 +21,21 @@ def list_presets() -> Dict[str, List[str]]:
 
 @router.post("/validate_preset", response_model=Dict[str, Any])
 def validate_preset(payload: Dict[str, Any]) -> Dict[str, Any]:
-    schema_path = Path(SETTINGS.SCHEMA_PATH)
-    if not schema_path.exists():
-        raise HTTPException(status_code=500, detail="Schema not found")
-    schema = json.loads(schema_path.read_text(encoding="utf-8"))
     try:
-        validate(payload, schema)
-    except ValidationError as exc:  # pragma: no cover - hard to trigger deterministically
-        return {"ok": False, "error": str(exc), "path": list(exc.path)}
-    return {"ok": True}
+        return validate_payload(payload)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=500, detail=f"Not found: {exc}") from exc
+
+
+@router.get("/validate_presets", response_model=Dict[str, Any])
+def validate_presets() -> Dict[str, Any]:
+    """Validate every preset file in ``PRESET_DIR``, sequentially in this worker."""
+
+    try:
+        results = validate_preset_dir(workers=1)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=500, detail=f"Not found: {exc}") from exc
+    return {"ok": all(result["ok"] for result in results), "results": results}
 
 
 @router.post("/extend_lexicon", response_model=ExtendResult)
@@ -57,14 +61,31 @@ def extend_lexicon(payload: ExtendPayload) -> ExtendResult:
         merged_exceptions.setdefault(key, [])
         merged_exceptions[key] = sorted({*merged_exceptions[key], *values})
 
-    br_am = load_british_american_map()
+    index = get_spelling_index()
+    policy = payload.policy or {}
+    combined_entries = [
+        (key, terms)
+        for key, terms in list(merged.items()) + list(merged_exceptions.items())
+        if not payload.categories or any(key.startswith(cat) for cat in payload.categories)
+    ]
+    frequencies = None
+    if policy.get("use_corpus", True):
+        candidates = candidate_terms(
+            (term for _, terms in combined_entries for term in terms), {}, index, SETTINGS.NORMALIZE_SPELLING
+        )
+        frequencies = get_corpus_frequencies(candidates)
+    min_count = int(policy.get("min_count", 0)) if frequencies is not None else 0
+    notes: List[str] = []
+    if frequencies is not None:
+        notes.append("Proposals ranked by frequency in coded corpora.")
+    if SETTINGS.NORMALIZE_SPELLING:
+        notes.append("Spelling and hyphen variants omitted: the engine normalizes them at match time.")
 
     proposed: Dict[str, List[Dict[str, Any]]] = {}
-    combined_entries = list(merged.items()) + list(merged_exceptions.items())
     for key, terms in combined_entries:
-        if payload.categories and not any(key.startswith(cat) for cat in payload.categories):
-            continue
-        proposals = apply_extenders(terms, br_am)
+        proposals = apply_extenders(
+            terms, {}, frequencies, min_count, index=index, normalized=SETTINGS.NORMALIZE_SPELLING
+        )
         flat: List[Dict[str, Any]] = []
         seen = {term.lower() for term in terms}
         for base_term, items in proposals.items():
@@ -72,9 +93,11 @@ def extend_lexicon(payload: ExtendPayload) -> ExtendResult:
                 term_value = item["term"]
                 if term_value.lower() in seen:
                     continue
-                flat.append({"term": term_value, "source": item["source"], "base": base_term})
+                flat.append({**item, "base": base_term})
                 seen.add(term_value.lower())
+        if frequencies is not None:
+            flat.sort(key=lambda entry: -entry["count"])
         if flat:
             proposed[key] = flat
 
-    return ExtendResult(proposed=proposed, conflicts=[], notes=[])
+    return ExtendResult(proposed=proposed, conflicts=[], notes=notes)
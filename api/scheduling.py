@@ -0,0 +1,161 @@
+"""Priority scheduling of engine work between interactive and bulk ``/code`` traffic.
+
+Interactive work (small batches) runs directly on the request thread. Bulk
+batches are cut into slices and coded by a small pool of scheduler threads,
+which hold back new slices while interactive work is in flight, so a bulk
+job delays an interactive request by at most the slices already running.
+(Handing interactive work to a scheduler thread costs a GIL handoff each
+way, which under load outweighs the queueing it saves.) Bulk tenants (API
+keys, or presets for anonymous callers) take turns one slice at a time, so
+a large job from one tenant cannot crowd out another's. Bulk work is never
+starved: after ``bulk_every`` interactive requests it gets a slice anyway.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+import threading
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+_Job = Tuple[Callable[..., List[Dict[str, Any]]], Sequence[str], Dict[str, Any], Future]
+
+
+class Scheduler:
+    """Run interactive calls inline and bulk slices on ``workers`` threads, tenants in turn.
+
+    With ``workers`` set to 0 every call runs directly on the caller's thread.
+    """
+
+    def __init__(self, workers: int, slice_rows: int, bulk_every: int = 8) -> None:
+        self.workers = workers
+        self.slice_rows = slice_rows
+        self.bulk_every = bulk_every
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[Hashable, Deque[_Job]]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._interactive = 0
+        self._interactive_rows = 0
+        self._since_bulk = 0
+        self._active = 0
+
+    def bind(self, engine: Any, priority: str, tenant: Hashable) -> "ScheduledEngine":
+        return ScheduledEngine(self, engine, priority, tenant)
+
+    def run(
+        self,
+        priority: str,
+        tenant: Hashable,
+        fn: Callable[..., List[Dict[str, Any]]],
+        texts: Sequence[str],
+        **options: Any,
+    ) -> List[Dict[str, Any]]:
+        """``fn(texts, **options)``, scheduled; bulk work is split into ``slice_rows`` slices."""
+
+        if self.workers <= 0:
+            return fn(texts, **options)
+        if priority != BULK:
+            return self._run_interactive(fn, texts, options)
+        step = self.slice_rows if self.slice_rows > 0 else max(len(texts), 1)
+        futures = []
+        with self._cond:
+            self._start_workers()
+            queue = self._queues.setdefault(tenant, deque())
+            for i in range(0, max(len(texts), 1), step):
+                future: Future = Future()
+                queue.append((fn, texts[i : i + step], options, future))
+                futures.append(future)
+            self._cond.notify_all()
+        out: List[Dict[str, Any]] = []
+        for future in futures:
+            out.extend(future.result())
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        """Interactive requests and rows in flight, waiting bulk slices, rows and tenants, running slices."""
+
+        with self._cond:
+            return {
+                "interactive_requests": self._interactive,
+                "interactive_rows": self._interactive_rows,
+                "bulk_slices": sum(len(jobs) for jobs in self._queues.values()),
+                "bulk_rows": sum(len(job[1]) for jobs in self._queues.values() for job in jobs),
+                "tenants": len(self._queues),
+                "active": self._active,
+            }
+
+    def _run_interactive(
+        self, fn: Callable[..., List[Dict[str, Any]]], texts: Sequence[str], options: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        with self._cond:
+            self._interactive += 1
+            self._interactive_rows += len(texts)
+            if self._queues:
+                self._since_bulk += 1
+        try:
+            return fn(texts, **options)
+        finally:
+            with self._cond:
+                self._interactive -= 1
+                self._interactive_rows -= len(texts)
+                self._cond.notify_all()
+
+    def _start_workers(self) -> None:
+        # Started on first use, so a prefork master never owns the threads.
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"scheduler-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self) -> Optional[_Job]:
+        if not self._queues:
+            return None
+        if self._interactive and not (self.bulk_every > 0 and self._since_bulk >= self.bulk_every):
+            return None
+        tenant, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        del self._queues[tenant]
+        if jobs:  # back of the line: tenants take turns
+            self._queues[tenant] = jobs
+        self._since_bulk = 0
+        return job
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next()
+                self._active += 1
+            fn, texts, options, future = job
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(texts, **options))
+                    except BaseException as exc:
+                        future.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._active -= 1
+
+
+class ScheduledEngine:
+    """An engine whose ``analyze_texts`` goes through a scheduler under one priority and tenant."""
+
+    def __init__(self, scheduler: Scheduler, engine: Any, priority: str, tenant: Hashable) -> None:
+        self.scheduler = scheduler
+        self.engine = engine
+        self.priority = priority
+        self.tenant = tenant
+
+    @property
+    def backend(self) -> str:
+        return self.engine.backend
+
+    def analyze_texts(self, texts: Sequence[str], **options: Any) -> List[Dict[str, Any]]:
+        return self.scheduler.run(self.priority, self.tenant, self.engine.analyze_texts, texts, **options)
@@ -1,12 +1,32 @@
 import argparse
+import json
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
-import pandas as pd
 import yaml
 
-from io_utils import load_sheet, save_df
-from rules import RuleEngine
+from io_utils import iter_column, iter_frames, save_coded, sheet_columns
+from profiling import StageProfiler
+import recode
+from rules import (
+    DEFAULT_CHUNK_CHARS,
+    ENGINE_BACKENDS,
+    ENGINE_VERSION,
+    RuleEngine,
+    columns_for,
+    load_nlp,
+    preset_categories,
+    resolve_categories,
+)
+import sharding
+from sinks import SQLiteSink
+from summary import CorpusSummary
+
+CONFIG_FILES = ("config/categories.yml", "config/exceptions.yml")
+SPELLING_FILE = "configs/british_american.yml"
+SHARD_COMMANDS = ("shard", "run-shard", "merge")
+RECODE_COMMAND = "recode"
 
 OUTPUT_COLUMNS = [
     "agent_supernatural",
@@ -38,34 +58,385 @@ OUTPUT_COLUMNS = [
 
 
 def load_cfgs():
-    with open("config/categories.yml", "r", encoding="utf-8") as f:
+    with open(CONFIG_FILES[0], "r", encoding="utf-8") as f:
         cats = yaml.safe_load(f)
-    with open("config/exceptions.yml", "r", encoding="utf-8") as f:
+    with open(CONFIG_FILES[1], "r", encoding="utf-8") as f:
         exc = yaml.safe_load(f)
     return cats, exc
 
 
+def build_engine(engine="auto", chunk_chars=DEFAULT_CHUNK_CHARS, n_process=1, normalize_spelling=False, fuzzy=0):
+    """Engine for ``engine`` ("fast", "accurate", or "auto": spaCy when installed)."""
+
+    cats, exc = load_cfgs()
+    spelling = None
+    if normalize_spelling:
+        with open(SPELLING_FILE, "r", encoding="utf-8") as f:
+            spelling = yaml.safe_load(f) or {}
+    backend = "auto" if engine == "auto" else ENGINE_BACKENDS[engine]
+    return RuleEngine(
+        cats,
+        exc,
+        chunk_chars=chunk_chars,
+        n_process=n_process,
+        nlp=load_nlp(backend),
+        spelling=spelling,
+        fuzzy=fuzzy,
+    )
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in SHARD_COMMANDS:
+        shard_main(sys.argv[1:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == RECODE_COMMAND:
+        recode_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser()
     parser.add_argument("--in_file", required=True)
     parser.add_argument("--text_col", default="text")
     parser.add_argument("--out_file", default=None)
+    parser.add_argument(
+        "--categories",
+        default=None,
+        help="Comma-separated categories to code (default: all), e.g. sensorimotor,agent",
+    )
+    parser.add_argument(
+        "--codes_only",
+        action="store_true",
+        help="Write only the code columns, skipping the reason_* explanations",
+    )
+    parser.add_argument(
+        "--chunk_chars",
+        type=int,
+        default=DEFAULT_CHUNK_CHARS,
+        help="Texts longer than this are parsed in chunks and merged back",
+    )
+    parser.add_argument("--n_process", type=int, default=1, help="Worker processes for chunk parsing")
+    parser.add_argument(
+        "--engine",
+        choices=["auto", *ENGINE_BACKENDS],
+        default="auto",
+        help="fast: lightweight tokenizer/matchers; accurate: full spaCy parse (default: spaCy when installed)",
+    )
+    parser.add_argument(
+        "--normalize_spelling",
+        action="store_true",
+        help=f"Fold British/American spellings ({SPELLING_FILE}) and hyphens before lexicon lookups",
+    )
+    parser.add_argument(
+        "--fuzzy",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Read unknown words within N edits of a lexicon term as that term (0: exact matching only)",
+    )
+    parser.add_argument(
+        "--keep_cols",
+        default=None,
+        help="Comma-separated input columns to copy to the output, e.g. id,text (default: all)",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Stream rows and write only corpus-level aggregates as JSON",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run under cProfile/tracemalloc; writes <out>.prof and <out>.alloc.txt (also with --summary/--out_db)",
+    )
+    parser.add_argument(
+        "--out_db",
+        default=None,
+        help="Upsert coded rows into this SQLite file instead of writing a CSV",
+    )
+    parser.add_argument("--id_col", default="new_id", help="Row id for --out_db (#row:<row number> when absent or blank)")
     args = parser.parse_args()
 
-    df = load_sheet(args.in_file)
-    if args.text_col not in df.columns:
+    categories = args.categories.split(",") if args.categories else None
+    try:
+        columns = [col for col in OUTPUT_COLUMNS if col in columns_for(categories, args.codes_only)]
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+
+    profiler = StageProfiler() if args.profile else None
+    with profiler if profiler is not None else nullcontext():
+        stage = profiler.stage if profiler is not None else (lambda name: nullcontext())
+        if args.summary:
+            out_file = args.out_file or f"data/processed/summary_{Path(args.in_file).stem}.json"
+            write_summary(args, categories, out_file, stage)
+        elif args.out_db:
+            out_file = args.out_db
+            write_db(args, categories, out_file, stage)
+        else:
+            out_file = args.out_file or f"data/processed/coded_{Path(args.in_file).stem}.csv"
+            write_csv(args, categories, columns, out_file, stage)
+
+    if profiler is not None:
+        base = str(Path(out_file).with_suffix(""))
+        profiler.dump_stats(f"{base}.prof")
+        summary = profiler.allocation_summary()
+        Path(f"{base}.alloc.txt").write_text(summary + "\n", encoding="utf-8")
+        print(summary, file=sys.stderr)
+        print(f"Wrote {base}.prof and {base}.alloc.txt", file=sys.stderr)
+
+
+def write_csv(args, categories, columns, out_file, stage):
+    """Code the text column and write it with the passthrough columns as CSV."""
+
+    # Only the header is read up front; the text column is streamed for
+    # coding and passthrough columns are re-read when the output is written.
+    with stage("load"):
+        header = sheet_columns(args.in_file)
+    keep = [col for col in args.keep_cols.split(",") if col] if args.keep_cols else None
+    missing = [col for col in [args.text_col, *(keep or [])] if col not in header]
+    if missing:
+        print(f"Missing column: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    with stage("engine"):
+        engine = build_engine(args.engine, args.chunk_chars, args.n_process, args.normalize_spelling, args.fuzzy)
+
+    with stage("code"):
+        coded_rows = []
+        for texts in iter_column(args.in_file, args.text_col):
+            coded_rows.extend(engine.analyze_texts(texts, categories, args.codes_only))
+
+    with stage("write"):
+        save_coded(args.in_file, out_file, coded_rows, columns, keep)
+    print(f"Wrote {out_file} ({engine.backend} backend)")
+
+
+def write_summary(args, categories, out_file, stage):
+    """Code the text column chunk by chunk, keeping only running aggregates."""
+
+    with stage("engine"):
+        engine = build_engine(args.engine, args.chunk_chars, args.n_process, args.normalize_spelling, args.fuzzy)
+    summary = CorpusSummary()
+    with stage("code"):
+        try:
+            for texts in iter_column(args.in_file, args.text_col):
+                summary.update(engine.analyze_texts(texts, categories, args.codes_only))
+        except KeyError:
+            print(f"Missing column: {args.text_col}", file=sys.stderr)
+            sys.exit(1)
+
+    with stage("write"):
+        out_path = Path(out_file)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps({**summary.to_dict(), "backend": engine.backend}, indent=2), encoding="utf-8")
+    print(f"Wrote {out_file} ({engine.backend} backend)")
+
+
+def write_db(args, categories, out_db, stage):
+    """Stream coded rows into ``out_db``, upserted by id, engine version, and preset version."""
+
+    with stage("load"):
+        header = sheet_columns(args.in_file)
+    if args.text_col not in header:
         print(f"Missing column: {args.text_col}", file=sys.stderr)
         sys.exit(1)
+    id_col = args.id_col if args.id_col in header else None
+    wanted = [args.text_col] + ([id_col] if id_col and id_col != args.text_col else [])
+    with stage("engine"):
+        engine = build_engine(args.engine, args.chunk_chars, args.n_process, args.normalize_spelling, args.fuzzy)
+    row = 0
+    # Coding and upserts are interleaved chunk by chunk, so they share one stage.
+    with stage("code"), SQLiteSink(out_db) as sink:
+        for frame in iter_frames(args.in_file, wanted):
+            coded = engine.analyze_texts(frame[args.text_col].tolist(), categories, args.codes_only)
+            ids = frame[id_col].tolist() if id_col else [""] * len(frame)
+            sink.write(
+                ((new_id, row + i, codes) for i, (new_id, codes) in enumerate(zip(ids, coded))),
+                ENGINE_VERSION,
+                "ad-hoc",
+                engine.backend,
+            )
+            row += len(frame)
+    print(f"Upserted {row} rows into {out_db} ({engine.backend} backend)")
 
-    cats, exc = load_cfgs()
-    engine = RuleEngine(cats, exc)
 
-    coded_rows = [engine.analyze_text(str(text)) for text in df[args.text_col].fillna("")]
-    coded_df = pd.concat([df, pd.DataFrame(coded_rows)[OUTPUT_COLUMNS]], axis=1)
+def _shard_fingerprint(manifest):
+    spelling = SPELLING_FILE if manifest["options"]["normalize_spelling"] else None
+    return sharding.fingerprint([*CONFIG_FILES, manifest["preset"], spelling], manifest["options"])
+
+
+def shard_main(argv):
+    """``shard`` / ``run-shard`` / ``merge``: code a corpus as independent shards on shared storage."""
+
+    parser = argparse.ArgumentParser(prog="analyze.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split = commands.add_parser("shard", help="Hash-partition an input into shards with a manifest")
+    split.add_argument("--in_file", required=True)
+    split.add_argument("--text_col", default="text")
+    split.add_argument("--shards", type=int, required=True)
+    split.add_argument("--out_dir", default=None, help="Default: data/shards/<input name>")
+    split.add_argument("--key_col", default=None, help="Partition by this column (default: row number)")
+    split.add_argument("--preset", default=None, help="Preset JSON whose lexicons and exceptions are added")
+    split.add_argument("--categories", default=None, help="Default: the preset's selection, else all")
+    split.add_argument("--codes_only", action="store_true")
+    split.add_argument("--chunk_chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    split.add_argument("--engine", choices=["auto", *ENGINE_BACKENDS], default="auto")
+    split.add_argument("--normalize_spelling", action="store_true")
+    split.add_argument("--fuzzy", type=int, default=0)
+
+    run = commands.add_parser("run-shard", help="Code one shard")
+    run.add_argument("--manifest", required=True)
+    run.add_argument("--shard", type=int, required=True)
+    run.add_argument("--n_process", type=int, default=1)
+
+    merge = commands.add_parser("merge", help="Check fingerprints and reassemble coded shards in input order")
+    merge.add_argument("--manifest", required=True)
+    merge.add_argument("--out_file", default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "shard":
+        header = sheet_columns(args.in_file)
+        missing = [col for col in (args.text_col, args.key_col) if col and col not in header]
+        if missing:
+            print(f"Missing column: {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        preset = json.loads(Path(args.preset).read_text(encoding="utf-8")) if args.preset else {}
+        categories = args.categories.split(",") if args.categories else preset_categories(preset)
+        try:
+            selected = list(resolve_categories(categories))
+        except ValueError as exc:
+            print(str(exc), file=sys.stderr)
+            sys.exit(1)
+        out_dir = Path(args.out_dir or f"data/shards/{Path(args.in_file).stem}")
+        manifest = {
+            "in_file": str(args.in_file),
+            "text_col": args.text_col,
+            "key_col": args.key_col,
+            "preset": args.preset,
+            "options": {
+                "categories": selected,
+                "codes_only": args.codes_only,
+                "chunk_chars": args.chunk_chars,
+                "engine": args.engine,
+                "normalize_spelling": args.normalize_spelling,
+                "fuzzy": args.fuzzy,
+            },
+            "shards": sharding.write_shards(args.in_file, out_dir, args.shards, args.key_col),
+        }
+        manifest["fingerprint"] = _shard_fingerprint(manifest)
+        path = sharding.write_manifest(out_dir, manifest)
+        print(f"Wrote {args.shards} shards ({sum(s['rows'] for s in manifest['shards'])} rows) and {path}")
+        return
+
+    manifest_path = Path(args.manifest)
+    manifest = sharding.load_manifest(manifest_path)
+    shard_dir = manifest_path.parent
+
+    if args.command == "run-shard":
+        if _shard_fingerprint(manifest) != manifest["fingerprint"]:
+            print("Config or preset differs from the manifest fingerprint; refusing to code", file=sys.stderr)
+            sys.exit(1)
+        options = manifest["options"]
+        engine = build_engine(
+            options["engine"],
+            options["chunk_chars"],
+            args.n_process,
+            options["normalize_spelling"],
+            options.get("fuzzy", 0),
+        )
+        if manifest["preset"]:
+            preset = json.loads(Path(manifest["preset"]).read_text(encoding="utf-8"))
+            engine = engine.overlay(preset.get("lexicons") or {}, preset.get("exceptions") or {})
+        columns = [c for c in OUTPUT_COLUMNS if c in columns_for(options["categories"], options["codes_only"])]
+        shard_file = shard_dir / manifest["shards"][args.shard]["file"]
+        coded_rows = []
+        for texts in iter_column(shard_file, manifest["text_col"]):
+            coded_rows.extend(engine.analyze_texts(texts, options["categories"], options["codes_only"]))
+        out = save_coded(shard_file, sharding.shard_path(shard_dir, args.shard, "coded"), coded_rows, columns)
+        done = {"fingerprint": manifest["fingerprint"], "rows": len(coded_rows), "backend": engine.backend}
+        out.with_suffix(".json").write_text(json.dumps(done), encoding="utf-8")
+        print(f"Wrote {out}")
+        return
+
+    coded, backends = [], set()
+    for index, shard in enumerate(manifest["shards"]):
+        path = sharding.shard_path(shard_dir, index, "coded")
+        done_path = path.with_suffix(".json")
+        done = json.loads(done_path.read_text(encoding="utf-8")) if done_path.exists() else None
+        if done is None:
+            print(f"Shard {index} has not been coded", file=sys.stderr)
+            sys.exit(1)
+        if done["fingerprint"] != manifest["fingerprint"] or done["rows"] != shard["rows"]:
+            print(f"Shard {index} was coded with a different config or is incomplete", file=sys.stderr)
+            sys.exit(1)
+        coded.append(path)
+        backends.add(done["backend"])
+    if len(backends) > 1:  # "auto" resolved differently on different machines
+        print(f"Shards were coded with different backends: {', '.join(sorted(backends))}", file=sys.stderr)
+        sys.exit(1)
+    out_file = args.out_file or f"data/processed/coded_{Path(manifest['in_file']).stem}.csv"
+    rows = sharding.merge_outputs(coded, out_file)
+    print(f"Wrote {out_file} ({rows} rows, {backends.pop()} backend)")
+
+
+def recode_main(argv):
+    """``recode``: update coded results for a preset bump, re-running only the affected coders."""
+
+    parser = argparse.ArgumentParser(prog="analyze.py recode")
+    parser.add_argument("--in_file", required=True, help="Results coded with --old_preset (text and code columns)")
+    parser.add_argument("--text_col", default="text")
+    parser.add_argument("--old_preset", required=True)
+    parser.add_argument("--new_preset", required=True)
+    parser.add_argument("--out_file", default=None)
+    parser.add_argument(
+        "--categories",
+        default=None,
+        help="Override both presets' selection (default: meta.categories when select_categories is set, else all)",
+    )
+    parser.add_argument("--codes_only", action="store_true")
+    parser.add_argument("--chunk_chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--n_process", type=int, default=1)
+    parser.add_argument("--engine", choices=["auto", *ENGINE_BACKENDS], default="auto")
+    parser.add_argument("--normalize_spelling", action="store_true")
+    parser.add_argument("--fuzzy", type=int, default=0)
+    parser.add_argument("--dry_run", action="store_true", help="Print the plan without coding")
+    args = parser.parse_args(argv)
+
+    header = sheet_columns(args.in_file)
+    if args.text_col not in header:
+        print(f"Missing column: {args.text_col}", file=sys.stderr)
+        sys.exit(1)
+    old = json.loads(Path(args.old_preset).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new_preset).read_text(encoding="utf-8"))
+    try:
+        categories = args.categories.split(",") if args.categories else None
+        plan = recode.plan(old, new, args.fuzzy, header, args.codes_only, categories)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+    print(f"Changed keys: {', '.join(plan['lexicons'] + plan['exceptions']) or 'none'}")
+    print(f"Re-coding: {', '.join(plan['recode']) or 'nothing'}; carrying over: {', '.join(plan['carry']) or 'nothing'}")
+    if args.dry_run:
+        return
 
-    out_file = args.out_file or f"data/processed/coded_{Path(args.in_file).stem}.csv"
-    save_df(coded_df, out_file)
-    print(f"Wrote {out_file}")
+    columns = [c for c in OUTPUT_COLUMNS if c in columns_for(plan["categories"], args.codes_only)]
+    carried = list(recode.carried_columns(plan, args.codes_only))
+    engine = None
+    if plan["recode"]:
+        engine = build_engine(args.engine, args.chunk_chars, args.n_process, args.normalize_spelling, args.fuzzy)
+        engine = engine.overlay(new.get("lexicons") or {}, new.get("exceptions") or {})
+    rows = []
+    for frame in iter_frames(args.in_file, [args.text_col, *carried]):
+        prior = frame[carried].to_dict("records")
+        if engine is not None:
+            coded = engine.analyze_texts(frame[args.text_col].tolist(), plan["recode"], args.codes_only)
+        else:
+            coded = [{} for _ in prior]
+        rows.extend(recode.merge_rows(prior, coded))
+    keep = [col for col in header if col not in OUTPUT_COLUMNS]
+    out_file = args.out_file or f"data/processed/recoded_{Path(args.in_file).stem}.csv"
+    out = save_coded(args.in_file, out_file, rows, columns, keep)
+    print(f"Wrote {out} ({len(plan['recode'])} of {len(plan['categories'])} coders re-run)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+"""Typo-tolerant term lookup with a symmetric-deletion (SymSpell-style) index.
+
+Every term is indexed under all strings reachable by deleting up to
+``max_distance`` characters; a query generates its own deletes and only the
+terms sharing one are checked with an exact edit distance. Lookups are
+memoised, so a misspelling seen again costs one dict hit.
+
+Most one-letter substitutions in short words turn one real word into
+another (near/fear, dream/dread), while transcription typos are mostly
+dropped, doubled, or swapped letters. In short words a substitution
+therefore counts as two edits (so at distance 1 they are matched with
+insertions, deletions, and transpositions only), and a candidate must keep
+the query's first letter.
+"""
+from __future__ import annotations
+
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set
+
+# Memoised lookups kept before the cache is cleared; bounds memory in long runs.
+MEMO_LIMIT = 100_000
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    out = {word}
+    for n in range(1, min(max_distance, len(word)) + 1):
+        for drop in combinations(range(len(word)), n):
+            out.add("".join(ch for i, ch in enumerate(word) if i not in drop))
+    return out
+
+
+def edit_distance(a: str, b: str, limit: int, substitution_cost: int = 1) -> int:
+    """Optimal string alignment distance (adjacent swaps count once), capped at ``limit + 1``."""
+
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else substitution_cost
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SymSpellIndex:
+    """Closest indexed term within ``max_distance`` edits of a word.
+
+    Terms and queries shorter than ``min_length`` are ignored, and in queries
+    shorter than ``substitution_min_length`` a substitution costs two edits:
+    short words sit within one edit of too many others to be corrected safely.
+    ``extend`` layers extra terms over an index without copying it.
+    """
+
+    def __init__(
+        self,
+        terms: Iterable[str],
+        max_distance: int = 1,
+        min_length: int = 4,
+        substitution_min_length: int = 8,
+    ) -> None:
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.substitution_min_length = substitution_min_length
+        self._index: Dict[str, Set[str]] = {}
+        self._layers: List[Dict[str, Set[str]]] = [self._index]
+        self._memo: Dict[str, Optional[str]] = {}
+        for term in terms:
+            if len(term) >= min_length and term.isalpha():
+                for key in _deletes(term, max_distance):
+                    self._index.setdefault(key, set()).add(term)
+
+    def __len__(self) -> int:
+        return len(set().union(*self._layers)) if len(self._layers) > 1 else len(self._index)
+
+    def extend(self, terms: Iterable[str]) -> "SymSpellIndex":
+        """An index over these terms plus ``terms``, sharing this one's entries."""
+
+        out = SymSpellIndex(terms, self.max_distance, self.min_length, self.substitution_min_length)
+        out._layers = self._layers + out._layers
+        return out
+
+    def lookup(self, word: str) -> Optional[str]:
+        """The nearest term (ties broken alphabetically), or ``None``."""
+
+        if word in self._memo:
+            return self._memo[word]
+        best: Optional[str] = None
+        if len(word) >= self.min_length and word.isalpha():
+            best_distance = self.max_distance + 1
+            substitution_cost = 1 if len(word) >= self.substitution_min_length else 2
+            candidates: Set[str] = set()
+            for key in _deletes(word, self.max_distance):
+                for layer in self._layers:
+                    candidates.update(layer.get(key, ()))
+            for term in sorted(candidates):
+                if term[0] != word[0]:
+                    continue
+                distance = edit_distance(word, term, self.max_distance, substitution_cost)
+                if distance < best_distance:
+                    best, best_distance = term, distance
+        if len(self._memo) >= MEMO_LIMIT:
+            self._memo.clear()
+        self._memo[word] = best
+        return best
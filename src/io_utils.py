@@ -1,8 +1,22 @@
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
 
 import pandas as pd
 
+try:
+    import openpyxl
+except ModuleNotFoundError:  # pragma: no cover - pandas' own Excel readers are used instead
+    openpyxl = None
+
+
+def _checked(path: Union[str, Path]) -> Path:
+    file_path = Path(path)
+    if not file_path.exists():
+        raise FileNotFoundError(file_path)
+    if file_path.suffix.lower() not in {".csv", ".xlsx", ".xls"}:
+        raise ValueError(f"Unsupported file type: {file_path.suffix}")
+    return file_path
+
 
 def load_sheet(path: Union[str, Path]) -> pd.DataFrame:
     file_path = Path(path)
@@ -15,9 +29,115 @@ def load_sheet(path: Union[str, Path]) -> pd.DataFrame:
     raise ValueError(f"Unsupported file type: {file_path.suffix}")
 
 
+def sheet_columns(path: Union[str, Path]) -> List[str]:
+    """Header of a CSV/Excel sheet, read without loading any rows."""
+
+    file_path = _checked(path)
+    if file_path.suffix.lower() == ".xlsx" and openpyxl is not None:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return ["" if value is None else str(value) for value in header]
+    if file_path.suffix.lower() == ".csv":
+        return list(pd.read_csv(file_path, nrows=0).columns)
+    return list(pd.read_excel(file_path, nrows=0).columns)
+
+
+def iter_frames(
+    path: Union[str, Path], columns: Optional[Sequence[str]] = None, chunksize: int = 10_000
+) -> Iterator[pd.DataFrame]:
+    """Yield only ``columns`` (default: all) as string frames, chunk by chunk.
+
+    Cells are passed through verbatim with missing values as "", so writing a
+    frame back out reproduces the input. XLSX files are streamed with
+    openpyxl's read-only reader instead of being loaded whole.
+    """
+
+    file_path = _checked(path)
+    header = sheet_columns(file_path)
+    wanted = list(header if columns is None else columns)
+    missing = [col for col in wanted if col not in header]
+    if missing:
+        raise KeyError(missing[0])
+    suffix = file_path.suffix.lower()
+    if suffix == ".csv":
+        chunks = pd.read_csv(file_path, usecols=wanted, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in chunks:
+            yield chunk if columns is None else chunk[wanted]
+    elif suffix == ".xlsx" and openpyxl is not None:
+        yield from _iter_xlsx_frames(file_path, header, wanted, chunksize)
+    else:
+        frame = pd.read_excel(file_path, usecols=wanted, dtype=str).fillna("")[wanted]
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start : start + chunksize]
+
+
+def _iter_xlsx_frames(
+    file_path: Path, header: List[str], wanted: List[str], chunksize: int
+) -> Iterator[pd.DataFrame]:
+    positions = [header.index(col) for col in wanted]
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows: List[List[str]] = []
+        start = 0
+        for values in workbook.active.iter_rows(min_row=2, values_only=True):
+            if all(value is None for value in values):
+                continue  # like read_excel, skip blank rows
+            rows.append(["" if i >= len(values) or values[i] is None else str(values[i]) for i in positions])
+            if len(rows) == chunksize:
+                yield pd.DataFrame(rows, columns=wanted, index=range(start, start + len(rows)))
+                start += len(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=wanted, index=range(start, start + len(rows)))
+    finally:
+        workbook.close()
+
+
+def iter_column(path: Union[str, Path], column: str, chunksize: int = 10_000) -> Iterator[List[str]]:
+    """Yield one column as lists of strings (missing values as ""), chunk by chunk."""
+
+    for frame in iter_frames(path, [column], chunksize):
+        yield frame[column].tolist()
+
+
 def save_df(df: pd.DataFrame, path: Union[str, Path]) -> None:
     file_path = Path(path)
     file_path.parent.mkdir(parents=True, exist_ok=True)
     if file_path.suffix.lower() != ".csv":
         file_path = file_path.with_suffix(".csv")
     df.to_csv(file_path, index=False)
+
+
+def save_coded(
+    in_path: Union[str, Path],
+    out_path: Union[str, Path],
+    rows: Sequence[Dict[str, Any]],
+    columns: Sequence[str],
+    keep: Optional[Sequence[str]] = None,
+    chunksize: int = 10_000,
+) -> Path:
+    """Write the input's ``keep`` columns (default: all) next to the coded ``rows``.
+
+    The input is re-read chunk by chunk and joined to ``rows`` by position, so
+    passthrough columns are never held in memory all at once.
+    """
+
+    file_path = Path(out_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    if file_path.suffix.lower() != ".csv":
+        file_path = file_path.with_suffix(".csv")
+    start = 0
+    for frame in iter_frames(in_path, keep, chunksize):
+        codes = pd.DataFrame(rows[start : start + len(frame)], columns=list(columns), index=frame.index)
+        pd.concat([frame, codes], axis=1).to_csv(
+            file_path, mode="w" if start == 0 else "a", header=start == 0, index=False
+        )
+        start += len(frame)
+    if start == 0:  # empty input: header only
+        pd.DataFrame(columns=list(keep or sheet_columns(in_path)) + list(columns)).to_csv(file_path, index=False)
+    if start != len(rows):
+        raise ValueError(f"Input has {start} rows but {len(rows)} were coded")
+    return file_path
@@ -0,0 +1,105 @@
+"""cProfile and tracemalloc helpers shared by the CLI and the admin endpoint."""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+import cProfile
+import pstats
+import time
+import tracemalloc
+
+# Allocation sites inside the profilers themselves are noise.
+_ALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class StageProfiler:
+    """Profile named stages with one shared cProfile and per-stage allocation diffs.
+
+    Use as a context manager around the whole run (it owns tracemalloc while
+    active) and wrap each stage in ``stage(name)``.
+    """
+
+    def __init__(self, top_allocations: int = 10) -> None:
+        self.profile = cProfile.Profile()
+        self.top_allocations = top_allocations
+        self.stages: List[Dict[str, Any]] = []
+        self._owns_tracing = False
+
+    def __enter__(self) -> "StageProfiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._owns_tracing:
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        before = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+        start_current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        self.profile.enable()
+        try:
+            yield
+        finally:
+            self.profile.disable()
+            elapsed = time.perf_counter() - t0
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+            top = after.compare_to(before, "lineno")[: self.top_allocations]
+            self.stages.append(
+                {
+                    "stage": name,
+                    "seconds": elapsed,
+                    "retained_kib": (current - start_current) / 1024,
+                    "peak_kib": (peak - start_current) / 1024,
+                    "top_allocations": [
+                        {
+                            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                            "size_diff_kib": stat.size_diff / 1024,
+                            "count_diff": stat.count_diff,
+                        }
+                        for stat in top
+                    ],
+                }
+            )
+
+    def dump_stats(self, path: str) -> None:
+        self.profile.dump_stats(path)
+
+    def allocation_summary(self) -> str:
+        lines = []
+        for stage in self.stages:
+            lines.append(
+                f"[{stage['stage']}] {stage['seconds']:.3f}s, retained {stage['retained_kib']:.0f} KiB, "
+                f"peak {stage['peak_kib']:.0f} KiB"
+            )
+            for alloc in stage["top_allocations"]:
+                lines.append(
+                    f"    {alloc['size_diff_kib']:>10.1f} KiB {alloc['count_diff']:>+8d}  {alloc['site']}"
+                )
+        return "\n".join(lines)
+
+
+def top_functions(profile: cProfile.Profile, limit: int = 30, sort: str = "cumulative") -> List[Dict[str, Any]]:
+    """The ``limit`` most expensive functions, by cumulative or own time."""
+
+    stats = pstats.Stats(profile).stats  # type: ignore[attr-defined]
+    key = 3 if sort == "cumulative" else 2
+    rows = sorted(stats.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{lineno}({func})",
+            "ncalls": ncalls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+        }
+        for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in rows
+    ]
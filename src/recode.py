@@ -0,0 +1,79 @@
+"""Differential re-coding between two versions of a preset.
+
+A preset bump usually touches one or two dotted keys. ``plan`` diffs the two
+rulesets and works out which coders can produce different output; only those
+are re-run, and every other column is carried over from the prior results.
+The prior results must come from the same engine version and options.
+
+    python src/analyze.py recode --in_file data/processed/coded_dreams.csv \\
+        --old_preset configs/presets/dreams-sensorimotor@0.4.0.json \\
+        --new_preset configs/presets/dreams-sensorimotor@0.5.0.json
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from rules import affected_categories, columns_for, preset_categories, resolve_categories
+
+
+def _terms(values: Any) -> Any:
+    if values is None:
+        return frozenset()
+    if isinstance(values, (list, tuple, set, frozenset)):
+        return frozenset(str(v).lower() for v in values)
+    return values
+
+
+def changed_keys(old: Mapping[str, Any], new: Mapping[str, Any]) -> List[str]:
+    """Dotted keys whose term lists differ, ignoring order and case."""
+
+    return sorted(key for key in set(old) | set(new) if _terms(old.get(key)) != _terms(new.get(key)))
+
+
+def plan(
+    old: Mapping[str, Any],
+    new: Mapping[str, Any],
+    fuzzy: int = 0,
+    prior_columns: Optional[Iterable[str]] = None,
+    codes_only: bool = False,
+    categories: Optional[Iterable[str]] = None,
+) -> Dict[str, List[str]]:
+    """Changed keys, the coders to re-run, and the coders whose columns carry over.
+
+    Each preset selects its own categories (see ``preset_categories``) unless
+    ``categories`` overrides both. Coders new to the selection, or whose
+    columns ``prior_columns`` lacks, are re-run too.
+    """
+
+    lexicons = changed_keys(old.get("lexicons") or {}, new.get("lexicons") or {})
+    exceptions = changed_keys(old.get("exceptions") or {}, new.get("exceptions") or {})
+    if categories is not None:
+        before = after = resolve_categories(categories)
+    else:
+        before, after = resolve_categories(preset_categories(old)), resolve_categories(preset_categories(new))
+    recode = set(affected_categories(lexicons, exceptions, fuzzy)) | (set(after) - set(before))
+    if prior_columns is not None:
+        present = set(prior_columns)
+        recode |= {cat for cat in after if not set(columns_for([cat], codes_only)) <= present}
+    return {
+        "lexicons": lexicons,
+        "exceptions": exceptions,
+        "categories": list(after),
+        "recode": [cat for cat in after if cat in recode],
+        "carry": [cat for cat in after if cat not in recode],
+    }
+
+
+def carried_columns(recode_plan: Mapping[str, Sequence[str]], codes_only: bool = False) -> Tuple[str, ...]:
+    """Output columns taken from the prior results rather than re-coded."""
+
+    fresh = set(columns_for(recode_plan["recode"], codes_only))
+    return tuple(col for col in columns_for(recode_plan["categories"], codes_only) if col not in fresh)
+
+
+def merge_rows(prior: Sequence[Dict[str, Any]], recoded: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Prior carried values overlaid with the re-coded ones, row by row."""
+
+    if len(prior) != len(recoded):
+        raise ValueError(f"{len(prior)} prior rows but {len(recoded)} were re-coded")
+    return [{**before, **after} for before, after in zip(prior, recoded)]
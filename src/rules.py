@@ -1,4 +1,11 @@
-from typing import Callable
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import itertools
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Pattern, Sequence, Set, Tuple
+import re
+import threading
+import weakref
 
 try:
     import spacy
@@ -7,62 +14,526 @@ except ModuleNotFoundError:  # pragma: no cover - spaCy optional in this environ
     spacy = None
     Matcher = PhraseMatcher = None
 
+from fuzzy import SymSpellIndex
 from simple_spacy import SimpleMatcher, SimpleNLP, SimplePhraseMatcher
 
+# Version of the coding rules, stamped onto results and database rows.
+ENGINE_VERSION = "0.3.0"
+
+# Output columns produced by each coder, in the order ``analyze_text`` emits them.
+CATEGORY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "agent": ("agent_supernatural", "reason_agent", "conf"),
+    "presence": ("presence_label", "reason_presence"),
+    "visual": ("visual", "reason_visual"),
+    "auditory": ("auditory", "reason_auditory"),
+    "tactile": ("tactile", "reason_tactile"),
+    "olfactory": ("olfactory", "reason_olfactory"),
+    "gustatory": ("gustatory", "reason_gustatory"),
+    "sensorimotor": ("sensorimotor", "reason_sensorimotor", "conf"),
+    "motor": ("motor", "reason_motor"),
+    "object": ("object", "reason_object"),
+    "valence": ("valence_label", "reason_valence"),
+    "setting": ("setting_hits", "reason_setting"),
+}
+CATEGORIES: Tuple[str, ...] = tuple(CATEGORY_COLUMNS)
+
+# spaCy components needed beyond tokenisation, tagging and lemmatisation.
+# The dependency parse only feeds the negation and determiner guards.
+_CATEGORY_PIPES: Dict[str, Tuple[str, ...]] = {
+    "sensorimotor": ("parser",),
+    "object": ("parser",),
+}
+_BASE_PIPES = ("tok2vec", "tagger", "attribute_ruler", "lemmatizer")
+
+# Texts longer than this are parsed as separate chunks and merged back.
+DEFAULT_CHUNK_CHARS = 10_000
+# Preferred cut points, best first: paragraph breaks, sentence ends, any whitespace.
+_SEGMENT_BOUNDARIES = (
+    re.compile(r"\n\s*\n\s*"),
+    re.compile(r"[.!?][\"')\]]*\s+"),
+    re.compile(r"\s+"),
+)
+
+
+def segment_text(text: str, max_chars: int) -> List[str]:
+    """Split ``text`` into contiguous chunks of at most ``max_chars`` characters.
+
+    Chunks keep their trailing whitespace, so ``"".join(chunks) == text`` and
+    token character offsets survive the round trip.
+    """
+
+    chunks: List[str] = []
+    pos = 0
+    while len(text) - pos > max_chars:
+        window = text[pos : pos + max_chars]
+        cut = 0
+        for boundary in _SEGMENT_BOUNDARIES:
+            ends = [m.end() for m in boundary.finditer(window)]
+            if ends and ends[-1] > 0:
+                cut = ends[-1]
+                break
+        if not cut:  # no whitespace at all, hard split
+            cut = max_chars
+        chunks.append(text[pos : pos + cut])
+        pos += cut
+    chunks.append(text[pos:])
+    return chunks
+
+
+# The pipeline a chunk-pool worker parses with, set once when the worker starts.
+_CHUNK_NLP = None
+
+
+def _init_chunk_worker(nlp) -> None:
+    global _CHUNK_NLP
+    _CHUNK_NLP = nlp
+
+
+def _parse_chunks(chunks: Sequence[str], disable: Tuple[str, ...]) -> List[bytes]:
+    # The coders read tokens and their annotations only; tensors would dominate the payload.
+    return [doc.to_bytes(exclude=["tensor", "user_data"]) for doc in _CHUNK_NLP.pipe(chunks, disable=disable)]
+
+
+class _ChunkPool:
+    """Worker processes that parse the chunks of long texts, started once and reused.
+
+    Starting a pool costs far more than parsing a chunk, so unlike
+    ``nlp.pipe(n_process=...)`` the workers outlive the call. They start on
+    first use (never in a prefork master) and are shut down once no engine
+    refers to the pool any more. Overlays share their base engine's pool.
+    """
+
+    def __init__(self, nlp, workers: int) -> None:
+        self.nlp = nlp
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers, initializer=_init_chunk_worker, initargs=(self.nlp,)
+                )
+                weakref.finalize(self, self._executor.shutdown, wait=False)
+            return self._executor
+
+    def parse(self, chunks: Sequence[str], disable: Tuple[str, ...]) -> list:
+        """One doc per chunk, in order, parsed by up to ``workers`` processes."""
+
+        step = -(-len(chunks) // self.workers)
+        groups = [chunks[i : i + step] for i in range(0, len(chunks), step)]
+        futures = [self._pool().submit(_parse_chunks, group, tuple(disable)) for group in groups]
+        Doc = type(self.nlp.make_doc(""))
+        return [Doc(self.nlp.vocab).from_bytes(data) for future in futures for data in future.result()]
+
+
+def resolve_categories(categories: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """Normalise a category selection to canonical order; ``None`` selects all."""
+
+    if categories is None:
+        return CATEGORIES
+    wanted = {c.strip().lower() for c in categories if c and c.strip()}
+    unknown = sorted(wanted - set(CATEGORIES))
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+    return tuple(c for c in CATEGORIES if c in wanted)
+
+
+def preset_categories(preset: Optional[Mapping[str, Any]]) -> Optional[List[str]]:
+    """A preset's ``meta.categories`` if it opts in with ``meta.select_categories``; ``None`` (all) otherwise."""
+
+    meta = (preset or {}).get("meta") or {}
+    if not meta.get("select_categories"):
+        return None
+    return list(meta.get("categories") or []) or None
+
+
+def _compile_phrases(phrases: Iterable[str]) -> Optional[Pattern[str]]:
+    """Build a one-pass matcher reporting the shortest phrase at every offset.
+
+    Alternatives are ordered shortest first inside a lookahead so overlapping
+    occurrences are all reported; the shortest match at a given offset is the
+    one contained in every longer match starting there.
+    """
+
+    ordered = sorted({p.lower() for p in phrases}, key=len)
+    if not ordered:
+        return None
+    return re.compile("(?=(" + "|".join(re.escape(p) for p in ordered) + "))")
+
+
+class _DocGuards:
+    """Per-doc negation-scope and idiom-proximity bitmaps, built on first use."""
+
+    def __init__(self, doc) -> None:
+        self.doc = doc
+        self.lower: List[str] = [t.lower_ for t in doc]
+        self._negated: Dict[int, List[bool]] = {}
+        self._near: Dict[Tuple[Pattern[str], int], List[bool]] = {}
+        self._text: Optional[str] = None
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def negated(self, negations: FrozenSet[str], window: int) -> List[bool]:
+        if window not in self._negated:
+            n = len(self.lower)
+            marks = [False] * n
+            for j, low in enumerate(self.lower):
+                if low not in negations:
+                    continue
+                # linear window around the negator
+                for k in range(max(0, j - window), min(n, j + window + 1)):
+                    marks[k] = True
+                # a token is negated when a negator sits in its subtree,
+                # i.e. the token is the negator or one of its ancestors
+                for anc in getattr(self.doc[j], "ancestors", ()):
+                    marks[anc.i] = True
+            self._negated[window] = marks
+        return self._negated[window]
+
+    def _index_text(self) -> str:
+        # Mirror ``Span.text``: token texts joined by their trailing whitespace.
+        if self._text is None:
+            parts: List[str] = []
+            pos = 0
+            for t in self.doc:
+                low = t.text.lower()
+                ws = getattr(t, "whitespace_", " ")
+                self._starts.append(pos)
+                pos += len(low)
+                self._ends.append(pos)
+                pos += len(ws)
+                parts.append(low + ws)
+            self._text = "".join(parts)
+        return self._text
+
+    def near(self, pattern: Pattern[str], window: int) -> List[bool]:
+        key = (pattern, window)
+        if key not in self._near:
+            text = self._index_text()
+            n = len(self._starts)
+            marks = [False] * n
+            for m in pattern.finditer(text):
+                a, b = m.start(1), m.end(1)
+                first = bisect_right(self._starts, a) - 1
+                last = bisect_left(self._ends, b)
+                if first < 0 or last >= n:
+                    continue
+                # the window of token i covers the occurrence iff
+                # i - window <= first and last <= i + window
+                for k in range(max(0, last - window), min(n - 1, first + window) + 1):
+                    marks[k] = True
+            self._near[key] = marks
+        return self._near[key]
+
+
+def columns_for(
+    categories: Optional[Iterable[str]] = None, codes_only: bool = False
+) -> Tuple[str, ...]:
+    """Return the output columns produced for a category selection."""
+
+    columns: Dict[str, None] = {}
+    for cat in resolve_categories(categories):
+        columns.update(dict.fromkeys(CATEGORY_COLUMNS[cat]))
+    if codes_only:
+        return tuple(col for col in columns if not col.startswith("reason_"))
+    return tuple(columns)
+
+
+# Engine choices offered to callers, and the ``load_nlp`` backend behind each.
+ENGINE_BACKENDS: Dict[str, str] = {"fast": "simple", "accurate": "spacy"}
+
+
+def load_nlp(backend: str = "auto", model: str = "en_core_web_sm", exclude: Iterable[str] = ()):
+    """Load the NLP backend.
+
+    ``"auto"`` prefers the spaCy model and silently falls back to ``SimpleNLP``;
+    ``"spacy"`` raises if spaCy or the model is unavailable; ``"simple"``
+    always uses the lightweight fallback. ``exclude`` prunes spaCy components.
+    """
+
+    if backend == "simple":
+        return SimpleNLP()
+    if backend not in ("auto", "spacy"):
+        raise ValueError(f"Unknown backend {backend!r}")
+    if spacy is not None and Matcher is not None and PhraseMatcher is not None:
+        try:
+            return spacy.load(model, exclude=list(exclude))
+        except Exception:  # pragma: no cover - spaCy model unavailable
+            if backend == "spacy":
+                raise
+    elif backend == "spacy":
+        raise ModuleNotFoundError("spaCy is not installed")
+    return SimpleNLP()
+
+
+_FOLD_HYPHENS = str.maketrans("-", " ")
+
+
+def spelling_table(br_am: Mapping[str, str]) -> Dict[str, str]:
+    """Variant -> canonical spelling from a ``canonical: variant`` map such as british_american.yml."""
+
+    table = {}
+    for canonical, variant in br_am.items():
+        canon = " ".join(str(canonical).lower().translate(_FOLD_HYPHENS).split())
+        table[" ".join(str(variant).lower().translate(_FOLD_HYPHENS).split())] = canon
+    return {variant: canon for variant, canon in table.items() if variant != canon}
+
+
+class _LayeredSet:
+    """Read-only union of a shared base set and a small delta, without copying the base."""
+
+    __slots__ = ("base", "delta")
+
+    def __init__(self, base, delta: FrozenSet[str]) -> None:
+        self.base = base
+        self.delta = delta
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.delta or item in self.base
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.delta
+
+    def __len__(self) -> int:
+        return len(self.base) + len(self.delta)
+
+
+# Preset keys (dotted paths into categories.yml / exceptions.yml) and the
+# engine lexicon sets they feed; ``section.*`` matches any list in a section.
+# Keys that also feed matcher patterns are handled in ``RuleEngine.overlay``.
+_CATEGORY_SETS: Dict[str, Tuple[str, ...]] = {
+    "agent.supernatural_nouns": ("supernatural_lemmas",),
+    "olfactory.smells": ("olfactory",),
+    "gustatory.tastes": ("gustatory",),
+    "visual.*": ("visual",),
+    "auditory.*": ("auditory",),
+    "tactile.adjectives": ("tactile",),
+    "tactile.verbs": ("tactile",),
+    "motor.postures": ("motor", "motor_postures"),
+    "motor.movements": ("motor",),
+    "valence.awe": ("valence_pos",),
+    "valence.reverence": ("valence_pos",),
+    "valence.peace": ("valence_pos",),
+    "valence.comfort": ("valence_pos",),
+    "valence.ecstasy": ("valence_pos",),
+    "valence.positive_low_arousal": ("valence_pos",),
+    "valence.negative_high_arousal": ("valence_neg_hi",),
+    "valence.negative_low_arousal": ("valence_neg_lo",),
+    "setting.structural": ("setting_lex",),
+    "setting.sacred_tokens": ("setting_lex",),
+    "setting.liminal": ("setting_lex",),
+    "object.sacred_objects": ("sacred_objects",),
+    "object.ordinary": ("sacred_objects",),
+    "bodystate.evaluative_embodied_adjs": ("embodied_eval_adjs",),
+    "bodystate.respiratory": ("body_nouns",),
+    "bodystate.cardio": ("body_nouns",),
+    "bodystate.general_state": ("body_nouns",),
+}
+_EXCEPTION_SETS: Dict[str, Tuple[str, ...]] = {
+    "proper_name_exceptions": ("proper_ex",),
+    "idiom_exclusions.supernatural": ("idiom_sup",),
+    "negations": ("negations",),
+    "epistemic_complements": ("epist_comp",),
+    "hedges": ("hedges",),
+    "intensifiers": ("intens",),
+    "objects_require_determiner": ("objects_need_det",),
+    "fuzzy_known_words": ("fuzzy_known",),
+}
+
+
+# Lexicon sets compared against per-token forms, and therefore stored in
+# canonical spelling when normalization is on. Negation and idiom guards
+# work on the raw text and keep their entries as written.
+_CANONICAL_SETS = (
+    "supernatural_lemmas",
+    "proper_ex",
+    "epist_comp",
+    "hedges",
+    "intens",
+    "objects_need_det",
+    "fuzzy_known",
+    "presence_singles",
+    "presence_phrases",
+    "body_nouns",
+    "olfactory",
+    "gustatory",
+    "visual",
+    "auditory",
+    "tactile",
+    "motor",
+    "motor_postures",
+    "valence_pos",
+    "valence_neg_hi",
+    "valence_neg_lo",
+    "setting_lex",
+    "sacred_objects",
+    "embodied_eval_adjs",
+)
+
+
+def _sets_for(key: str, table: Dict[str, Tuple[str, ...]]) -> Tuple[str, ...]:
+    if key in table:
+        return table[key]
+    section = key.split(".", 1)[0]
+    if "." in key and f"{section}.*" in table:
+        return table[f"{section}.*"]
+    return ()
+
+
+# Lexicon sets in which each coder needs a token hit (by lemma or lowercase
+# form) before it can code anything but its empty result. ``conf`` moves off
+# its default only on intensifiers and hedges; every FEEL pattern needs "feel".
+_TRIGGER_SETS: Dict[str, Tuple[str, ...]] = {
+    "agent": ("supernatural_lemmas", "intens", "hedges"),
+    "presence": ("presence_singles",),
+    "visual": ("visual",),
+    "auditory": ("auditory",),
+    "tactile": ("tactile",),
+    "olfactory": ("olfactory",),
+    "gustatory": ("gustatory",),
+    "sensorimotor": ("body_nouns", "intens", "hedges"),
+    "motor": ("motor",),
+    "object": ("sacred_objects",),
+    "valence": ("valence_pos", "valence_neg_hi", "valence_neg_lo"),
+    "setting": ("setting_lex",),
+}
+_TRIGGER_WORDS: Dict[str, Tuple[str, ...]] = {"sensorimotor": ("feel",)}
+
+# Single-word lexicons that fuzzy matching may correct a token towards. Guard
+# sets (negations, hedges, ...) are closed-class words and are only known
+# words, so they are never the target of a correction.
+_FUZZY_SETS = (
+    "supernatural_lemmas",
+    "presence_singles",
+    "olfactory",
+    "gustatory",
+    "visual",
+    "auditory",
+    "tactile",
+    "motor",
+    "valence_pos",
+    "valence_neg_hi",
+    "valence_neg_lo",
+    "setting_lex",
+    "sacred_objects",
+    "embodied_eval_adjs",
+)
+_FUZZY_SKIP_POS = frozenset({"ADP", "AUX", "CCONJ", "DET", "NUM", "PART", "PRON", "PUNCT", "SCONJ", "SYM"})
+
+
+# Coders that read each lexicon set. ``conf`` is written by agent and
+# sensorimotor alike, so re-running either refreshes it.
+_SET_CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "supernatural_lemmas": ("agent",),
+    "proper_ex": ("agent",),
+    "idiom_sup": ("agent",),
+    "intens": ("agent", "sensorimotor"),
+    "hedges": ("agent", "sensorimotor"),
+    "negations": ("sensorimotor",),
+    "epist_comp": ("sensorimotor",),
+    "body_nouns": ("sensorimotor",),
+    "embodied_eval_adjs": ("sensorimotor",),
+    "presence_singles": ("presence",),
+    "presence_phrases": ("presence",),
+    "olfactory": ("olfactory",),
+    "gustatory": ("gustatory",),
+    "visual": ("visual",),
+    "auditory": ("auditory",),
+    "tactile": ("tactile",),
+    "motor": ("motor",),
+    "motor_postures": ("motor",),
+    "valence_pos": ("valence",),
+    "valence_neg_hi": ("valence",),
+    "valence_neg_lo": ("valence",),
+    "setting_lex": ("setting",),
+    "sacred_objects": ("object",),
+    "objects_need_det": ("object",),
+    "fuzzy_known": (),
+}
+
+
+def affected_categories(
+    lexicon_keys: Iterable[str] = (), exception_keys: Iterable[str] = (), fuzzy: int = 0
+) -> Tuple[str, ...]:
+    """Coders whose output can change when the given dotted preset keys change.
+
+    With fuzzy matching on, a change to any correction target (or to the
+    known words) can move a correction from one lexicon to another, so every
+    coder is affected.
+    """
+
+    attrs: Set[str] = set()
+    for key in lexicon_keys:
+        attrs.update(("presence_singles", "presence_phrases") if key == "presence.types" else ())
+        attrs.update(_sets_for(key, _CATEGORY_SETS))
+    for key in exception_keys:
+        attrs.update(_sets_for(key, _EXCEPTION_SETS))
+    if fuzzy and attrs & {*_FUZZY_SETS, "fuzzy_known"}:
+        return CATEGORIES
+    cats = {cat for attr in attrs for cat in _SET_CATEGORIES[attr]}
+    return tuple(cat for cat in CATEGORIES if cat in cats)
+
 
 class RuleEngine:
-    def __init__(self, cfg_categories: dict, cfg_exceptions: dict):
+    def __init__(
+        self,
+        cfg_categories: dict,
+        cfg_exceptions: dict,
+        chunk_chars: int = DEFAULT_CHUNK_CHARS,
+        n_process: int = 1,
+        nlp=None,
+        prefilter: bool = True,
+        spelling: Optional[Mapping[str, str]] = None,
+        fuzzy: int = 0,
+    ):
         self.cfg = cfg_categories
         self.exc = cfg_exceptions
+        self.chunk_chars = chunk_chars
+        self.n_process = n_process
+        # Optional spelling normalization: tokens and lexicon entries are both
+        # mapped to one canonical form (e.g. colour -> color, x-ray -> x ray).
+        self._spelling: Optional[Dict[str, str]] = spelling_table(spelling) if spelling else None
+        self._spelling_variants: Dict[str, Set[str]] = {}
+        for variant, canon in (self._spelling or {}).items():
+            self._spelling_variants.setdefault(canon, set()).add(variant)
 
+        self.nlp = nlp if nlp is not None else load_nlp()
         self._resolve_match: Callable[[object], str]
-        if spacy is not None and Matcher is not None and PhraseMatcher is not None:
-            try:
-                self.nlp = spacy.load("en_core_web_sm")
-                self.matcher = Matcher(self.nlp.vocab)
-                self.phraser = PhraseMatcher(self.nlp.vocab, attr="LOWER")
-                self._resolve_match = lambda mid: self.nlp.vocab.strings[mid]
-            except Exception:  # pragma: no cover - spaCy model unavailable
-                self.nlp = SimpleNLP()
-                self.matcher = SimpleMatcher(self.nlp.vocab)
-                self.phraser = SimplePhraseMatcher(self.nlp.vocab, attr="LOWER")
-                self._resolve_match = lambda mid: mid  # type: ignore[return-value]
-        else:  # spaCy missing, use lightweight fallback
-            self.nlp = SimpleNLP()
-            self.matcher = SimpleMatcher(self.nlp.vocab)
-            self.phraser = SimplePhraseMatcher(self.nlp.vocab, attr="LOWER")
+        if isinstance(self.nlp, SimpleNLP):  # lightweight fallback
             self._resolve_match = lambda mid: mid  # type: ignore[return-value]
+        else:
+            vocab = self.nlp.vocab
+            self._resolve_match = lambda mid: vocab.strings[mid]
+        # The fallback tokenizer is cheaper than shipping its chunks to another process.
+        self._chunk_pool: Optional[_ChunkPool] = None
+        if n_process > 1 and not isinstance(self.nlp, SimpleNLP):
+            self._chunk_pool = _ChunkPool(self.nlp, n_process)
+        self.matcher = self._new_matcher()
+        self.phraser = self._new_phraser()
+        # Preset overlays add matchers for their extra terms only.
+        self._extra_matchers: List[object] = []
+        self._extra_phrasers: List[object] = []
 
         # --- Build lexicon sets ---
         self.supernatural_lemmas = set(self.cfg.get("agent", {}).get("supernatural_nouns", []))
         self.proper_ex = set(self.exc.get("proper_name_exceptions", []))
         self.idiom_sup = set(self.exc.get("idiom_exclusions", {}).get("supernatural", []))
-        self.negations = set(self.exc.get("negations", []))
+        self.negations = frozenset(self.exc.get("negations", []))
         self.epist_comp = set(self.exc.get("epistemic_complements", []))
         self.hedges = set(self.exc.get("hedges", []))
         self.intens = set(self.exc.get("intensifiers", []))
         self.objects_need_det = set(self.exc.get("objects_require_determiner", []))
+        self.fuzzy_known = set(self.exc.get("fuzzy_known_words", []))
 
-        # Build phrase matchers for presence types (multiword)
-        presence_phrases = [p for p in self.cfg["presence"]["types"] if " " in p]
-        self.phraser.add("PRESENCE_PHRASE", [self.nlp.make_doc(p) for p in presence_phrases])
-
-        # Grammar patterns
-        self.matcher.add("FELT_ADJ", [[{"LEMMA": "feel"}, {"POS": "ADJ"}]])
-        self.matcher.add(
-            "FELT_EPIST",
-            [[{"LEMMA": "feel"}, {"LOWER": {"IN": list(self.epist_comp)}}]],
-        )
         # Body noun cues: det + body noun
-        body_nouns = set(
+        self.body_nouns = set(
             self.cfg["bodystate"]["respiratory"]
             + self.cfg["bodystate"]["cardio"]
             + self.cfg["bodystate"]["general_state"]
         )
-        self.matcher.add(
-            "BODY_NOUN_CUE",
-            [[{"POS": "DET"}, {"LEMMA": {"IN": list(body_nouns)}}]],
-        )
 
         # Simple smell/taste/vision/voice triggers (token-level)
         self.olfactory = set(self.cfg["olfactory"]["smells"])
@@ -73,6 +544,28 @@ class RuleEngine:
 
         # Motor grouping
         self.motor = set(self.cfg["motor"]["postures"] + self.cfg["motor"]["movements"])
+        self.motor_postures = set(self.cfg["motor"]["postures"])
+
+        # Presence types: multiword ones go through the phraser, single words are token lookups
+        presence_types = self.cfg["presence"]["types"]
+        if self._spelling is not None:
+            presence_types = [self._canonical(str(p).lower()) for p in presence_types]
+        self.presence_phrases = {p for p in presence_types if " " in p}
+        self.presence_singles = {p for p in presence_types if " " not in p}
+
+        # Valence and setting lexicons
+        val = self.cfg["valence"]
+        self.valence_pos = set(
+            val["awe"] + val["reverence"] + val["peace"] + val["comfort"] + val["ecstasy"]
+            + val["positive_low_arousal"]
+        )
+        self.valence_neg_hi = set(val["negative_high_arousal"])
+        self.valence_neg_lo = set(val["negative_low_arousal"])
+        self.setting_lex = set(
+            self.cfg["setting"]["structural"]
+            + self.cfg["setting"]["sacred_tokens"]
+            + self.cfg["setting"]["liminal"]
+        )
 
         # Objects
         self.sacred_objects = set(
@@ -82,45 +575,294 @@ class RuleEngine:
         # Sensorimotor evaluatives to treat as embodied when following FEEL
         self.embodied_eval_adjs = set(self.cfg["bodystate"]["evaluative_embodied_adjs"])
 
+        if self._spelling is not None:
+            for attr in _CANONICAL_SETS:
+                setattr(self, attr, {self._canonical(str(t).lower()) for t in getattr(self, attr)})
+
+        # Phrase and grammar patterns
+        self._add_presence_phrases(self.phraser, self.presence_phrases)
+        self.matcher.add("FELT_ADJ", [[{"LEMMA": "feel"}, {"POS": "ADJ"}]])
+        self._add_felt_epist(self.matcher, self.epist_comp)
+        self._add_body_noun_cue(self.matcher, self.body_nouns)
+
+        # Optional typo tolerance: unknown tokens within ``fuzzy`` edits of a
+        # lexicon term are read as that term (and labelled in the reasons).
+        self.fuzzy = fuzzy
+        self._fuzzy_index: Optional[SymSpellIndex] = None
+        self._fuzzy_known: FrozenSet[str] = frozenset()
+        if fuzzy:
+            self._build_fuzzy_index()
+
+        self._bind_coders()
+        self._disabled_pipes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._idiom_pattern = _compile_phrases(self.idiom_sup)
+        self._guards_key = ("rules.guards", id(self))
+        self._forms_key = ("rules.forms", id(self))
+        self.prefilter = prefilter
+        self._triggers_cache: Dict[Tuple[str, ...], Optional[Tuple[FrozenSet[str], Tuple[str, ...]]]] = {}
+        self._empty_results: Dict[Tuple[Tuple[str, ...], bool], dict] = {}
+        self._lemma_tables_cache: Optional[tuple] = None
+
+    def _bind_coders(self) -> None:
+        self._coders: Dict[str, Callable[..., dict]] = {
+            "agent": self.code_supernatural_agent,
+            "presence": self.code_presence,
+            "visual": lambda doc, r: self._code_simple_lex(doc, self.visual, "visual", r),
+            "auditory": lambda doc, r: self._code_simple_lex(doc, self.auditory, "auditory", r),
+            "tactile": lambda doc, r: self._code_simple_lex(doc, self.tactile, "tactile", r),
+            "olfactory": lambda doc, r: self._code_simple_lex(doc, self.olfactory, "olfactory", r),
+            "gustatory": lambda doc, r: self._code_simple_lex(doc, self.gustatory, "gustatory", r),
+            "sensorimotor": self.code_bodystate_sensorimotor,
+            "motor": self.code_motor,
+            "object": self.code_objects,
+            "valence": self.code_valence,
+            "setting": self.code_setting,
+        }
+
+    # ----------------- Matchers & preset overlays -----------------
+    def _new_matcher(self):
+        if isinstance(self.nlp, SimpleNLP):
+            return SimpleMatcher(self.nlp.vocab)
+        return Matcher(self.nlp.vocab)
+
+    def _new_phraser(self):
+        if isinstance(self.nlp, SimpleNLP):
+            return SimplePhraseMatcher(self.nlp.vocab, attr="LOWER")
+        return PhraseMatcher(self.nlp.vocab, attr="LOWER")
+
+    def _add_presence_phrases(self, phraser, phrases) -> None:
+        phrases = self._with_variants(phrases)
+        phraser.add("PRESENCE_PHRASE", [self.nlp.make_doc(p) for p in sorted(phrases)])
+
+    def _add_felt_epist(self, matcher, complements) -> None:
+        complements = self._with_variants(complements)
+        matcher.add("FELT_EPIST", [[{"LEMMA": "feel"}, {"LOWER": {"IN": sorted(complements)}}]])
+
+    def _add_body_noun_cue(self, matcher, nouns) -> None:
+        nouns = self._with_variants(nouns)
+        matcher.add("BODY_NOUN_CUE", [[{"POS": "DET"}, {"LEMMA": {"IN": sorted(nouns)}}]])
+
+    def _matches(self, doc):
+        matches = self.matcher(doc)
+        for extra in self._extra_matchers:
+            matches = list(matches) + list(extra(doc))
+        return matches
+
+    def _phrase_matches(self, doc):
+        matches = list(self.phraser(doc))
+        for extra in self._extra_phrasers:
+            matches.extend(extra(doc))
+        return sorted(matches, key=lambda m: (m[1], m[2]))
+
+    def _layer(self, attr: str, terms: Iterable[str]) -> FrozenSet[str]:
+        if self._spelling is not None and attr in _CANONICAL_SETS:
+            terms = [self._canonical(str(t).lower()) for t in terms]
+        base = getattr(self, attr)
+        delta = frozenset(t for t in terms if t not in base)
+        if delta:
+            setattr(self, attr, _LayeredSet(base, delta))
+        return delta
+
+    def overlay(
+        self,
+        lexicons: Optional[Dict[str, Iterable[str]]] = None,
+        exceptions: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> "RuleEngine":
+        """Return an engine layered on this one with a preset's extra terms.
+
+        The overlay shares the NLP pipeline, matchers, and lexicon sets of this
+        engine and stores only the terms it adds; lookups consult both layers.
+        Keys that feed no engine lexicon are ignored, just as merging them into
+        the config would only create unused branches.
+        """
+
+        eng = copy.copy(self)
+        eng._extra_matchers = list(self._extra_matchers)
+        eng._extra_phrasers = list(self._extra_phrasers)
+        eng._guards_key = ("rules.guards", id(eng))
+        eng._forms_key = ("rules.forms", id(eng))
+        eng._triggers_cache = {}
+        eng._bind_coders()
+        eng.lexicon_delta = {k: list(v) for k, v in (lexicons or {}).items()}
+        eng.exception_delta = {k: list(v) for k, v in (exceptions or {}).items()}
+        added_terms: Set[str] = set()
+
+        for key, terms in eng.lexicon_delta.items():
+            if key == "presence.types":
+                if eng._spelling is not None:
+                    terms = [eng._canonical(str(t).lower()) for t in terms]
+                added_terms |= eng._layer("presence_singles", [t for t in terms if " " not in t])
+                phrases = eng._layer("presence_phrases", [t for t in terms if " " in t])
+                if phrases:
+                    phraser = eng._new_phraser()
+                    eng._add_presence_phrases(phraser, phrases)
+                    eng._extra_phrasers.append(phraser)
+            for attr in _sets_for(key, _CATEGORY_SETS):
+                added = eng._layer(attr, terms)
+                if attr in _FUZZY_SETS:
+                    added_terms |= added
+                if attr == "body_nouns" and added:
+                    matcher = eng._new_matcher()
+                    eng._add_body_noun_cue(matcher, added)
+                    eng._extra_matchers.append(matcher)
+        added_known: Set[str] = set()
+        for key, terms in eng.exception_delta.items():
+            for attr in _sets_for(key, _EXCEPTION_SETS):
+                added = eng._layer(attr, terms)
+                if attr in _CANONICAL_SETS or attr == "negations":
+                    added_known |= added
+                if attr == "epist_comp" and added:
+                    matcher = eng._new_matcher()
+                    eng._add_felt_epist(matcher, added)
+                    eng._extra_matchers.append(matcher)
+        if eng.idiom_sup is not self.idiom_sup:  # the preset layered extra idioms
+            eng._idiom_pattern = _compile_phrases(eng.idiom_sup)
+        if eng._fuzzy_index is not None:
+            eng._extend_fuzzy_index(added_terms, added_known)
+        return eng
+
+    @property
+    def backend(self) -> str:
+        """``"simple"`` for the fallback tokenizer, ``"spacy"`` otherwise."""
+
+        return "simple" if isinstance(self.nlp, SimpleNLP) else "spacy"
+
+    def vocab_size(self) -> int:
+        """Strings interned in the pipeline's vocab; spaCy's grows with every new token seen."""
+
+        return len(self.nlp.vocab.strings)
+
     # ----------------- Utilities -----------------
-    def _near_idiom(self, doc, i, window=3, idioms=None):
-        idioms = idioms or []
-        start = max(0, i - window)
-        end = min(len(doc), i + window + 1)
-        span = doc[start:end].text.lower()
-        return any(phrase in span for phrase in idioms)
+    # ----------------- Spelling normalization -----------------
+    def _canonical(self, form: str) -> str:
+        """Canonical spelling of a lowercase form; the identity unless normalization is on."""
+
+        spelling = self._spelling
+        if spelling is None:
+            return form
+        canon = spelling.get(form)
+        if canon is not None:
+            return canon
+        if "-" not in form and " " not in form:
+            return form
+        return " ".join(spelling.get(w, w) for w in form.translate(_FOLD_HYPHENS).split())
+
+    def _with_variants(self, terms: Iterable[str]) -> Set[str]:
+        """Canonical terms plus every spelling/hyphen variant, for matcher patterns on raw tokens."""
+
+        if self._spelling is None:
+            return set(terms)
+        out: Set[str] = set()
+        for term in terms:
+            words = term.split(" ")
+            options = [sorted({w, *self._spelling_variants.get(w, ())}) for w in words]
+            for combo in itertools.product(*options):
+                out.add(" ".join(combo))
+                if len(combo) > 1:
+                    out.add("-".join(combo))
+        return out
+
+    def _forms(self, doc) -> Tuple[List[str], List[str], Dict[int, str]]:
+        """Per-token (lemma, text) lowercased and, if enabled, spelling-normalized once per doc.
+
+        The third item maps the indices of fuzzily corrected tokens to their
+        reason label; those tokens' lemmas are replaced by the matched term.
+        """
+
+        forms = doc.user_data.get(self._forms_key)
+        if forms is None:
+            lemmas = [t.lemma_.lower() for t in doc]
+            lowers = [t.text.lower() for t in doc]
+            if self._spelling is not None:
+                lemmas = [self._canonical(f) for f in lemmas]
+                lowers = [self._canonical(f) for f in lowers]
+            fuzzy = self._fuzzy_forms(doc, lemmas, lowers) if self._fuzzy_index is not None else {}
+            forms = doc.user_data[self._forms_key] = (lemmas, lowers, fuzzy)
+        return forms
+
+    # ----------------- Fuzzy matching -----------------
+    def _build_fuzzy_index(self) -> None:
+        terms = set()
+        for attr in _FUZZY_SETS:
+            terms.update(str(t).lower() for t in getattr(self, attr))
+        known = set(terms) | self._dictionary_words()
+        for attr in (*_CANONICAL_SETS, "negations"):
+            known.update(str(t).lower() for t in getattr(self, attr))
+        self._fuzzy_known = frozenset(known)
+        self._fuzzy_index = SymSpellIndex(terms, max_distance=self.fuzzy)
+
+    def _extend_fuzzy_index(self, terms: Set[str], known: Set[str]) -> None:
+        # Overlays layer their terms over the base index and known words; the
+        # lemma tables and the base lexicons are never walked again.
+        terms = {str(t).lower() for t in terms}
+        known = {str(t).lower() for t in known} | terms
+        known = {t for t in known if t not in self._fuzzy_known}
+        if known:
+            self._fuzzy_known = _LayeredSet(self._fuzzy_known, frozenset(known))
+        if terms:
+            self._fuzzy_index = self._fuzzy_index.extend(terms)
+
+    def _dictionary_words(self) -> Set[str]:
+        """Words the lemmatizer's tables know (spaCy's English index holds WordNet's vocabulary)."""
+
+        words: Set[str] = set()
+        if "lemmatizer" not in getattr(self.nlp, "pipe_names", []):
+            return words
+        lookups = getattr(self.nlp.get_pipe("lemmatizer"), "lookups", None)
+        if lookups is None:
+            return words
+        if lookups.has_table("lemma_index"):
+            for entries in lookups.get_table("lemma_index").values():
+                words.update(str(w).lower() for w in entries)
+        if lookups.has_table("lemma_exc"):
+            for forms in lookups.get_table("lemma_exc").values():
+                words.update(str(w).lower() for w in forms)
+        if lookups.has_table("lemma_lookup"):
+            words.update(str(w).lower() for w in lookups.get_table("lemma_lookup"))
+        return words
+
+    def _fuzzy_forms(self, doc, lemmas: List[str], lowers: List[str]) -> Dict[int, str]:
+        """Correct unknown open-class tokens in place; returns ``{index: "term~as_written"}``."""
+
+        index, known = self._fuzzy_index, self._fuzzy_known
+        labels: Dict[int, str] = {}
+        for tok, lem, low in zip(doc, lemmas, lowers):
+            if lem in known or low in known or tok.pos_ in _FUZZY_SKIP_POS:
+                continue
+            term = index.lookup(low)
+            if term is not None:
+                lemmas[tok.i] = term
+                labels[tok.i] = f"{term}~{low}"
+        return labels
+
+    def _guards(self, doc) -> _DocGuards:
+        guards = doc.user_data.get(self._guards_key)
+        if guards is None:
+            guards = doc.user_data[self._guards_key] = _DocGuards(doc)
+        return guards
+
+    def _near_idiom(self, doc, i, window=3):
+        # The idiom pattern is compiled once per engine (and per overlay that adds idioms).
+        pattern = self._idiom_pattern
+        if pattern is None:
+            return False
+        return self._guards(doc).near(pattern, window)[i]
 
     def _is_negated(self, tok, window=5):
         # local dep/linear window negation
-        for t in tok.subtree:
-            if t.lower_ in self.negations:
-                return True
-        start = max(0, tok.i - window)
-        end = min(len(tok.doc), tok.i + window + 1)
-        span = tok.doc[start:end]
-        try:
-            iterator = iter(span)
-        except TypeError:
-            if hasattr(span, "doc") and hasattr(span, "start"):
-                iterator = iter(span.doc.tokens[span.start : span.end])
-            else:  # pragma: no cover - defensive fallback
-                iterator = iter(())
-        for t in iterator:
-            if getattr(t, "lower_", str(t).lower()) in self.negations:
-                return True
-        return False
+        return self._guards(tok.doc).negated(self.negations, window)[tok.i]
 
     def _confidence(self, doc):
         c = 0
-        for t in doc:
-            if t.lower_ in self.intens:
+        for low in self._forms(doc)[1]:
+            if low in self.intens:
                 c += 1
-            if t.lower_ in self.hedges:
+            if low in self.hedges:
                 c -= 1
         return max(0, min(3, 1 + c))  # 1..3
 
-    def _needs_det_ok(self, tok):
-        if tok.lemma_.lower() not in self.objects_need_det:
+    def _needs_det_ok(self, tok, lem):
+        if lem not in self.objects_need_det:
             return True
         # require determiner or possessor
         for child in tok.children:
@@ -132,129 +874,133 @@ class RuleEngine:
         return False
 
     # ----------------- Supernatural / Agent -----------------
-    def code_supernatural_agent(self, doc):
+    def code_supernatural_agent(self, doc, reasons=True):
         # phrase/idom suppressors
         # agent code if noun is in supernatural lemmas and not an exception/idiom
-        for tok in doc:
-            low = tok.text.lower()
-            lem = tok.lemma_.lower()
+        lemmas, lowers, fuzzy = self._forms(doc)
+        for tok, lem, low in zip(doc, lemmas, lowers):
             if low in self.proper_ex:
                 continue
             if tok.pos_ in ("NOUN", "PROPN") and lem in self.supernatural_lemmas:
-                if self._near_idiom(doc, tok.i, idioms=self.idiom_sup):
+                if self._near_idiom(doc, tok.i):
                     continue
-                return {
-                    "agent_supernatural": 1,
-                    "reason_agent": f"lemma={lem}, pos={tok.pos_}",
-                    "conf": self._confidence(doc),
-                }
-        return {
-            "agent_supernatural": 0,
-            "reason_agent": "",
-            "conf": self._confidence(doc),
-        }
+                out = {"agent_supernatural": 1}
+                if reasons:
+                    out["reason_agent"] = f"lemma={fuzzy.get(tok.i, lem)}, pos={tok.pos_}"
+                out["conf"] = self._confidence(doc)
+                return out
+        out = {"agent_supernatural": 0}
+        if reasons:
+            out["reason_agent"] = ""
+        out["conf"] = self._confidence(doc)
+        return out
 
     # ----------------- Presence -----------------
-    def code_presence(self, doc):
+    def code_presence(self, doc, reasons=True):
         # multiword first
         pres = []
-        for _, start, end in self.phraser(doc):
+        for _, start, end in self._phrase_matches(doc):
             pres.append(doc[start:end].text)
         # single word fallbacks
-        singles = [p for p in self.cfg["presence"]["types"] if " " not in p]
-        for tok in doc:
-            if tok.lemma_.lower() in singles:
+        lemmas, _, fuzzy = self._forms(doc)
+        fuzzy_hit = False
+        for tok, lem in zip(doc, lemmas):
+            if lem in self.presence_singles:
                 pres.append(tok.text)
+                fuzzy_hit = fuzzy_hit or tok.i in fuzzy
         pres = list(dict.fromkeys(pres))  # dedup
-        return {
-            "presence_label": ";".join(pres) if pres else "",
-            "reason_presence": "phrase" if pres else "",
-        }
+        out = {"presence_label": ";".join(pres) if pres else ""}
+        if reasons:
+            out["reason_presence"] = ("phrase,fuzzy" if fuzzy_hit else "phrase") if pres else ""
+        return out
 
     # ----------------- Visual / Auditory / Tactile / Olfactory / Gustatory -----------------
-    def _code_simple_lex(self, doc, lexset, label):
+    def _code_simple_lex(self, doc, lexset, label, reasons=True):
+        lemmas, lowers, fuzzy = self._forms(doc)
+        if not reasons:  # the flag only needs the first hit
+            hit = any(lem in lexset or low in lexset for lem, low in zip(lemmas, lowers))
+            return {f"{label}": 1 if hit else 0}
         hits = []
-        for tok in doc:
-            if tok.lemma_.lower() in lexset or tok.text.lower() in lexset:
-                hits.append(tok.lemma_)
+        for tok, lem, low in zip(doc, lemmas, lowers):
+            if lem in lexset or low in lexset:
+                hits.append(fuzzy.get(tok.i, tok.lemma_))
         return {
             f"{label}": 1 if hits else 0,
             f"reason_{label}": ",".join(sorted(set(hits))),
         }
 
     # ----------------- Body state & Sensorimotor (nuanced FEEL) -----------------
-    def code_bodystate_sensorimotor(self, doc):
-        matches = self.matcher(doc)
+    def code_bodystate_sensorimotor(self, doc, reasons=True):
+        matches = self._matches(doc)
         labs = {self._resolve_match(mid) for mid, _, _ in matches}
+        flag, reason = 0, ""
 
         # Epistemic override: "feel/felt" + like/that/as if...
         if "FELT_EPIST" in labs:
-            return {
-                "sensorimotor": 0,
-                "reason_sensorimotor": "epistemic_felt",
-                "conf": self._confidence(doc),
-            }
-
-        # FEEL + ADJ where adj is embodied (gross, sweaty, dizzy…)
-        for mid, start, end in matches:
-            if self._resolve_match(mid) == "FELT_ADJ":
-                adj = doc[start + 1]
-                if adj.lemma_.lower() in self.embodied_eval_adjs and not self._is_negated(adj):
-                    return {
-                        "sensorimotor": 1,
-                        "reason_sensorimotor": f"felt+{adj.lemma_.lower()}",
-                        "conf": self._confidence(doc),
-                    }
-
-        # Body noun cues (det + body noun) + a state adjective/verb nearby
-        if "BODY_NOUN_CUE" in labs:
-            return {
-                "sensorimotor": 1,
-                "reason_sensorimotor": "body_noun_context",
-                "conf": self._confidence(doc),
-            }
-
-        # Default: no sensorimotor
-        return {"sensorimotor": 0, "reason_sensorimotor": "", "conf": self._confidence(doc)}
+            reason = "epistemic_felt"
+        else:
+            # FEEL + ADJ where adj is embodied (gross, sweaty, dizzy…)
+            for mid, start, end in matches:
+                if self._resolve_match(mid) == "FELT_ADJ":
+                    adj = doc[start + 1]
+                    lemmas, _, fuzzy = self._forms(doc)
+                    lem = lemmas[adj.i]
+                    if lem in self.embodied_eval_adjs and not self._is_negated(adj):
+                        flag, reason = 1, f"felt+{fuzzy.get(adj.i, lem)}"
+                        break
+            else:
+                # Body noun cues (det + body noun) + a state adjective/verb nearby
+                if "BODY_NOUN_CUE" in labs:
+                    flag, reason = 1, "body_noun_context"
+
+        out = {"sensorimotor": flag}
+        if reasons:
+            out["reason_sensorimotor"] = reason
+        out["conf"] = self._confidence(doc)
+        return out
 
     # ----------------- Motor & Objects with POS/DET guards -----------------
-    def code_motor(self, doc):
+    def code_motor(self, doc, reasons=True):
         hits = []
-        for tok in doc:
-            if tok.lemma_.lower() in self.motor:
+        lemmas, _, fuzzy = self._forms(doc)
+        for tok, lem in zip(doc, lemmas):
+            if lem in self.motor:
                 # prefer verbs (actions) and posture nouns with auxiliaries
-                if tok.pos_ in ("VERB", "AUX") or tok.lemma_.lower() in self.cfg["motor"]["postures"]:
-                    hits.append(tok.lemma_.lower())
+                if tok.pos_ in ("VERB", "AUX") or lem in self.motor_postures:
+                    hits.append(fuzzy.get(tok.i, lem))
+                    if not reasons:
+                        break
+        if not reasons:
+            return {"motor": 1 if hits else 0}
         return {"motor": 1 if hits else 0, "reason_motor": ",".join(sorted(set(hits)))}
 
-    def code_objects(self, doc):
+    def code_objects(self, doc, reasons=True):
         hits = []
-        for tok in doc:
-            lem = tok.lemma_.lower()
+        lemmas, _, fuzzy = self._forms(doc)
+        for tok, lem in zip(doc, lemmas):
             if lem in self.sacred_objects and tok.pos_ == "NOUN":
-                if not self._needs_det_ok(tok):
+                if not self._needs_det_ok(tok, lem):
                     continue
-                hits.append(lem)
+                hits.append(fuzzy.get(tok.i, lem))
+                if not reasons:
+                    break
+        if not reasons:
+            return {"object": 1 if hits else 0}
         return {"object": 1 if hits else 0, "reason_object": ",".join(sorted(set(hits)))}
 
     # ----------------- Valence (keyword baseline; you can replace with classifier later) -----------------
-    def code_valence(self, doc):
+    def code_valence(self, doc, reasons=True):
         pos_hits, neg_hi, neg_lo = [], [], []
-        for tok in doc:
-            w = tok.lemma_.lower()
-            if w in set(
-                self.cfg["valence"]["awe"]
-                + self.cfg["valence"]["reverence"]
-                + self.cfg["valence"]["peace"]
-                + self.cfg["valence"]["comfort"]
-                + self.cfg["valence"]["ecstasy"]
-                + self.cfg["valence"]["positive_low_arousal"]
-            ):
-                pos_hits.append(w)
-            if w in set(self.cfg["valence"]["negative_high_arousal"]):
-                neg_hi.append(w)
-            if w in set(self.cfg["valence"]["negative_low_arousal"]):
-                neg_lo.append(w)
+        lemmas, _, fuzzy = self._forms(doc)
+        for i, w in enumerate(lemmas):
+            if w in self.valence_pos:
+                pos_hits.append(fuzzy.get(i, w))
+            if w in self.valence_neg_hi:
+                neg_hi.append(fuzzy.get(i, w))
+                if not reasons:  # highest-priority label, nothing can override it
+                    break
+            if w in self.valence_neg_lo:
+                neg_lo.append(fuzzy.get(i, w))
         label = ""
         if neg_hi:
             label = "negative_high_arousal"
@@ -262,40 +1008,236 @@ class RuleEngine:
             label = "negative_low_arousal"
         elif pos_hits:
             label = "positive"
+        if not reasons:
+            return {"valence_label": label}
         return {"valence_label": label, "reason_valence": ",".join(sorted(set(pos_hits + neg_hi + neg_lo)))}
 
     # ----------------- Settings -----------------
-    def code_setting(self, doc):
+    def code_setting(self, doc, reasons=True):
         hits = []
-        for tok in doc:
-            lem = tok.lemma_.lower()
-            if lem in set(
-                self.cfg["setting"]["structural"]
-                + self.cfg["setting"]["sacred_tokens"]
-                + self.cfg["setting"]["liminal"]
-            ):
+        lemmas, _, fuzzy = self._forms(doc)
+        fuzzy_hit = False
+        for i, lem in enumerate(lemmas):
+            if lem in self.setting_lex:
                 hits.append(lem)
-        return {
-            "setting_hits": ",".join(sorted(set(hits))) if hits else "",
-            "reason_setting": "lex",
-        }
+                fuzzy_hit = fuzzy_hit or i in fuzzy
+        out = {"setting_hits": ",".join(sorted(set(hits))) if hits else ""}
+        if reasons:
+            out["reason_setting"] = "lex,fuzzy" if fuzzy_hit else "lex"
+        return out
+
+    # ----------------- Lexical prefilter -----------------
+    def _lemma_tables(self):
+        """Lemmatizer rules, exceptions, and lookups used to bound a token's possible lemmas.
+
+        ``None`` when the pipeline lemmatizes in a way these tables cannot
+        describe, which turns the prefilter off.
+        """
+
+        if self._lemma_tables_cache is None:
+            rules: List[Tuple[str, str]] = []
+            exc: Dict[str, List[str]] = {}
+            lookup: Dict[str, str] = {}
+            ruled: Dict[str, Optional[set]] = {}
+            supported = True
+            names = getattr(self.nlp, "pipe_names", [])
+            if "lemmatizer" in names:
+                lemmatizer = self.nlp.get_pipe("lemmatizer")
+                lookups = getattr(lemmatizer, "lookups", None)
+                supported = lookups is not None and getattr(lemmatizer, "mode", None) in ("rule", "lookup")
+                if supported and lookups.has_table("lemma_rules"):
+                    for pos_rules in lookups.get_table("lemma_rules").values():
+                        rules.extend((old, new) for old, new in pos_rules)
+                if supported and lookups.has_table("lemma_exc"):
+                    for forms in lookups.get_table("lemma_exc").values():
+                        for form, lemmas in forms.items():
+                            exc.setdefault(form, []).extend(lemmas)
+                if supported and lookups.has_table("lemma_lookup"):
+                    lookup = lookups.get_table("lemma_lookup")
+            tables = (rules, exc, lookup, ruled) if supported else None
+            if tables is not None and "attribute_ruler" in names:
+                for entry in self.nlp.get_pipe("attribute_ruler").patterns:
+                    lemma = entry.get("attrs", {}).get("LEMMA")
+                    if lemma is None:
+                        continue
+                    literals = set()
+                    for pattern in entry["patterns"]:
+                        spec = pattern[entry.get("index", 0)]
+                        values = [v for k, v in spec.items() if k in ("ORTH", "TEXT", "LOWER", "NORM")]
+                        if len(values) != 1:
+                            literals = None
+                            break
+                        value = values[0]
+                        value = value.get("IN") if isinstance(value, dict) else [value]
+                        if not isinstance(value, list):
+                            literals = None
+                            break
+                        literals.update(str(v).lower() for v in value)
+                    # None: the rule matches on more than literal text, so any token may carry ``lemma``.
+                    key = str(lemma).lower()
+                    if key in ruled and (ruled[key] is None or literals is None):
+                        ruled[key] = None
+                    else:
+                        ruled[key] = ruled.get(key, set()) | literals
+            self._lemma_tables_cache = (tables,)
+        return self._lemma_tables_cache[0]
+
+    def _lemma_candidates(self, tok) -> set:
+        low = tok.lower_
+        lemmas = {low}
+        if tok.lemma_:  # set while tokenizing by the lightweight backend
+            lemmas.add(tok.lemma_.lower())
+        tables = self._lemma_tables()
+        if tables:
+            rules, exc, lookup, _ = tables
+            lemmas.update(lemma.lower() for lemma in exc.get(low, ()))
+            lemmas.update(low[: len(low) - len(old)] + new for old, new in rules if low.endswith(old))
+            for form in (tok.text, low):
+                if form in lookup:
+                    lemmas.add(str(lookup[form]).lower())
+        if self._spelling is not None:
+            lemmas = {self._canonical(lemma) for lemma in lemmas}
+        if self._fuzzy_index is not None:
+            lemmas.update({self._fuzzy_index.lookup(lemma) for lemma in lemmas} - {None})
+        return lemmas
+
+    def _triggers(self, selected: Tuple[str, ...]):
+        """Trigger words and whitespace-free phrases for ``selected``; ``None`` disables the prefilter."""
+
+        if selected not in self._triggers_cache:
+            tables = self._lemma_tables()
+            triggers = None
+            if self.prefilter and tables is not None:
+                words = set()
+                for cat in selected:
+                    for attr in _TRIGGER_SETS[cat]:
+                        words.update(str(term).lower() for term in getattr(self, attr))
+                    words.update(_TRIGGER_WORDS.get(cat, ()))
+                for lemma, literals in tables[3].items():
+                    if lemma in words:
+                        if literals is None:
+                            break
+                        words.update(literals)
+                else:
+                    phrases = self._with_variants(self.presence_phrases) if "presence" in selected else ()
+                    triggers = (frozenset(words), tuple("".join(p.lower().split()) for p in phrases))
+            self._triggers_cache[selected] = triggers
+        return self._triggers_cache[selected]
+
+    def may_code(self, text: str, selected: Tuple[str, ...] = CATEGORIES) -> bool:
+        """Cheap pre-parse check: ``False`` only if ``text`` cannot produce any code.
+
+        Tokenizes without running the pipeline and compares every token's
+        possible lemmas against the selected lexicons; multiword presence
+        phrases are looked up in the text with whitespace removed.
+        """
+
+        triggers = self._triggers(selected)
+        if triggers is None:
+            return True
+        words, phrases = triggers
+        if phrases:
+            squashed = "".join(text.lower().split())
+            if any(phrase in squashed for phrase in phrases):
+                return True
+        max_chars = self._max_chars()
+        chunks = segment_text(text, max_chars) if len(text) > max_chars else (text,)
+        for chunk in chunks:
+            for tok in self.nlp.make_doc(chunk):
+                if not words.isdisjoint(self._lemma_candidates(tok)):
+                    return True
+        return False
+
+    def _empty_result(self, selected: Tuple[str, ...], codes_only: bool) -> dict:
+        key = (selected, codes_only)
+        if key not in self._empty_results:
+            self._empty_results[key] = self._code_doc(self.nlp.make_doc(""), selected, codes_only)
+        return dict(self._empty_results[key])
 
     # ----------------- Public API -----------------
-    def analyze_text(self, text: str) -> dict:
-        doc = self.nlp(text or "")
+    def disabled_pipes(self, categories: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Pipeline components that none of the selected coders rely on."""
+
+        if categories not in self._disabled_pipes:
+            needed = set(_BASE_PIPES)
+            for cat in categories:
+                needed.update(_CATEGORY_PIPES.get(cat, ()))
+            names = getattr(self.nlp, "pipe_names", [])
+            self._disabled_pipes[categories] = tuple(p for p in names if p not in needed)
+        return self._disabled_pipes[categories]
+
+    def _max_chars(self) -> int:
+        return min(self.chunk_chars, getattr(self.nlp, "max_length", self.chunk_chars))
 
+    def parse(self, text: str, disable: Iterable[str] = ()):
+        """Parse ``text``, sharding long inputs into chunks merged into one doc.
+
+        Chunks go through ``nlp.pipe`` (across the engine's ``n_process``
+        persistent workers) and are joined with ``Doc.from_docs``, so token
+        indices run across the whole text and window-based guards see
+        neighbours on both sides of a chunk boundary.
+        """
+
+        if len(text) <= self._max_chars():
+            return self.nlp(text, disable=disable)
+        chunks = segment_text(text, self._max_chars())
+        if self._chunk_pool is not None:
+            docs = self._chunk_pool.parse(chunks, tuple(disable))
+        else:
+            docs = list(self.nlp.pipe(chunks, disable=disable))
+        return type(docs[0]).from_docs(docs, ensure_whitespace=False)
+
+    def _code_doc(self, doc, selected: Tuple[str, ...], codes_only: bool = False) -> dict:
         out = {}
-        out.update(self.code_supernatural_agent(doc))
-        out.update(self.code_presence(doc))
-        out.update(self._code_simple_lex(doc, self.visual, "visual"))
-        out.update(self._code_simple_lex(doc, self.auditory, "auditory"))
-        out.update(self._code_simple_lex(doc, self.tactile, "tactile"))
-        out.update(self._code_simple_lex(doc, self.olfactory, "olfactory"))
-        out.update(self._code_simple_lex(doc, self.gustatory, "gustatory"))
-        out.update(self.code_bodystate_sensorimotor(doc))
-        out.update(self.code_motor(doc))
-        out.update(self.code_objects(doc))
-        out.update(self.code_valence(doc))
-        out.update(self.code_setting(doc))
+        for cat in selected:
+            out.update(self._coders[cat](doc, not codes_only))
+        return out
+
+    def analyze_text(
+        self, text: str, categories: Optional[Iterable[str]] = None, codes_only: bool = False
+    ) -> dict:
+        """Code one text.
 
+        ``codes_only`` drops the ``reason_*`` columns and lets coders stop at
+        their first hit wherever the code itself does not depend on later ones.
+        """
+
+        selected = resolve_categories(categories)
+        text = text or ""
+        if not self.may_code(text, selected):
+            return self._empty_result(selected, codes_only)
+        doc = self.parse(text, disable=self.disabled_pipes(selected))
+        return self._code_doc(doc, selected, codes_only)
+
+    def analyze_texts(
+        self,
+        texts: Iterable[str],
+        categories: Optional[Iterable[str]] = None,
+        codes_only: bool = False,
+        batch_size: int = 256,
+    ) -> List[dict]:
+        """Code many texts, parsing the short ones together through ``nlp.pipe``.
+
+        Results match ``analyze_text`` row for row; texts above the chunk limit
+        are parsed individually via ``parse``, and texts that ``may_code``
+        rules out get the empty result without being parsed.
+        """
+
+        selected = resolve_categories(categories)
+        disable = self.disabled_pipes(selected)
+        texts = [text or "" for text in texts]
+        candidates = [self.may_code(text, selected) for text in texts]
+        max_chars = self._max_chars()
+        short = [i for i, text in enumerate(texts) if candidates[i] and len(text) <= max_chars]
+        docs: List[object] = [None] * len(texts)
+        piped = self.nlp.pipe((texts[i] for i in short), disable=disable, batch_size=batch_size)
+        for i, doc in zip(short, piped):
+            docs[i] = doc
+        out = []
+        for i, text in enumerate(texts):
+            if not candidates[i]:
+                out.append(self._empty_result(selected, codes_only))
+                continue
+            doc = docs[i] if docs[i] is not None else self.parse(text, disable=disable)
+            out.append(self._code_doc(doc, selected, codes_only))
         return out
@@ -0,0 +1,120 @@
+"""Hash-partitioned shards for corpus runs spread over independent machines.
+
+``write_shards`` splits an input into N CSV shards, each row tagged with its
+original position in ``ROW_COLUMN``; the shards can be coded anywhere that
+sees the same storage, and ``merge_outputs`` streams the coded shards back
+into input order. Nothing coordinates the workers except the manifest, whose
+fingerprint pins the configs and options every shard must be coded with.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+import csv
+import hashlib
+import heapq
+import json
+
+from io_utils import iter_frames, sheet_columns
+
+ROW_COLUMN = "_row"
+MANIFEST_NAME = "manifest.json"
+
+
+def shard_of(key: str, shards: int) -> int:
+    """Stable shard index for ``key`` (independent of PYTHONHASHSEED)."""
+
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def fingerprint(paths: Sequence[Optional[Union[str, Path]]], options: Dict[str, Any]) -> str:
+    """Hash of the config/preset file contents and the coding options."""
+
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(b"\0" if path is None else Path(path).read_bytes())
+        h.update(b"\1")
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def shard_path(out_dir: Union[str, Path], index: int, prefix: str = "shard") -> Path:
+    return Path(out_dir) / f"{prefix}-{index:05d}.csv"
+
+
+def write_shards(
+    in_file: Union[str, Path],
+    out_dir: Union[str, Path],
+    shards: int,
+    key_col: Optional[str] = None,
+    chunksize: int = 10_000,
+) -> List[Dict[str, Any]]:
+    """Stream ``in_file`` into ``shards`` CSVs, partitioned by ``key_col`` (default: row number)."""
+
+    if shards < 1:
+        raise ValueError("shards must be at least 1")
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    handles = [shard_path(out, i).open("w", encoding="utf-8", newline="") for i in range(shards)]
+    counts = [0] * shards
+    try:
+        writers = [csv.writer(fh, lineterminator="\n") for fh in handles]
+        header = [ROW_COLUMN, *sheet_columns(in_file)]
+        for writer in writers:
+            writer.writerow(header)
+        row = 0
+        for frame in iter_frames(in_file, chunksize=chunksize):
+            keys = frame[key_col].tolist() if key_col is not None else None
+            for offset, values in enumerate(frame.itertuples(index=False, name=None)):
+                index = shard_of(str(keys[offset] if keys is not None else row), shards)
+                writers[index].writerow([row, *values])
+                counts[index] += 1
+                row += 1
+    finally:
+        for fh in handles:
+            fh.close()
+    return [{"file": shard_path(out, i).name, "rows": counts[i]} for i in range(shards)]
+
+
+def write_manifest(out_dir: Union[str, Path], manifest: Dict[str, Any]) -> Path:
+    path = Path(out_dir) / MANIFEST_NAME
+    path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return path
+
+
+def load_manifest(path: Union[str, Path]) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _read_rows(path: Path) -> Iterator[List[str]]:
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        next(reader, None)
+        for values in reader:
+            yield values
+
+
+def merge_outputs(paths: Sequence[Union[str, Path]], out_file: Union[str, Path]) -> int:
+    """Merge coded shards (each sorted by ``ROW_COLUMN``) into one CSV in input order."""
+
+    files = [Path(p) for p in paths]
+    headers = []
+    for path in files:
+        with path.open("r", encoding="utf-8", newline="") as fh:
+            headers.append(next(csv.reader(fh), []))
+    if any(header != headers[0] for header in headers) or headers[0][:1] != [ROW_COLUMN]:
+        raise ValueError("Coded shards have different columns")
+
+    out = Path(out_file)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    with out.open("w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh, lineterminator="\n")
+        writer.writerow(headers[0][1:])
+        for values in heapq.merge(*(_read_rows(p) for p in files), key=lambda v: int(v[0])):
+            if int(values[0]) != rows:
+                raise ValueError(f"Row {rows} is missing from the coded shards")
+            writer.writerow(values[1:])
+            rows += 1
+    return rows
@@ -165,6 +165,10 @@ class SimpleToken:
     def subtree(self) -> Tuple["SimpleToken", ...]:
         return (self,)
 
+    @property
+    def ancestors(self) -> Tuple[()]:
+        return tuple()
+
     def nbor(self, offset: int) -> "SimpleToken":
         return self.doc[self.i + offset]
 
@@ -184,10 +188,29 @@ class SimpleDoc:
     def __init__(self, nlp: "SimpleNLP", text: str) -> None:
         self.nlp = nlp
         self.text = text
+        self.user_data: Dict[Any, Any] = {}
         token_texts = _tokenize(text)
         self.tokens: List[SimpleToken] = [SimpleToken(self, tok, i) for i, tok in enumerate(token_texts)]
         self._assign_pos_tags()
 
+    @classmethod
+    def from_docs(cls, docs: Sequence["SimpleDoc"], ensure_whitespace: bool = True) -> "SimpleDoc":
+        merged = cls.__new__(cls)
+        merged.nlp = docs[0].nlp
+        merged.text = ""
+        merged.user_data = {}
+        merged.tokens = []
+        for doc in docs:
+            if ensure_whitespace and merged.text and not merged.text[-1].isspace():
+                merged.text += " "
+            merged.text += doc.text
+            for token in doc.tokens:
+                token.doc = merged
+                token.i = len(merged.tokens)
+                merged.tokens.append(token)
+        merged._assign_pos_tags()
+        return merged
+
     @property
     def vocab(self) -> SimpleVocab:
         return self.nlp.vocab
@@ -226,12 +249,20 @@ class SimpleDoc:
 
 
 class SimpleNLP:
+    pipe_names: List[str] = []
+
     def __init__(self) -> None:
         self.vocab = SimpleVocab()
 
-    def __call__(self, text: str) -> SimpleDoc:
+    def __call__(self, text: str, disable: Iterable[str] = ()) -> SimpleDoc:
         return SimpleDoc(self, text)
 
+    def pipe(
+        self, texts: Iterable[str], disable: Iterable[str] = (), n_process: int = 1, batch_size: int = 1000
+    ) -> Iterable[SimpleDoc]:
+        for text in texts:
+            yield SimpleDoc(self, text)
+
     def make_doc(self, text: str) -> SimpleDoc:
         return SimpleDoc(self, text)
 
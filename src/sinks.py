@@ -0,0 +1,130 @@
+"""SQLite sink for coded rows, queryable without re-reading output CSVs.
+
+Rows are upserted by ``(new_id, engine_version, preset_version)`` in large
+transactions (a row with a blank id is keyed ``#row:<row>``, which cannot
+collide with a real id, numeric or not), so re-running a corpus with the same versions replaces its rows
+while other versions sit alongside. Code columns are indexed, e.g.
+
+    SELECT preset_version, avg(visual) FROM coded GROUP BY preset_version;
+
+DuckDB reads the same file with ``ATTACH 'coded.sqlite' (TYPE sqlite)``.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import sqlite3
+
+from rules import columns_for
+
+TABLE = "coded"
+ROW_KEY_PREFIX = "#row:"
+KEY_COLUMNS = ("new_id", "engine_version", "preset_version")
+# Flag columns hold 0/1 and ``conf`` 1..3; everything else is text.
+INTEGER_COLUMNS = frozenset(
+    {
+        "agent_supernatural",
+        "conf",
+        "visual",
+        "auditory",
+        "tactile",
+        "olfactory",
+        "gustatory",
+        "sensorimotor",
+        "motor",
+        "object",
+    }
+)
+
+
+def row_key(new_id: Optional[Any], row: Optional[int]) -> str:
+    """``new_id`` stripped, or ``#row:<row>`` when it is blank."""
+
+    key = "" if new_id is None else str(new_id).strip()
+    return key or f"{ROW_KEY_PREFIX}{row}"
+
+
+class SQLiteSink:
+    """Batched upserts of coded rows into one SQLite table.
+
+    ``write`` buffers rows and commits every ``batch_rows``; ``close`` (or
+    leaving the ``with`` block) flushes the rest. Code-column indexes are
+    created on close, so a first bulk load does not maintain them row by row.
+    """
+
+    def __init__(self, path: Union[str, Path], batch_rows: int = 10_000) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_rows = batch_rows
+        self.columns: Tuple[str, ...] = columns_for()
+        self._pending: Dict[Tuple[str, ...], List[Tuple[Any, ...]]] = {}
+        self._buffered = 0
+        # The API writes from its request threads; callers serialise access.
+        self.conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_table()
+
+    def __enter__(self) -> "SQLiteSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _create_table(self) -> None:
+        defs = ["new_id TEXT NOT NULL", "engine_version TEXT NOT NULL", "preset_version TEXT NOT NULL"]
+        defs += ["backend TEXT", "row INTEGER"]
+        defs += [f"{col} {'INTEGER' if col in INTEGER_COLUMNS else 'TEXT'}" for col in self.columns]
+        with self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ({', '.join(defs)}, PRIMARY KEY ({', '.join(KEY_COLUMNS)}))"
+            )
+
+    def write(
+        self,
+        records: Iterable[Tuple[Optional[str], Optional[int], Dict[str, Any]]],
+        engine_version: str,
+        preset_version: str,
+        backend: str = "",
+    ) -> None:
+        """Queue ``(new_id, row, coded)`` records; only the coded columns present are set.
+
+        Blank ids are keyed by :func:`row_key`.
+        """
+
+        for new_id, row, coded in records:
+            present = tuple(col for col in self.columns if col in coded)
+            values = (row_key(new_id, row), engine_version, preset_version, backend, row, *(coded[c] for c in present))
+            self._pending.setdefault(present, []).append(values)
+            self._buffered += 1
+            if self._buffered >= self.batch_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self._buffered:
+            return
+        with self.conn:  # one transaction per batch
+            for present, values in self._pending.items():
+                self.conn.executemany(self._upsert_sql(present), values)
+        self._pending.clear()
+        self._buffered = 0
+
+    @staticmethod
+    def _upsert_sql(present: Sequence[str]) -> str:
+        columns = [*KEY_COLUMNS, "backend", "row", *present]
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col not in KEY_COLUMNS)
+        return (
+            f"INSERT INTO {TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET {updates}"
+        )
+
+    def create_indexes(self) -> None:
+        with self.conn:
+            for col in self.columns:
+                if not col.startswith("reason_"):
+                    self.conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_{col} ON {TABLE} ({col})")
+
+    def close(self) -> None:
+        self.flush()
+        self.create_indexes()
+        self.conn.close()
@@ -0,0 +1,147 @@
+"""Running corpus-level aggregates over coded rows.
+
+A ``CorpusSummary`` keeps only counters, so memory grows with the number of
+categories and lexicon terms, never with the number of rows. Summaries from
+separate shards merge exactly with ``merge``; ``to_dict``/``from_dict`` round
+trip through JSON.
+
+    python src/summary.py shard1.json shard2.json --out merged.json
+"""
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+import argparse
+import json
+
+# Columns whose presence counts towards prevalence, with the code they report.
+PREVALENCE_COLUMNS = {
+    "agent_supernatural": "agent",
+    "presence_label": "presence",
+    "visual": "visual",
+    "auditory": "auditory",
+    "tactile": "tactile",
+    "olfactory": "olfactory",
+    "gustatory": "gustatory",
+    "sensorimotor": "sensorimotor",
+    "motor": "motor",
+    "object": "object",
+    "valence_label": "valence",
+    "setting_hits": "setting",
+}
+# Columns holding delimited term lists, and their delimiter.
+TERM_COLUMNS = {
+    "reason_visual": ",",
+    "reason_auditory": ",",
+    "reason_tactile": ",",
+    "reason_olfactory": ",",
+    "reason_gustatory": ",",
+    "reason_motor": ",",
+    "reason_object": ",",
+    "reason_valence": ",",
+    "setting_hits": ",",
+    "presence_label": ";",
+}
+DEFAULT_COOCCURRENCE = ("visual", "auditory", "tactile")
+
+
+def _terms(column: str, value: Any) -> Iterable[str]:
+    if not value:
+        return ()
+    if column == "reason_agent":  # "lemma=god, pos=NOUN"
+        return (value.split(",")[0].partition("=")[2],)
+    if column == "reason_sensorimotor":
+        return (value,)
+    return (term for term in str(value).split(TERM_COLUMNS[column]) if term)
+
+
+class CorpusSummary:
+    """Prevalence, term counts, co-occurrence, and label distributions."""
+
+    def __init__(self, cooccurrence: Sequence[str] = DEFAULT_COOCCURRENCE) -> None:
+        self.docs = 0
+        self.cooccurrence_codes = tuple(cooccurrence)
+        self.prevalence: Counter = Counter()
+        self.terms: Dict[str, Counter] = {}
+        self.cooccurrence: Counter = Counter()
+        self.valence: Counter = Counter()
+        self.conf: Counter = Counter()
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self.docs += 1
+        for column, code in PREVALENCE_COLUMNS.items():
+            if row.get(column):
+                self.prevalence[code] += 1
+        for column in ("reason_agent", "reason_sensorimotor", *TERM_COLUMNS):
+            for term in _terms(column, row.get(column)):
+                self.terms.setdefault(column, Counter())[term] += 1
+        present = [code for code in self.cooccurrence_codes if row.get(code)]
+        for i, a in enumerate(present):
+            for b in present[i:]:
+                self.cooccurrence[f"{a}|{b}"] += 1
+        if "valence_label" in row:
+            self.valence[row["valence_label"] or "none"] += 1
+        if "conf" in row:
+            self.conf[str(row["conf"])] += 1
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> "CorpusSummary":
+        for row in rows:
+            self.add(row)
+        return self
+
+    def merge(self, other: "CorpusSummary") -> "CorpusSummary":
+        if other.cooccurrence_codes != self.cooccurrence_codes:
+            raise ValueError("Cannot merge summaries with different co-occurrence codes")
+        self.docs += other.docs
+        self.prevalence.update(other.prevalence)
+        for column, counts in other.terms.items():
+            self.terms.setdefault(column, Counter()).update(counts)
+        self.cooccurrence.update(other.cooccurrence)
+        self.valence.update(other.valence)
+        self.conf.update(other.conf)
+        return self
+
+    def to_dict(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """Serialize; ``top`` truncates term lists (the result is then not mergeable)."""
+
+        return {
+            "docs": self.docs,
+            "prevalence": dict(self.prevalence),
+            "prevalence_rate": {code: n / self.docs for code, n in self.prevalence.items()} if self.docs else {},
+            "terms": {column: dict(counts.most_common(top)) for column, counts in sorted(self.terms.items())},
+            "cooccurrence_codes": list(self.cooccurrence_codes),
+            "cooccurrence": dict(self.cooccurrence),
+            "valence": dict(self.valence),
+            "conf": dict(self.conf),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorpusSummary":
+        summary = cls(data.get("cooccurrence_codes", DEFAULT_COOCCURRENCE))
+        summary.docs = data.get("docs", 0)
+        summary.prevalence = Counter(data.get("prevalence", {}))
+        summary.terms = {column: Counter(counts) for column, counts in data.get("terms", {}).items()}
+        summary.cooccurrence = Counter(data.get("cooccurrence", {}))
+        summary.valence = Counter(data.get("valence", {}))
+        summary.conf = Counter(data.get("conf", {}))
+        return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge summary JSON files from separate shards.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    merged: Optional[CorpusSummary] = None
+    for path in args.files:
+        part = CorpusSummary.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+        merged = part if merged is None else merged.merge(part)
+    assert merged is not None
+    Path(args.out).write_text(json.dumps(merged.to_dict(), indent=2), encoding="utf-8")
+    print(f"Merged {len(args.files)} summaries ({merged.docs} docs) into {args.out}")
+
+
+if __name__ == "__main__":
+    main()
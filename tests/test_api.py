@@ -0,0 +1,214 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from rules import columns_for
+
+PRESET = "dreams-sensorimotor@0.4.0"
+TEXT = "I saw a bright light and heard a voice."
+
+client = TestClient(app)
+
+
+def code(**payload):
+    payload.setdefault("rows", [{"row": 2, "text": TEXT}])
+    return client.post("/code", json=payload)
+
+
+def test_preset_without_categories_codes_every_category():
+    coded = code(preset=PRESET).json()["results"][0]["coded"]
+    assert set(columns_for()) <= set(coded)
+    assert coded["visual"] == 1
+    selected = code(preset=PRESET, categories=["agent"]).json()["results"][0]["coded"]
+    assert "visual" not in selected and "agent_supernatural" in selected
+
+
+def test_preset_can_opt_in_to_selecting_its_categories(monkeypatch):
+    import copy
+
+    from api import deps
+
+    ruleset = copy.deepcopy(deps.get_presets_cache()[PRESET])
+    ruleset["meta"]["select_categories"] = True
+    monkeypatch.setitem(deps.get_presets_cache(), "selecting@1", ruleset)
+    coded = code(preset="selecting@1").json()["results"][0]["coded"]
+    assert set(coded) == set(columns_for(ruleset["meta"]["categories"]))
+    assert "visual" in code(preset="selecting@1", categories=["visual"]).json()["results"][0]["coded"]
+
+
+def test_corpus_frequencies_count_only_requested_terms(tmp_path, monkeypatch):
+    from api import deps
+
+    (tmp_path / "coded.csv").write_text("text\nI felt dizzier\nso much dizzier near a cold spot\n", encoding="utf-8")
+    monkeypatch.setattr(deps.SETTINGS, "CORPUS_DIR", str(tmp_path))
+    monkeypatch.setattr(deps.SETTINGS, "CORPUS_TEXT_COLS", "text")
+    counts = deps.get_corpus_frequencies(["dizzier"])
+    assert counts == {"dizzier": 2}
+    counts = deps.get_corpus_frequencies(["dizzier", "Cold Spot"])
+    assert counts == {"dizzier": 2, "cold spot": 1}
+    body = client.post("/extend_lexicon", json={"categories": ["bodystate"], "keywords": {"bodystate.dizzy": ["dizzy"]}}).json()
+    assert body["proposed"]["bodystate.dizzy"][0] == {"term": "dizzier", "source": "inflection", "count": 2, "base": "dizzy"}
+
+
+def test_validate_presets_endpoint_does_not_fork(tmp_path, monkeypatch):
+    from api import deps, preset_validation
+
+    preset = (REPO_ROOT / "configs/presets" / f"{PRESET}.json").read_text(encoding="utf-8")
+    for name in ("a@1.json", "b@1.json"):
+        (tmp_path / name).write_text(preset, encoding="utf-8")
+    monkeypatch.setattr(deps.SETTINGS, "PRESET_DIR", str(tmp_path))
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("request handler started a process pool")
+
+    monkeypatch.setattr(preset_validation, "ProcessPoolExecutor", no_pool)
+    body = client.get("/validate_presets").json()
+    assert body["ok"] and len(body["results"]) == 2
+
+
+def test_columnar_and_msgpack_layouts_match_row_json():
+    from api import responses
+
+    rows = [{"row": 2, "text": TEXT, "new_id": "a"}, {"row": 3, "text": "Nothing happened."}]
+    by_row = code(rows=rows, codes_only=True).json()["results"]
+    payload = {"rows": rows, "codes_only": True}
+    columnar = client.post("/code", json=payload, headers={"Accept": responses.COLUMNAR_JSON})
+    assert columnar.headers["content-type"] == responses.COLUMNAR_JSON
+    body = columnar.json()
+    assert body["row"] == [2, 3] and body["new_id"] == ["a", None]
+    assert set(body["columns"]) == set(by_row[0]["coded"])
+    for i, result in enumerate(by_row):
+        assert {col: values[i] for col, values in body["columns"].items()} == result["coded"]
+
+    if responses.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    packed = client.post("/code", json=payload, headers={"Accept": "application/msgpack"})
+    assert packed.headers["content-type"] == responses.MSGPACK
+    assert responses.msgpack.unpackb(packed.content, raw=False) == body
+
+
+def test_json_fallback_without_optional_encoders(monkeypatch):
+    from api import responses
+
+    expected = code().json()
+    monkeypatch.setattr(responses, "orjson", None)
+    monkeypatch.setattr(responses, "msgpack", None)
+    assert code().json() == expected
+    payload = {"rows": [{"row": 2, "text": TEXT}]}
+    fallback = client.post("/code", json=payload, headers={"Accept": "application/msgpack, application/json;q=0.5"})
+    assert fallback.headers["content-type"] == responses.JSON and fallback.json() == expected
+    refused = client.post("/code", json=payload, headers={"Accept": "application/msgpack"})
+    assert refused.status_code == 406
+
+
+def test_debug_profile_requires_the_admin_token(monkeypatch):
+    import tracemalloc
+
+    from api import deps
+
+    payload = {"rows": [{"row": 2, "text": TEXT}]}
+    assert client.post("/debug/profile", json=payload).status_code == 404  # disabled without ADMIN_TOKEN
+    monkeypatch.setattr(deps.SETTINGS, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/debug/profile", json=payload).status_code == 401
+    assert client.post("/debug/profile", json=payload, headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+    expected = code().json()
+    profiled = client.post("/debug/profile?limit=5", json=payload, headers={"X-Admin-Token": "s3cret"})
+    assert profiled.status_code == 200
+    body = profiled.json()
+    assert [stage["stage"] for stage in body["stages"]] == ["engine", "code"]
+    assert 0 < len(body["top_functions"]) <= 5
+    failed = client.post(
+        "/debug/profile", json={**payload, "preset": "missing@0"}, headers={"X-Admin-Token": "s3cret"}
+    )
+    assert failed.status_code == 400
+    # The profilers are process-wide; nothing may stay switched on for later requests.
+    assert not tracemalloc.is_tracing()
+    assert sys.getprofile() is None
+    assert code().json() == expected
+
+
+def gauge(name):
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.split()[1])
+    raise AssertionError(f"gauge {name} not exported")
+
+
+def test_vocab_recycle_swaps_engines_and_resets_growth(monkeypatch):
+    import time
+
+    from api import deps, router_code
+
+    choice = router_code.engine_choice()
+    old_engine = router_code._BASE_ENGINES[choice]
+    recycles = gauge("textcoder_engine_recycles")
+    # Pretend the vocab has grown past the budget since the engine was built.
+    monkeypatch.setattr(deps.SETTINGS, "VOCAB_RECYCLE_STRINGS", 10)
+    router_code._VOCAB_BASELINES[choice] = old_engine.vocab_size() - 50  # the recycle resets it
+    assert gauge("textcoder_vocab_growth_strings") == 50
+    expected = code().json()
+    deadline = time.monotonic() + 10
+    while gauge("textcoder_engine_recycles") == recycles:
+        assert time.monotonic() < deadline, "engine was not recycled"
+        assert code().json() == expected  # requests keep succeeding during the swap
+        time.sleep(0.01)
+    assert router_code._BASE_ENGINES[choice] is not old_engine
+    assert gauge("textcoder_vocab_growth_strings") == 0
+    assert code().json() == expected
+
+
+def test_engine_choice_picks_the_backend_and_stamps_it(tmp_path, monkeypatch):
+    import sqlite3
+
+    from api import deps, responses, router_code
+
+    fast = code(engine="fast").json()["results"][0]
+    assert fast["backend"] == router_code._BASE_ENGINES["fast"].backend == "simple"
+    payload = {"rows": [{"row": 2, "text": TEXT}], "engine": "fast"}
+    columnar = client.post("/code", json=payload, headers={"Accept": responses.COLUMNAR_JSON})
+    assert columnar.json()["backend"] == "simple"
+    assert code(engine="bogus").status_code == 422
+
+    monkeypatch.delitem(router_code._BASE_ENGINES, "accurate", raising=False)
+    unavailable = code(engine="accurate")
+    assert unavailable.status_code == 503
+    assert "not available" in unavailable.json()["detail"]
+
+    db = tmp_path / "results.db"
+    monkeypatch.setattr(deps.SETTINGS, "RESULTS_DB", str(db))
+    rows = [{"row": 2, "text": TEXT, "new_id": "3"}, {"row": 3, "text": "Nothing happened.", "new_id": " "}]
+    assert code(rows=rows, engine="fast", store=True).status_code == 200
+    with sqlite3.connect(db) as conn:
+        stored = conn.execute("SELECT new_id, backend, visual FROM coded ORDER BY row").fetchall()
+    # Blank ids are keyed like the CLI's, and never collide with a real numeric id.
+    assert stored == [("3", "simple", 1), ("#row:3", "simple", 0)]
+
+
+def test_coalescing_keeps_priorities_and_tenants_apart(monkeypatch):
+    from api import router_code
+
+    keys = []
+    run = router_code._COALESCER.run
+
+    def recording_run(key, engine, texts, **options):
+        keys.append(key)
+        return run(key, engine, texts, **options)
+
+    monkeypatch.setattr(router_code._COALESCER, "run", recording_run)
+    code(preset=PRESET)
+    code(preset=PRESET, priority="bulk")
+    client.post("/code", json={"preset": PRESET, "rows": [{"row": 2, "text": TEXT}]}, headers={"X-API-Key": "k1"})
+    assert len(set(keys)) == 3
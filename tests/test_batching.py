@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from api.batching import Coalescer
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+    def analyze_texts(self, texts, **options):
+        with self.lock:
+            self.calls.append(list(texts))
+        if texts == ["hold"]:
+            self.release.wait(5)
+        return [{"text": text} for text in texts]
+
+
+def test_concurrent_requests_share_one_batch():
+    engine = RecordingEngine()
+    coalescer = Coalescer(window_ms=200, max_rows=6)
+    requests = [[f"r{i}a", f"r{i}b"] for i in range(3)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # A request in flight under another key makes the first leader wait for company.
+        busy = pool.submit(coalescer.run, "other", engine, ["hold"])
+        while not engine.calls:
+            time.sleep(0.001)
+        results = list(pool.map(lambda texts: coalescer.run("preset", engine, texts), requests))
+        engine.release.set()
+        busy.result()
+    assert len(engine.calls) == 2
+    for texts, result in zip(requests, results):
+        assert [row["text"] for row in result] == texts
+
+
+def test_lone_request_skips_the_window():
+    engine = RecordingEngine()
+    coalescer = Coalescer(window_ms=5000, max_rows=6)
+    started = time.monotonic()
+    assert coalescer.run("preset", engine, ["a"]) == [{"text": "a"}]
+    assert time.monotonic() - started < 1
+
+
+def test_large_requests_bypass_coalescing():
+    engine = RecordingEngine()
+    coalescer = Coalescer(window_ms=200, max_rows=2)
+    assert coalescer.run("preset", engine, ["a", "b"]) == [{"text": "a"}, {"text": "b"}]
+    assert engine.calls == [["a", "b"]]
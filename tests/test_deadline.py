@@ -0,0 +1,83 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from api.deadline import ObservedEngine, Throughput, code_within, decode_continuation, encode_continuation
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TimedEngine:
+    """Advances the fake clock by ``seconds_per_char`` for every character coded."""
+
+    def __init__(self, backend, clock, seconds_per_char):
+        self.backend = backend
+        self.clock = clock
+        self.seconds_per_char = seconds_per_char
+
+    def analyze_texts(self, texts):
+        self.clock.now += sum(len(t) for t in texts) * self.seconds_per_char
+        return [{"text": t, "backend": self.backend} for t in texts]
+
+
+def run(engine, texts):
+    return engine.analyze_texts(texts)
+
+
+def make(clock):
+    throughput = Throughput({"spacy": 1000.0, "simple": 100_000.0}, weight=0.0)
+    accurate = TimedEngine("spacy", clock, 1 / 1000)
+    fast = TimedEngine("simple", clock, 1 / 100_000)
+    return throughput, accurate, fast
+
+
+def test_long_row_degrades_without_holding_back_the_rest(monkeypatch):
+    monkeypatch.setattr("api.deadline.ROW_OVERHEAD_CHARS", 0)
+    clock = Clock()
+    throughput, accurate, fast = make(clock)
+    texts = ["a" * 100, "b" * 5000, "c" * 100]
+    results, backends, pending = code_within(1.0, accurate, fast, texts, run, throughput, clock)
+    assert pending == []
+    assert backends == ["spacy", "simple", "spacy"]
+    assert [r["text"] for r in results] == texts
+
+
+def test_rows_past_the_budget_are_pending_without_fallback(monkeypatch):
+    monkeypatch.setattr("api.deadline.ROW_OVERHEAD_CHARS", 0)
+    clock = Clock()
+    throughput, accurate, _ = make(clock)
+    texts = ["x" * 400] * 4
+    results, backends, pending = code_within(1.0, accurate, None, texts, run, throughput, clock, slice_rows=1)
+    assert pending == [2, 3]
+    assert backends == ["spacy", "spacy", None, None]
+    assert results[2] is None
+
+
+def test_throughput_counts_engine_time_only(monkeypatch):
+    monkeypatch.setattr("api.deadline.ROW_OVERHEAD_CHARS", 0)
+    clock = Clock()
+    throughput = Throughput({}, weight=1.0)
+    engine = ObservedEngine(TimedEngine("spacy", clock, 1 / 1000), throughput, clock)
+
+    def queued_run(eng, texts):
+        clock.now += 5.0  # coalescing window and scheduler queue
+        return eng.analyze_texts(texts)
+
+    code_within(100.0, engine, None, ["x" * 500] * 3, queued_run, throughput, clock, slice_rows=1)
+    assert throughput.seconds("spacy", 1000) == pytest.approx(1.0)
+
+
+def test_continuation_round_trip():
+    state = {"preset": "p@1", "engine": "accurate", "categories": ["visual"], "codes_only": False, "rows": [3, 7]}
+    assert decode_continuation(encode_continuation(state)) == state
+    with pytest.raises(ValueError):
+        decode_continuation("not a token")
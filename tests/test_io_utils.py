@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "src"))
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from io_utils import iter_column, save_coded, sheet_columns
+
+CSV = "id,q1,text,q2\n007,a,I saw a light.,\n008,,,1.50\n009,c,Bells rang.,x\n"
+
+
+def test_iter_column_projects_text(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(CSV, encoding="utf-8")
+    assert sheet_columns(src) == ["id", "q1", "text", "q2"]
+    assert [t for chunk in iter_column(src, "text", chunksize=2) for t in chunk] == [
+        "I saw a light.",
+        "",
+        "Bells rang.",
+    ]
+    with pytest.raises(KeyError):
+        next(iter_column(src, "missing"))
+
+
+def test_save_coded_passes_columns_through_verbatim(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(CSV, encoding="utf-8")
+    rows = [{"visual": 1}, {"visual": 0}, {"visual": 0}]
+
+    out = save_coded(src, tmp_path / "all.csv", rows, ["visual"], chunksize=2)
+    assert out.read_text(encoding="utf-8").splitlines() == [
+        "id,q1,text,q2,visual",
+        "007,a,I saw a light.,,1",
+        "008,,,1.50,0",
+        "009,c,Bells rang.,x,0",
+    ]
+
+    out = save_coded(src, tmp_path / "ids.csv", rows, ["visual"], keep=["id"])
+    assert out.read_text(encoding="utf-8").splitlines() == ["id,visual", "007,1", "008,0", "009,0"]
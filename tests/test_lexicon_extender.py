@@ -3,7 +3,7 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from api.lexicon_extender import apply_extenders
+from api.lexicon_extender import apply_extenders, british_american, candidate_terms, count_terms, spelling_index
 
 
 def test_apply_extenders_generates_inflections():
@@ -18,3 +18,30 @@ def test_apply_extenders_applies_spelling_map():
     proposals = apply_extenders(["color"], {"color": "colour"})
     generated = {item["term"] for item in proposals["color"]}
     assert "colour" in generated
+
+
+def test_apply_extenders_skips_variants_the_engine_normalizes():
+    proposals = apply_extenders(["color", "half asleep"], {"color": "colour"}, normalized=True)
+    generated = {item["term"] for items in proposals.values() for item in items}
+    assert "colour" not in generated and "half-asleep" not in generated
+    assert "colors" in generated
+
+
+def test_spelling_index_is_bidirectional():
+    index = spelling_index({"color": "colour"})
+    assert british_american("colour", {}, index) == ["color", "colour"]
+    assert british_american("color", {}, index) == ["color", "colour"]
+
+
+def test_apply_extenders_ranks_and_filters_by_corpus_counts():
+    texts = ["I felt dizzier than ever", "so much dizzier", "the dizziest night"]
+    counts = count_terms(texts, candidate_terms(["dizzy"], {}))
+    assert "ever" not in counts  # only candidate terms are counted
+    proposals = apply_extenders(["dizzy"], {}, counts, min_count=1)
+    assert [item["term"] for item in proposals["dizzy"]] == ["dizzier", "dizziest"]
+    assert proposals["dizzy"][0]["count"] == 2
+
+
+def test_count_terms_matches_phrases_and_hyphenated_words():
+    counts = count_terms(["A cold spot, then a cold-spot and another cold spot"], ["Cold Spot", "cold-spot", "spot"])
+    assert counts == {"cold spot": 2, "cold-spot": 1, "spot": 2}
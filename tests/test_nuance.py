@@ -1,3 +1,4 @@
+import copy
 import sys
 from pathlib import Path
 
@@ -5,9 +6,11 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 sys.path.append(str(REPO_ROOT))
 sys.path.append(str(REPO_ROOT / "src"))
 
+import pytest
 import yaml
 
-from rules import RuleEngine
+from rules import ENGINE_BACKENDS, RuleEngine, columns_for, load_nlp
+from simple_spacy import SimpleNLP
 
 
 with open("config/categories.yml", "r", encoding="utf-8") as f:
@@ -55,3 +58,194 @@ def test_presence_multiword():
     result = eng.analyze_text("I heard a disembodied voice and felt a cold spot.")
     assert "disembodied voice" in result["presence_label"]
     assert "cold spot" in result["presence_label"]
+
+
+def test_category_selection_limits_columns():
+    eng = make_engine()
+    full = eng.analyze_text("I felt gross and saw a bright glow.")
+    subset = eng.analyze_text("I felt gross and saw a bright glow.", ["sensorimotor"])
+    assert set(subset) == set(columns_for(["sensorimotor"]))
+    assert {key: full[key] for key in subset} == subset
+
+
+def test_unknown_category_rejected():
+    eng = make_engine()
+    with pytest.raises(ValueError):
+        eng.analyze_text("I saw a light.", ["telepathy"])
+
+
+def test_idiom_guard_suppresses_agent():
+    eng = make_engine()
+    a = eng.analyze_text("Oh my god, I was late for the exam.")
+    b = eng.analyze_text("Oh my, the god of the river spoke to me.")
+    assert a["agent_supernatural"] == 0
+    assert b["agent_supernatural"] == 1
+
+
+def test_idiom_pattern_is_rebuilt_only_for_overlays_that_add_idioms():
+    eng = make_engine()
+    plain = eng.overlay({"visual.color": ["teal"]})
+    assert plain._idiom_pattern is eng._idiom_pattern
+    idioms = eng.overlay(exceptions={"idiom_exclusions.supernatural": ["thank god"]})
+    assert idioms._idiom_pattern is not eng._idiom_pattern
+    text = "Thank god, the bus came."
+    assert eng.analyze_text(text)["agent_supernatural"] == 1
+    assert idioms.analyze_text(text)["agent_supernatural"] == 0
+
+
+def test_long_text_sharding_matches_whole_parse():
+    text = " ".join(
+        ["I held a ring in my hands.", "Then I didn't feel dizzy at all.", "Oh my god, the bells!"] * 20
+    )
+    whole = RuleEngine(CATS, EXC, chunk_chars=len(text))
+    sharded = RuleEngine(CATS, EXC, chunk_chars=50)
+    assert sharded.analyze_text(text) == whole.analyze_text(text)
+
+
+def test_chunk_pool_is_started_once_and_matches_serial_parse():
+    spacy = pytest.importorskip("spacy")
+    text = " ".join(["I held a ring in my hands.", "Then I didn't feel dizzy at all."] * 20)
+    nlp = spacy.blank("en")
+    serial = RuleEngine(CATS, EXC, nlp=nlp, chunk_chars=50)
+    pooled = RuleEngine(CATS, EXC, nlp=nlp, chunk_chars=50, n_process=2)
+    doc = pooled.parse(text)
+    assert doc.text == text and [t.text for t in doc] == [t.text for t in serial.parse(text)]
+    pool = pooled._chunk_pool._executor
+    assert pool is not None
+    pooled.overlay({"visual.color": ["teal"]}).parse(text)
+    assert pooled._chunk_pool._executor is pool
+    assert RuleEngine(CATS, EXC, nlp=SimpleNLP(), n_process=2)._chunk_pool is None
+
+
+def test_batch_coding_matches_single_texts():
+    eng = make_engine()
+    texts = ["I prayed to God in the chapel.", "", "I felt like I was right about it."]
+    assert eng.analyze_texts(texts) == [eng.analyze_text(text) for text in texts]
+
+
+def test_codes_only_matches_full_codes():
+    eng = make_engine()
+    text = "I felt dizzy, saw a bright glow, and knelt in terror before the altar."
+    full = eng.analyze_text(text)
+    fast = eng.analyze_text(text, codes_only=True)
+    assert fast == {key: value for key, value in full.items() if not key.startswith("reason_")}
+
+
+def _merged(base, extra):
+    merged = copy.deepcopy(base)
+    for key, values in extra.items():
+        *parents, leaf = key.split(".")
+        cursor = merged
+        for part in parents:
+            cursor = cursor.setdefault(part, {})
+        cursor[leaf] = list(dict.fromkeys(list(cursor.get(leaf) or []) + list(values)))
+    return merged
+
+
+def test_preset_overlay_matches_rebuilt_engine():
+    lexicons = {
+        "agent.supernatural_nouns": ["oracle"],
+        "presence.types": ["watcher", "silent witness"],
+        "visual.color": ["teal"],
+        "bodystate.respiratory": ["wheeze"],
+        "motor.postures": ["crouch"],
+        "not.a.category": ["ignored"],
+    }
+    exceptions = {"negations": ["scarcely"], "epistemic_complements": ["sure"]}
+    texts = [
+        "An oracle spoke while a silent witness watched from the teal door.",
+        "I felt sure the watcher was near. I let out a wheeze and began to crouch.",
+        "I scarcely felt gross, then I prayed to God in the chapel.",
+    ]
+    base = make_engine()
+    overlay = base.overlay(lexicons, exceptions)
+    rebuilt = RuleEngine(_merged(CATS, lexicons), _merged(EXC, exceptions))
+    assert overlay.nlp is base.nlp
+    assert overlay.analyze_texts(texts) == rebuilt.analyze_texts(texts)
+    # The base engine is unchanged.
+    assert base.analyze_texts(texts) == make_engine().analyze_texts(texts)
+
+
+def test_prefilter_skips_parsing_without_changing_codes(monkeypatch):
+    texts = [
+        "We went to the market and it was late.",
+        "I prayed to God in the chapel.",
+        "Nothing happened at all.",
+        "I felt like I was right about it.",
+        "A silent   witness stood there.",
+        "",
+    ]
+    eng = make_engine()
+    full = RuleEngine(CATS, EXC, prefilter=False)
+    parsed = []
+    pipe = eng.nlp.pipe
+
+    def recording_pipe(batch, **kwargs):
+        batch = list(batch)
+        parsed.extend(batch)
+        return pipe(batch, **kwargs)
+
+    monkeypatch.setattr(eng.nlp, "pipe", recording_pipe)
+    for selection in (None, ["visual"], ["sensorimotor"]):
+        assert eng.analyze_texts(texts, selection) == full.analyze_texts(texts, selection)
+        assert eng.analyze_texts(texts, selection, codes_only=True) == full.analyze_texts(
+            texts, selection, codes_only=True
+        )
+    assert "We went to the market and it was late." not in parsed
+    assert "I prayed to God in the chapel." in parsed
+    assert not eng.may_code("We went to the market and it was late.", ("visual",))
+    assert eng.may_code("I felt like I was right about it.", ("sensorimotor",))
+
+
+def test_spelling_normalization_matches_variants():
+    spelling = {"color": "colour", "gray": "grey"}
+    cats = copy.deepcopy(CATS)
+    cats["visual"]["color"] = ["grey"]
+    cats["presence"]["types"] = list(cats["presence"]["types"]) + ["grey lady"]
+    eng = RuleEngine(cats, EXC, spelling=spelling)
+    assert "gray" in eng.visual and "grey" not in eng.visual
+    for text in ("A gray shape.", "A grey shape."):
+        assert eng.analyze_text(text, ["visual"])["visual"] == 1
+    for text in ("I met the gray lady.", "I met the grey-lady."):
+        assert eng.analyze_text(text, ["presence"])["presence_label"]
+    overlay = eng.overlay({"visual.color": ["colour"]})
+    assert overlay.analyze_text("The color faded.", ["visual"])["visual"] == 1
+    assert RuleEngine(cats, EXC).analyze_text("A gray shape.", ["visual"])["visual"] == 0
+
+
+def test_fuzzy_matching_labels_corrected_tokens():
+    text = "I felt dizy and heard whisperd voices in the dream."
+    exact = make_engine().analyze_text(text, ["auditory", "sensorimotor"])
+    assert exact["auditory"] == 0 and exact["sensorimotor"] == 0
+    eng = RuleEngine(CATS, EXC, fuzzy=1)
+    out = eng.analyze_text(text, ["auditory", "sensorimotor", "valence"])
+    assert "whisper~whisperd" in out["reason_auditory"].split(",")
+    assert out["reason_sensorimotor"] == "felt+dizzy~dizy"
+    assert out["valence_label"] == ""  # "dream" and "heard" are real words, not typos of "dread"/"fear"
+    assert eng.analyze_text("I saw an angle.", ["agent"])["agent_supernatural"] == 0
+    overlay = eng.overlay(exceptions={"fuzzy_known_words": ["dizy"]})
+    assert overlay.analyze_text(text, ["sensorimotor"])["sensorimotor"] == 0
+
+
+def test_fuzzy_overlay_extends_the_base_index():
+    base = RuleEngine(CATS, EXC, fuzzy=1)
+    texts = ["A shimmmer crossed the room and I felt dizy.", "The glimmerr faded; whisperd voices followed."]
+    lexicons = {"visual.light_terms": ["shimmer", "glimmer"]}
+    overlay = base.overlay(lexicons, {"fuzzy_known_words": ["followd"]})
+    rebuilt = base.overlay(lexicons, {"fuzzy_known_words": ["followd"]})
+    rebuilt._build_fuzzy_index()
+    assert overlay.analyze_texts(texts) == rebuilt.analyze_texts(texts)
+    assert "shimmer~shimmmer" in overlay.analyze_text(texts[0], ["visual"])["reason_visual"]
+    assert base._fuzzy_index.lookup("shimmmer") is None  # the base index is not modified
+    assert overlay._fuzzy_index._index.keys().isdisjoint(["dizzy"])  # only the delta is indexed
+
+
+def test_load_nlp_backends():
+    assert isinstance(load_nlp(ENGINE_BACKENDS["fast"]), SimpleNLP)
+    assert RuleEngine(CATS, EXC, nlp=load_nlp("simple")).backend == "simple"
+    with pytest.raises(ValueError):
+        load_nlp("bogus")
+    # An explicit spaCy request fails loudly instead of falling back.
+    with pytest.raises((ImportError, OSError)):
+        load_nlp("spacy", model="no_such_model")
+    assert isinstance(load_nlp("auto", model="no_such_model"), SimpleNLP)
@@ -0,0 +1,26 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+pytest.importorskip("jsonschema")
+pytest.importorskip("pydantic_settings")
+
+from api.preset_validation import validate_payload, validate_preset_dir
+
+
+def test_shipped_presets_are_valid():
+    results = validate_preset_dir(workers=1)
+    assert results and all(result["ok"] for result in results)
+
+
+def test_dead_lexicon_key_rejected():
+    result = validate_payload(
+        {"meta": {"name": "x", "version": "1"}, "lexicons": {"sensorimotor.embodied_adjectives": ["gross"]}}
+    )
+    assert not result["ok"]
+    assert result["path"] == ["lexicons", "sensorimotor.embodied_adjectives"]
@@ -0,0 +1,68 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "src"))
+
+import yaml
+
+import recode
+from rules import CATEGORIES, RuleEngine
+
+
+with open("config/categories.yml", "r", encoding="utf-8") as f:
+    CATS = yaml.safe_load(f)
+with open("config/exceptions.yml", "r", encoding="utf-8") as f:
+    EXC = yaml.safe_load(f)
+OLD = json.loads((REPO_ROOT / "configs/presets/dreams-sensorimotor@0.4.0.json").read_text(encoding="utf-8"))
+SELECTED = OLD["meta"]["categories"]
+
+
+def bumped():
+    new = copy.deepcopy(OLD)
+    new["meta"]["version"] = "0.5.0"
+    new["lexicons"]["presence.types"].append("shadow figure")
+    new["lexicons"]["valence.positive_low_arousal"] = ["Happy"]  # case-only change
+    return new
+
+
+def test_plan_maps_changed_keys_to_coders():
+    assert recode.plan(OLD, bumped())["categories"] == list(CATEGORIES)
+    plan = recode.plan(OLD, bumped(), categories=SELECTED)
+    assert plan["lexicons"] == ["presence.types"]
+    assert plan["recode"] == ["presence"]
+    assert plan["carry"] == ["agent", "sensorimotor", "valence"]
+    assert recode.plan(OLD, bumped(), fuzzy=1, categories=SELECTED)["recode"] == plan["categories"]
+    hedged = bumped()
+    hedged["exceptions"]["hedges"] = ["kinda"]
+    assert recode.plan(OLD, hedged, categories=SELECTED)["recode"] == ["agent", "presence", "sensorimotor"]
+
+
+def test_plan_follows_presets_that_select_categories():
+    old, new = copy.deepcopy(OLD), bumped()
+    old["meta"]["select_categories"] = new["meta"]["select_categories"] = True
+    assert recode.plan(old, new) == recode.plan(OLD, bumped(), categories=SELECTED)
+    new["meta"]["categories"] = SELECTED + ["visual"]  # newly selected coders are coded from scratch
+    plan = recode.plan(old, new)
+    assert plan["recode"] == ["presence", "visual"]
+    assert plan["carry"] == ["agent", "sensorimotor", "valence"]
+
+
+def test_partial_recode_matches_full_run():
+    texts = [
+        "I saw a shadow figure by the door and felt dizzy.",
+        "A presence watched me; I was happy, then terror.",
+        "Nothing happened.",
+    ]
+    new = bumped()
+    old_engine = RuleEngine(CATS, EXC).overlay(OLD["lexicons"], OLD["exceptions"])
+    new_engine = RuleEngine(CATS, EXC).overlay(new["lexicons"], new["exceptions"])
+    plan = recode.plan(OLD, new)
+    carried = recode.carried_columns(plan)
+    prior = [{col: row[col] for col in carried} for row in old_engine.analyze_texts(texts, plan["categories"])]
+    rows = recode.merge_rows(prior, new_engine.analyze_texts(texts, plan["recode"]))
+    assert rows == new_engine.analyze_texts(texts, plan["categories"])
+    assert "shadow figure" in rows[0]["presence_label"].split(";")
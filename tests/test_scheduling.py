@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from api.scheduling import BULK, INTERACTIVE, Scheduler
+
+
+class RecordingEngine:
+    backend = "simple"
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+
+    def analyze_texts(self, texts, **options):
+        if texts and texts[0] == "gate":
+            self.gate.wait(5)
+        self.calls.append(list(texts))
+        return [{"text": text} for text in texts]
+
+
+def wait_for(predicate):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.001)
+    raise AssertionError("condition not reached")
+
+
+def test_bulk_slices_wait_for_interactive_work_and_tenants_take_turns():
+    engine = RecordingEngine()
+    scheduler = Scheduler(workers=1, slice_rows=2, bulk_every=0)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        gate = pool.submit(scheduler.bind(engine, INTERACTIVE, "x").analyze_texts, ["gate"])
+        wait_for(lambda: scheduler.stats()["interactive_requests"] == 1)
+        bulk_a = pool.submit(scheduler.bind(engine, BULK, "a").analyze_texts, ["a1", "a2", "a3", "a4"])
+        wait_for(lambda: scheduler.stats()["bulk_slices"] == 2)
+        bulk_b = pool.submit(scheduler.bind(engine, BULK, "b").analyze_texts, ["b1", "b2"])
+        wait_for(lambda: scheduler.stats()["bulk_slices"] == 3)
+        # Interactive work runs at once, on the caller's thread.
+        assert scheduler.bind(engine, INTERACTIVE, "c").analyze_texts(["c1"]) == [{"text": "c1"}]
+        assert scheduler.stats()["active"] == 0
+        engine.gate.set()
+        assert [r["text"] for r in bulk_a.result()] == ["a1", "a2", "a3", "a4"]
+        bulk_b.result()
+        gate.result()
+    assert engine.calls == [["c1"], ["gate"], ["a1", "a2"], ["b1", "b2"], ["a3", "a4"]]
+
+
+def test_bulk_gets_a_slice_after_bulk_every_interactive_requests():
+    engine = RecordingEngine()
+    scheduler = Scheduler(workers=1, slice_rows=1, bulk_every=1)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        gate = pool.submit(scheduler.bind(engine, INTERACTIVE, "x").analyze_texts, ["gate"])
+        wait_for(lambda: scheduler.stats()["interactive_requests"] == 1)
+        bulk = pool.submit(scheduler.bind(engine, BULK, "a").analyze_texts, ["a1"])
+        wait_for(lambda: scheduler.stats()["bulk_slices"] == 1)
+        scheduler.bind(engine, INTERACTIVE, "c").analyze_texts(["c1"])
+        assert bulk.result() == [{"text": "a1"}]
+        assert not gate.done()
+        engine.gate.set()
+        gate.result()
+    assert engine.calls == [["c1"], ["a1"], ["gate"]]
+
+
+def test_no_workers_runs_inline():
+    engine = RecordingEngine()
+    scheduler = Scheduler(workers=0, slice_rows=1)
+    assert scheduler.run(BULK, "a", engine.analyze_texts, ["x", "y"]) == [{"text": "x"}, {"text": "y"}]
+    assert engine.calls == [["x", "y"]]
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "src"))
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import sharding
+from io_utils import iter_column, save_coded
+
+
+def test_shards_code_and_merge_back_in_input_order(tmp_path):
+    src = tmp_path / "in.csv"
+    lines = ["id,text"] + [f"r{i},text number {i}" for i in range(50)]
+    src.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    shards = sharding.write_shards(src, tmp_path, 4, key_col="id", chunksize=7)
+    assert sum(s["rows"] for s in shards) == 50
+    assert shards == sharding.write_shards(src, tmp_path / "again", 4, key_col="id")
+
+    coded = []
+    for index in reversed(range(4)):  # completion order does not matter
+        shard_file = tmp_path / shards[index]["file"]
+        rows = [{"n": len(t)} for chunk in iter_column(shard_file, "text") for t in chunk]
+        coded.append(save_coded(shard_file, sharding.shard_path(tmp_path, index, "coded"), rows, ["n"]))
+
+    out = tmp_path / "merged.csv"
+    assert sharding.merge_outputs(coded, out) == 50
+    merged = out.read_text(encoding="utf-8").splitlines()
+    assert merged[0] == "id,text,n"
+    assert merged[1:] == [f"r{i},text number {i},{len(f'text number {i}')}" for i in range(50)]
+
+    coded[0].write_text("_row,id,text,n\n", encoding="utf-8")  # a shard lost its rows
+    with pytest.raises(ValueError):
+        sharding.merge_outputs(coded, out)
+
+
+def test_fingerprint_tracks_config_and_options(tmp_path):
+    cfg = tmp_path / "categories.yml"
+    cfg.write_text("visual: {}\n", encoding="utf-8")
+    base = sharding.fingerprint([cfg, None], {"codes_only": False})
+    assert base == sharding.fingerprint([cfg, None], {"codes_only": False})
+    assert base != sharding.fingerprint([cfg, None], {"codes_only": True})
+    cfg.write_text("visual: {color: [teal]}\n", encoding="utf-8")
+    assert base != sharding.fingerprint([cfg, None], {"codes_only": False})
+
+
+def test_shard_manifest_takes_an_opted_in_preset_selection(tmp_path):
+    import json
+
+    import analyze
+
+    src = tmp_path / "in.csv"
+    src.write_text("text\nI saw a light.\n", encoding="utf-8")
+    preset = json.loads((REPO_ROOT / "configs/presets/dreams-sensorimotor@0.4.0.json").read_text(encoding="utf-8"))
+
+    def shard(name, *extra):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps(preset), encoding="utf-8")
+        out_dir = tmp_path / name
+        argv = ["shard", "--in_file", str(src), "--shards", "1", "--out_dir", str(out_dir), "--preset", str(path)]
+        analyze.shard_main([*argv, *extra])
+        return sharding.load_manifest(out_dir / "manifest.json")["options"]["categories"]
+
+    assert len(shard("descriptive")) == len(analyze.resolve_categories())
+    preset["meta"]["select_categories"] = True
+    assert shard("selected") == ["agent", "presence", "sensorimotor", "valence"]
+    assert shard("overridden", "--categories", "visual") == ["visual"]
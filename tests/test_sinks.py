@@ -0,0 +1,58 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "src"))
+
+from sinks import SQLiteSink
+
+
+def test_upserts_by_id_and_versions(tmp_path):
+    db = tmp_path / "coded.sqlite"
+    with SQLiteSink(db, batch_rows=2) as sink:
+        sink.write([("a", 0, {"visual": 1}), ("b", 1, {"visual": 0}), ("c", 2, {"visual": 0})], "0.3.0", "ad-hoc")
+        sink.write([("a", 0, {"visual": 0, "reason_visual": ""})], "0.3.0", "ad-hoc")
+        sink.write([("a", 0, {"visual": 1})], "0.3.0", "0.4.0")
+
+    conn = sqlite3.connect(str(db))
+    rows = conn.execute("SELECT new_id, preset_version, visual FROM coded ORDER BY new_id, preset_version").fetchall()
+    assert rows == [("a", "0.4.0", 1), ("a", "ad-hoc", 0), ("b", "ad-hoc", 0), ("c", "ad-hoc", 0)]
+    indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "ix_coded_visual" in indexes and "ix_coded_reason_visual" not in indexes
+
+
+def test_blank_ids_fall_back_to_row_numbers(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    import analyze
+
+    # The blank row at position 2 must not overwrite the real id "2".
+    src = tmp_path / "in.csv"
+    src.write_text("new_id,text\n2,I saw a bright light.\n,Nothing happened.\n ,I heard music.\n", encoding="utf-8")
+    db = tmp_path / "coded.sqlite"
+    monkeypatch.setattr(sys, "argv", ["analyze.py", "--in_file", str(src), "--out_db", str(db), "--engine", "fast"])
+    analyze.main()
+
+    conn = sqlite3.connect(str(db))
+    rows = conn.execute("SELECT new_id, row, visual, auditory FROM coded ORDER BY row").fetchall()
+    assert rows == [("2", 0, 1, 0), ("#row:1", 1, 0, 0), ("#row:2", 2, 0, 1)]
+
+
+def test_profile_covers_the_out_db_path(tmp_path, monkeypatch):
+    pytest.importorskip("pandas")
+    import analyze
+
+    src = tmp_path / "in.csv"
+    src.write_text("new_id,text\na,I saw a bright light.\n", encoding="utf-8")
+    db = tmp_path / "coded.sqlite"
+    argv = ["analyze.py", "--in_file", str(src), "--out_db", str(db), "--engine", "fast", "--profile"]
+    monkeypatch.setattr(sys, "argv", argv)
+    analyze.main()
+
+    assert (tmp_path / "coded.prof").exists()
+    alloc = (tmp_path / "coded.alloc.txt").read_text(encoding="utf-8")
+    assert all(stage in alloc for stage in ("load", "engine", "code"))
+    assert sqlite3.connect(str(db)).execute("SELECT new_id FROM coded").fetchall() == [("a",)]
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(REPO_ROOT))
+sys.path.append(str(REPO_ROOT / "src"))
+
+import yaml
+
+from rules import RuleEngine
+from summary import CorpusSummary
+
+with open("config/categories.yml", "r", encoding="utf-8") as f:
+    CATS = yaml.safe_load(f)
+with open("config/exceptions.yml", "r", encoding="utf-8") as f:
+    EXC = yaml.safe_load(f)
+
+TEXTS = [
+    "I saw a bright glow and heard a whisper.",
+    "I felt a cold touch and heard bells in terror.",
+    "Nothing happened.",
+    "A luminous angel spoke; I felt sorrow.",
+]
+
+
+def test_summary_counts_codes_and_cooccurrence():
+    rows = RuleEngine(CATS, EXC).analyze_texts(TEXTS)
+    summary = CorpusSummary().update(rows).to_dict()
+    assert summary["docs"] == 4
+    assert summary["prevalence"]["auditory"] == 2
+    assert summary["cooccurrence"]["visual|auditory"] == 1
+    assert summary["valence"]["none"] == 2
+    assert summary["terms"]["reason_agent"] == {"angel": 1}
+
+
+def test_shard_summaries_merge_exactly():
+    rows = RuleEngine(CATS, EXC).analyze_texts(TEXTS)
+    whole = CorpusSummary().update(rows)
+    left = CorpusSummary().update(rows[:2])
+    right = CorpusSummary.from_dict(CorpusSummary().update(rows[2:]).to_dict())
+    assert left.merge(right).to_dict() == whole.to_dict()
+
+
+def test_profile_covers_the_summary_path(tmp_path, monkeypatch):
+    import json
+
+    import pytest
+
+    pytest.importorskip("pandas")
+    import analyze
+
+    src = tmp_path / "in.csv"
+    src.write_text("text\n" + "\n".join(TEXTS) + "\n", encoding="utf-8")
+    out = tmp_path / "summary.json"
+    argv = ["analyze.py", "--in_file", str(src), "--summary", "--out_file", str(out), "--engine", "fast", "--profile"]
+    monkeypatch.setattr(sys, "argv", argv)
+    analyze.main()
+
+    assert json.loads(out.read_text(encoding="utf-8"))["backend"] == "simple"
+    assert (tmp_path / "summary.prof").exists()
+    assert "code" in (tmp_path / "summary.alloc.txt").read_text(encoding="utf-8")
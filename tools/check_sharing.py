@@ -0,0 +1,84 @@
+"""Report how much memory prefork workers share with their master.
+
+Reads ``/proc/<pid>/smaps_rollup`` (Linux) for a master and its children and
+compares the proportional set size (PSS, each shared page split among its
+users) of the whole process tree with the RSS of a single process.
+
+    python tools/check_sharing.py --pid $(pgrep -o -f gunicorn) --max-footprint 2.0
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import sys
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def smaps_rollup(pid: int) -> Dict[str, int]:
+    """Memory counters for ``pid`` in bytes."""
+
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="ascii") as fh:
+        for line in fh:
+            key, _, rest = line.partition(":")
+            if key in FIELDS:
+                values[key] = int(rest.split()[0]) * 1024
+    return values
+
+
+def children(pid: int) -> List[int]:
+    found = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text(encoding="ascii").rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(stat.parent.name))
+    return sorted(found)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, required=True, help="Master (prefork parent) PID")
+    parser.add_argument(
+        "--max-footprint",
+        type=float,
+        default=None,
+        help="Fail when the tree's total PSS exceeds this many times one worker's RSS",
+    )
+    args = parser.parse_args()
+
+    workers = children(args.pid)
+    if not workers:
+        print(f"No worker processes found under {args.pid}", file=sys.stderr)
+        sys.exit(1)
+
+    mib = 2**20
+    total_pss = 0
+    print(f"{'pid':>8}{'role':>8}{'RSS':>10}{'PSS':>10}{'shared':>10}{'private':>10}{'shared%':>9}")
+    for pid in [args.pid, *workers]:
+        mem = smaps_rollup(pid)
+        shared = mem.get("Shared_Clean", 0) + mem.get("Shared_Dirty", 0)
+        private = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+        total_pss += mem.get("Pss", 0)
+        role = "master" if pid == args.pid else "worker"
+        print(
+            f"{pid:>8}{role:>8}{mem.get('Rss', 0) / mib:>9.0f}M{mem.get('Pss', 0) / mib:>9.0f}M"
+            f"{shared / mib:>9.0f}M{private / mib:>9.0f}M{100 * shared / max(1, shared + private):>8.0f}%"
+        )
+
+    worker_rss = max(smaps_rollup(pid).get("Rss", 0) for pid in workers)
+    footprint = total_pss / max(1, worker_rss)
+    print(
+        f"{len(workers)} workers: total PSS {total_pss / mib:.0f}M = {footprint:.2f}x one worker's RSS"
+    )
+    if args.max_footprint is not None and footprint > args.max_footprint:
+        print(f"FAILED: footprint {footprint:.2f}x exceeds {args.max_footprint}x", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Compare NLP backends on a corpus: speed, memory, and agreement.
+
+Each backend runs in a fresh process so memory figures are not polluted by
+the others. Throughput is timed on an untraced pass; the tracemalloc peak
+comes from a second, traced pass. Agreement is Cohen's kappa per output
+column against the reference backend (full spaCy by default).
+
+    python tools/compare_backends.py --in_file data/raw/dreams.csv --text_col text \\
+        --backends spacy,spacy-no-ner,spacy-no-parser,simple --min-kappa 0.8
+"""
+from __future__ import annotations
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from analyze import OUTPUT_COLUMNS, load_cfgs
+from io_utils import iter_column
+from loadtest import rss_bytes
+from rules import RuleEngine, load_nlp
+
+# Backend name -> load_nlp() arguments.
+BACKENDS: Dict[str, Dict[str, Any]] = {
+    "spacy": {"backend": "spacy"},
+    "spacy-no-ner": {"backend": "spacy", "exclude": ["ner"]},
+    "spacy-no-parser": {"backend": "spacy", "exclude": ["ner", "parser"]},
+    "simple": {"backend": "simple"},
+}
+
+
+def cohen_kappa(a: Sequence[Any], b: Sequence[Any]) -> float:
+    """Cohen's kappa treating every distinct value as its own category."""
+
+    n = len(a)
+    if n == 0:
+        return float("nan")
+    observed = sum(x == y for x, y in zip(a, b)) / n
+    ca, cb = Counter(a), Counter(b)
+    expected = sum(ca[k] * cb.get(k, 0) for k in ca) / (n * n)
+    if expected == 1:
+        return 1.0 if observed == 1 else 0.0
+    return (observed - expected) / (1 - expected)
+
+
+def run_backend(name: str, texts: List[str]) -> Dict[str, Any]:
+    """Build an engine for ``name`` and code ``texts``; runs in a child process."""
+
+    cats, exc = load_cfgs()
+    rss_before = rss_bytes(os.getpid()) or 0
+    t0 = time.perf_counter()
+    engine = RuleEngine(cats, exc, nlp=load_nlp(**BACKENDS[name]))
+    load_s = time.perf_counter() - t0
+    # Timed untraced: tracemalloc slows allocation-heavy code several-fold.
+    t0 = time.perf_counter()
+    rows = [engine.analyze_text(text) for text in texts]
+    run_s = time.perf_counter() - t0
+    rss_after = rss_bytes(os.getpid()) or 0
+    tracemalloc.start()
+    for text in texts:
+        engine.analyze_text(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "backend": name,
+        "load_s": load_s,
+        "docs_per_s": len(texts) / run_s if run_s else float("inf"),
+        "rss_delta_mib": (rss_after - rss_before) / 2**20,
+        "traced_peak_mib": peak / 2**20,
+        "rows": rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--in_file", required=True)
+    parser.add_argument("--text_col", default="text")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--backends", default="spacy,spacy-no-ner,spacy-no-parser,simple")
+    parser.add_argument("--reference", default="spacy")
+    parser.add_argument("--min-kappa", type=float, default=0.8, help="Agreement threshold on code columns")
+    parser.add_argument("--json", dest="json_out", default=None)
+    args = parser.parse_args()
+
+    names = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in names + [args.reference] if b not in BACKENDS]
+    if unknown:
+        print(f"Unknown backends: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    if args.reference not in names:
+        names.insert(0, args.reference)
+
+    try:
+        texts = [text for chunk in iter_column(args.in_file, args.text_col) for text in chunk][: args.limit]
+    except KeyError:
+        print(f"Missing column: {args.text_col}", file=sys.stderr)
+        sys.exit(1)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    ctx = multiprocessing.get_context("spawn")
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            try:
+                results[name] = pool.submit(run_backend, name, texts).result()
+            except Exception as exc:  # backend unavailable in this environment
+                print(f"{name}: skipped ({exc})", file=sys.stderr)
+    if args.reference not in results:
+        print(f"Reference backend {args.reference} unavailable", file=sys.stderr)
+        sys.exit(1)
+
+    reference = results[args.reference]["rows"]
+    code_columns = [c for c in OUTPUT_COLUMNS if not c.startswith("reason_")]
+    report: Dict[str, Any] = {"docs": len(texts), "reference": args.reference, "backends": {}}
+    for name, res in results.items():
+        kappas = {
+            col: cohen_kappa([r.get(col) for r in reference], [r.get(col) for r in res["rows"]])
+            for col in OUTPUT_COLUMNS
+        }
+        report["backends"][name] = {
+            **{k: v for k, v in res.items() if k != "rows"},
+            "kappa": kappas,
+            "min_code_kappa": min(kappas[c] for c in code_columns),
+        }
+
+    header = f"{'column':<22}" + "".join(f"{n:>17}" for n in results)
+    print(header)
+    for label, key, fmt in (
+        ("docs/sec", "docs_per_s", "{:>17.1f}"),
+        ("load s", "load_s", "{:>17.2f}"),
+        ("RSS delta MiB", "rss_delta_mib", "{:>17.1f}"),
+        ("traced peak MiB", "traced_peak_mib", "{:>17.1f}"),
+    ):
+        print(f"{label:<22}" + "".join(fmt.format(report["backends"][n][key]) for n in results))
+    for col in OUTPUT_COLUMNS:
+        print(f"{'kappa ' + col:<22}" + "".join(f"{report['backends'][n]['kappa'][col]:>17.3f}" for n in results))
+
+    eligible = [n for n in results if report["backends"][n]["min_code_kappa"] >= args.min_kappa]
+    if eligible:
+        best = max(eligible, key=lambda n: report["backends"][n]["docs_per_s"])
+        report["recommended"] = best
+        print(f"fastest backend with code-column kappa >= {args.min_kappa}: {best}")
+    else:
+        print(f"no backend reaches code-column kappa >= {args.min_kappa}")
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
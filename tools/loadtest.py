@@ -0,0 +1,362 @@
+"""Local load generator for the FastAPI service.
+
+Starts ``api.main:app`` with uvicorn (or targets ``--url``), first checks that
+concurrent first use of each preset yields identical results, then drives
+``/code``, ``/presets`` and ``/extend_lexicon`` with synthetic rows and reports
+throughput, latency percentiles, error rates, and server RSS over time.
+``--bulk-concurrency`` adds clients sending large bulk batches alongside, to
+check that interactive latency holds up under bulk load.
+
+    python tools/loadtest.py --duration 30 --concurrency 16 --batch-sizes 1,10,100 \\
+        --presets dreams-sensorimotor@0.4.0:3,ad-hoc:1 --bulk-concurrency 2 --bulk-rows 2000
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import yaml
+
+try:
+    import psutil
+except ModuleNotFoundError:  # pragma: no cover - /proc fallback below
+    psutil = None
+
+FILLER = "i was in a and the then it we saw my there but so very dream night later".split()
+
+
+def _weighted(spec: str) -> List[Tuple[str, float]]:
+    """Parse ``name:weight,name:weight`` (weight defaults to 1)."""
+
+    items = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.strip().rpartition(":") if ":" in part else (part.strip(), "", "1")
+        items.append((name, float(weight or 1)))
+    return items
+
+
+def _lexicon_terms() -> List[str]:
+    with (REPO_ROOT / "config/categories.yml").open("r", encoding="utf-8") as fh:
+        cats = yaml.safe_load(fh)
+    terms: List[str] = []
+    stack: List[Any] = [cats]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            terms.extend(str(t) for t in node)
+    return sorted(set(terms))
+
+
+def synthetic_text(rng: random.Random, terms: Sequence[str], words: int) -> str:
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(terms) if rng.random() < 0.15 else rng.choice(FILLER))
+    if rng.random() < 0.3:
+        out.insert(0, rng.choice(["i felt", "i didn't feel", "i felt like"]))
+    return " ".join(out).capitalize() + "."
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _tree_rss(pid: int) -> Optional[int]:
+    """RSS of the server process plus its worker children when psutil is available."""
+
+    if psutil is None:
+        return rss_bytes(pid)
+    try:
+        proc = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [proc, *proc.children(recursive=True)])
+    except psutil.Error:
+        return None
+
+
+class Client:
+    """One keep-alive HTTP connection per worker thread."""
+
+    def __init__(self, base_url: str, timeout: float) -> None:
+        parsed = urllib.parse.urlparse(base_url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = dict(headers or {})
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        conn = self._conn()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, "-m", "uvicorn", "api.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=str(REPO_ROOT))
+
+
+def wait_ready(client: Client, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.request("GET", "/presets")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def check_cold_presets(client: Client, presets: Sequence[str], concurrency: int) -> List[str]:
+    """Hit each cold preset concurrently and report any disagreement or error."""
+
+    problems = []
+    body = {"rows": [{"row": 2, "text": "I felt dizzy and heard a whisper near the altar."}]}
+    for preset in presets:
+        payload = dict(body, preset=None if preset == "ad-hoc" else preset)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            responses = list(pool.map(lambda _: client.request("POST", "/code", payload), range(concurrency)))
+        statuses = {status for status, _ in responses}
+        bodies = {content for _, content in responses}
+        if statuses != {200}:
+            problems.append(f"{preset}: statuses {sorted(statuses)} on concurrent first use")
+        elif len(bodies) != 1:
+            problems.append(f"{preset}: {len(bodies)} distinct results on concurrent first use")
+    return problems
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def run_load(args: argparse.Namespace, client: Client, pid: Optional[int]) -> Dict[str, Any]:
+    terms = _lexicon_terms()
+    endpoints = _weighted(args.mix)
+    presets = _weighted(args.presets)
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+    stats: Dict[str, Dict[str, Any]] = {}
+    stats_lock = threading.Lock()
+    rss_series: List[Tuple[float, int]] = []
+    stop = threading.Event()
+    started = time.monotonic()
+
+    def sample_rss() -> None:
+        while not stop.is_set():
+            value = _tree_rss(pid) if pid is not None else None
+            if value is not None:
+                rss_series.append((time.monotonic() - started, value))
+            stop.wait(args.rss_interval)
+
+    def record(key: str, latency: float, ok: bool, rows: int) -> None:
+        with stats_lock:
+            entry = stats.setdefault(key, {"latencies": [], "errors": 0, "rows": 0})
+            entry["latencies"].append(latency)
+            entry["rows"] += rows
+            if not ok:
+                entry["errors"] += 1
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.monotonic() - started < args.duration:
+            endpoint = rng.choices([e for e, _ in endpoints], [w for _, w in endpoints])[0]
+            preset = rng.choices([p for p, _ in presets], [w for _, w in presets])[0]
+            preset_value = None if preset == "ad-hoc" else preset
+            rows = 0
+            if endpoint == "code":
+                batch = rng.choice(batch_sizes)
+                rows = batch
+                key = f"code[{preset},batch={batch}]"
+                method, path = "POST", "/code"
+                body: Optional[Dict[str, Any]] = {
+                    "preset": preset_value,
+                    "rows": [
+                        {"row": i + 2, "new_id": f"r{i}", "text": synthetic_text(rng, terms, rng.randint(8, args.max_words))}
+                        for i in range(batch)
+                    ],
+                }
+            elif endpoint == "presets":
+                key, method, path, body = "presets", "GET", "/presets", None
+            else:
+                key, method, path = "extend_lexicon", "POST", "/extend_lexicon"
+                body = {"base_preset": preset_value, "categories": [], "keywords": {"visual.light_terms": ["glow"]}}
+            t0 = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, body)
+                ok = status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+            record(key, time.perf_counter() - t0, ok, rows)
+
+    def bulk_worker(seed: int) -> None:
+        rng = random.Random(seed)
+        key = f"code[bulk,rows={args.bulk_rows}]"
+        headers = {"X-API-Key": f"loadtest-bulk-{seed}"}
+        while time.monotonic() - started < args.duration:
+            body = {
+                "priority": "bulk",
+                "codes_only": True,
+                "rows": [
+                    {"row": i + 2, "text": synthetic_text(rng, terms, rng.randint(8, args.max_words))}
+                    for i in range(args.bulk_rows)
+                ],
+            }
+            t0 = time.perf_counter()
+            try:
+                status, _ = client.request("POST", "/code", body, headers)
+                ok = status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+            record(key, time.perf_counter() - t0, ok, args.bulk_rows)
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency + args.bulk_concurrency) as pool:
+        bulk = [pool.submit(bulk_worker, -1 - i) for i in range(args.bulk_concurrency)]
+        list(pool.map(worker, range(args.seed, args.seed + args.concurrency)))
+        for future in bulk:
+            future.result()
+    elapsed = time.monotonic() - started
+    stop.set()
+    sampler.join()
+
+    report: Dict[str, Any] = {"elapsed_s": elapsed, "endpoints": {}, "rss": rss_series}
+    for key, entry in sorted(stats.items()):
+        lat = sorted(entry["latencies"])
+        report["endpoints"][key] = {
+            "requests": len(lat),
+            "req_per_s": len(lat) / elapsed,
+            "rows_per_s": entry["rows"] / elapsed,
+            "error_rate": entry["errors"] / len(lat),
+            "p50_ms": percentile(lat, 50) * 1000,
+            "p95_ms": percentile(lat, 95) * 1000,
+            "p99_ms": percentile(lat, 99) * 1000,
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any], problems: Sequence[str]) -> None:
+    print(f"{'endpoint':<44}{'req':>8}{'req/s':>9}{'rows/s':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for key, row in report["endpoints"].items():
+        print(
+            f"{key:<44}{row['requests']:>8}{row['req_per_s']:>9.1f}{row['rows_per_s']:>9.1f}"
+            f"{row['error_rate'] * 100:>6.1f}%{row['p50_ms']:>8.1f}ms{row['p95_ms']:>7.1f}ms{row['p99_ms']:>7.1f}ms"
+        )
+    if report["rss"]:
+        mib = [value / 2**20 for _, value in report["rss"]]
+        step = max(1, len(mib) // 10)
+        series = ", ".join(f"{t:.0f}s={v:.0f}" for (t, _), v in list(zip(report["rss"], mib))[::step])
+        print(f"server RSS MiB: start={mib[0]:.0f} peak={max(mib):.0f} end={mib[-1]:.0f} ({series})")
+    for problem in problems:
+        print(f"PRESET CHECK FAILED: {problem}")
+    if not problems:
+        print("preset check: concurrent first use consistent")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Target an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, default=None, help="Server PID for RSS sampling with --url")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-sizes", default="1,10,100")
+    parser.add_argument("--presets", default="ad-hoc:1", help="Preset mix as name:weight; 'ad-hoc' means no preset")
+    parser.add_argument("--mix", default="code:8,presets:1,extend:1", help="Endpoint mix as name:weight")
+    parser.add_argument("--max-words", type=int, default=120)
+    parser.add_argument("--bulk-concurrency", type=int, default=0, help="Extra clients sending bulk batches")
+    parser.add_argument("--bulk-rows", type=int, default=2000, help="Rows per bulk batch")
+    parser.add_argument("--rss-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", default=None, help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        server = start_server(port, args.workers)
+        url = f"http://127.0.0.1:{port}"
+    client = Client(url, args.timeout)
+    pid = server.pid if server is not None else args.pid
+    try:
+        wait_ready(client, timeout=120)
+        problems = check_cold_presets(client, [p for p, _ in _weighted(args.presets)], args.concurrency)
+        report = run_load(args, client, pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_report(report, problems)
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(dict(report, problems=list(problems)), indent=2), encoding="utf-8")
+    if problems or any(row["error_rate"] > 0 for row in report["endpoints"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()